@@ -0,0 +1,208 @@
+"""
+Driver and parser benchmarks against the in-process emulator.
+
+    python benchmarks/run.py [--iterations N] [--baudrate B] [--output results.json]
+
+Prints (or writes) one JSON document so results can be diffed across releases.
+"""
+from typing import Awaitable, Callable, Optional
+import argparse
+import asyncio
+import datetime
+import gc
+import importlib.metadata
+import json
+import platform
+import struct
+import sys
+import time
+import timeit
+import tracemalloc
+
+import hart_protocol
+
+from brooks_sla.client import SyncClient
+from brooks_sla.core import Command
+from brooks_sla.driver import BrooksBus
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice
+from brooks_sla.hart import HartStreamParser, RequestTemplate, hart_checksum
+
+
+_NOT_TRACEMALLOC = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def measure(op: Callable[[], Awaitable[object]], iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await op()
+
+    latencies = []
+    clock = time.perf_counter
+    cpu_start = time.process_time()
+    wall_start = clock()
+    for _ in range(iterations):
+        start = clock()
+        await op()
+        latencies.append(clock() - start)
+    wall = clock() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    # Allocations are measured in a separate pass so tracing does not skew
+    # timings, over fewer operations since each costs two snapshots.
+    # tracemalloc only sees live memory: within one operation, bytes are its
+    # high-water mark above the start and blocks the ones allocated since the
+    # start and alive at the end of it, which the collector is kept from freeing.
+    samples = min(iterations, 200)
+    alloc_bytes = 0
+    alloc_blocks = 0
+    gc.disable()
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            await op()
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot().filter_traces(_NOT_TRACEMALLOC)
+            alloc_bytes += peak - base
+            diff = after.compare_to(before.filter_traces(_NOT_TRACEMALLOC), "traceback")
+            alloc_blocks += sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "throughput_per_s": iterations / wall,
+        "latency_s": {
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "p999": percentile(latencies, 0.999),
+            "max": latencies[-1],
+        },
+        "cpu_s_per_op": cpu / iterations,
+        "alloc_bytes_per_op": alloc_bytes / samples,
+        "alloc_blocks_per_op": alloc_blocks / samples,
+    }
+
+
+async def driver_benchmarks(iterations: int, baudrate: Optional[int], turnaround: float) -> dict:
+    emulator = BrooksEmulator(baudrate=baudrate, turnaround=turnaround)
+    emulator.add_device(EmulatedDevice("BENCH", 1))
+    # Without wire timing there is no line turnaround to respect either.
+    bus = BrooksBus("emulated", baudrate=baudrate or 19200, gap_chars=3.5 if baudrate else 0.0)
+    bus.attach(*emulator.open_connection())
+    mfc = bus.device("BENCH", address=1)
+    request = mfc.construct_command(Command.READ_PRIMARY_VARIABLE)
+    warmup = max(10, iterations // 20)
+
+    results = {}
+    results["read_flow"] = await measure(mfc.read_flow, iterations, warmup)
+    results["set_flow_percent"] = await measure(lambda: mfc.set_flow_percent(42.0), iterations, warmup)
+    results["transaction"] = await measure(lambda: mfc.transaction(request), iterations, warmup)
+    bus.enable_metrics()
+    results["read_flow_with_metrics"] = await measure(mfc.read_flow, iterations, warmup)
+    bus.disable_metrics()
+    return results
+
+
+def sync_benchmarks(iterations: int, baudrate: Optional[int], turnaround: float) -> dict:
+    """Blocking SyncClient calls; the difference to driver.read_flow is the thread hand-off."""
+    client = SyncClient()
+
+    async def setup() -> BrooksBus:
+        emulator = BrooksEmulator(baudrate=baudrate, turnaround=turnaround)
+        emulator.add_device(EmulatedDevice("BENCH", 1))
+        bus = BrooksBus("emulated", baudrate=baudrate or 19200, gap_chars=3.5 if baudrate else 0.0)
+        bus.attach(*emulator.open_connection())
+        return bus
+
+    with client:
+        client.add_bus("emulated", client.run(setup()))
+        mfc = client.device("BENCH", "emulated", address=1)
+        for _ in range(max(10, iterations // 20)):
+            mfc.read_flow()
+        latencies = []
+        clock = time.perf_counter
+        wall_start = clock()
+        for _ in range(iterations):
+            start = clock()
+            mfc.read_flow()
+            latencies.append(clock() - start)
+        wall = clock() - wall_start
+    latencies.sort()
+    return {
+        "read_flow": {
+            "iterations": iterations,
+            "throughput_per_s": iterations / wall,
+            "latency_s": {
+                "p50": percentile(latencies, 0.50),
+                "p99": percentile(latencies, 0.99),
+                "max": latencies[-1],
+            },
+        },
+    }
+
+
+def parser_benchmarks(iterations: int) -> dict:
+    address = 0x8000000001
+    payload = struct.pack(">BBBf", 0, 0, 17, 12.5)
+    body = bytes([0x86]) + address.to_bytes(5, "big") + bytes([1, len(payload)]) + payload
+    response = b"\xFF" * 5 + body + bytes([hart_checksum(body)])
+    parser = HartStreamParser()
+    template = RequestTemplate(hart_protocol.tools.pack_command(1, 236, bytes(5)), ">f")
+    setpoint = struct.pack(">Bf", 57, 42.0)
+
+    cases: dict[str, Callable[[], object]] = {
+        "decode_frame": lambda: parser.feed(response),
+        "checksum_24_bytes": lambda: hart_checksum(body),
+        "encode_pack_command": lambda: hart_protocol.tools.pack_command(1, 236, setpoint),
+        "encode_setpoint_template": lambda: template.pack(42.0),
+    }
+    results = {}
+    for name, fn in cases.items():
+        timer = timeit.Timer(fn)
+        best = min(timer.repeat(repeat=5, number=iterations)) / iterations
+        results[name] = {"iterations": iterations, "s_per_op": best, "ops_per_s": 1.0 / best}
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument("--iterations", type=int, default=2000)
+    args.add_argument("--parser-iterations", type=int, default=100_000)
+    args.add_argument("--baudrate", type=int, default=None, help="emulate wire time at this baud rate")
+    args.add_argument("--turnaround", type=float, default=0.0, help="emulated device turnaround in seconds")
+    args.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    ns = args.parse_args(argv)
+
+    report = {
+        "package": "brooks-sla",
+        "version": importlib.metadata.version("brooks-sla"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {"baudrate": ns.baudrate, "turnaround": ns.turnaround},
+        "driver": asyncio.run(driver_benchmarks(ns.iterations, ns.baudrate, ns.turnaround)),
+        "sync_client": sync_benchmarks(ns.iterations, ns.baudrate, ns.turnaround),
+        "parser": parser_benchmarks(ns.parser_iterations),
+    }
+    text = json.dumps(report, indent=2)
+    if ns.output is None:
+        print(text)
+    else:
+        with open(ns.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+from typing import TYPE_CHECKING, NamedTuple, Optional
+from brooks_sla.hart import HartFrameView, HartProtocolError, same_device
+import asyncio
+
+if TYPE_CHECKING:
+    from brooks_sla.driver import BrooksBus
+
+
+class BurstMessage(NamedTuple):
+    """One unsolicited frame; data is the payload after the status bytes."""
+    timestamp: float  # event loop time the frame was parsed
+    command: int
+    response_code: int
+    device_status: int
+    data: bytes
+
+
+class BurstStream:
+    """
+    Queue of BurstMessages from one device. When the consumer falls behind
+    the oldest message is dropped, so a stream never holds stale data.
+    """
+
+    def __init__(self, listener: "BurstListener", address: int, maxsize: int) -> None:
+        self.address = address
+        self.dropped = 0
+        self._listener = listener
+        self._queue: asyncio.Queue[Optional[BurstMessage]] = asyncio.Queue(maxsize)
+        self._closed = False
+
+    def __aiter__(self) -> "BurstStream":
+        return self
+
+    async def __anext__(self) -> BurstMessage:
+        message = await self._queue.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def get(self) -> BurstMessage:
+        return await self.__anext__()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def _put(self, message: Optional[BurstMessage]) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    def close(self) -> None:
+        """Stop routing messages here; pending iteration ends."""
+        if not self._closed:
+            self._closed = True
+            self._listener._unsubscribe(self)
+            self._put(None)
+
+
+class BurstListener:
+    """
+    Reads the line of a bus continuously while devices on it are in burst
+    mode. Burst frames are routed to per-device streams by identification
+    number (the last three address bytes); ACK frames complete the bus
+    transaction waiting for them. Requests go out only between frames, which
+    is the slot HART leaves the master after each burst.
+    """
+
+    def __init__(self, bus: "BrooksBus", queue_size: int = 256) -> None:
+        self._bus = bus
+        self._queue_size = queue_size
+        self._streams: dict[int, list[BurstStream]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Optional[tuple[bytes, int, asyncio.Future]] = None
+        self._idle = asyncio.Event()
+        self.frames = 0    # burst frames received
+        self.unrouted = 0  # burst frames nobody subscribed to
+        self.errors = 0    # protocol errors skipped while resyncing
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        reader, _ = self._bus._ensure_connected()
+        self._bus._parser.accept_burst = True
+        self._idle.set()
+        self._task = asyncio.get_running_loop().create_task(self._run(reader))
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, ConnectionError, asyncio.IncompleteReadError):
+                pass
+        self._bus._parser.accept_burst = False
+        self._fail_pending(ConnectionError("Burst listener stopped"))
+        for streams in list(self._streams.values()):
+            for stream in list(streams):
+                stream.close()
+
+    def subscribe(self, address: int) -> BurstStream:
+        """New stream of burst messages from the device with this identification number."""
+        stream = BurstStream(self, address & 0xFFFFFF, self._queue_size)
+        self._streams.setdefault(stream.address, []).append(stream)
+        return stream
+
+    def _unsubscribe(self, stream: BurstStream) -> None:
+        streams = self._streams.get(stream.address)
+        if streams is not None and stream in streams:
+            streams.remove(stream)
+            if not streams:
+                del self._streams[stream.address]
+
+    # ---------------- transactions ----------------
+
+    async def claim_slot(self, address: bytes, command: int, timeout: float) -> asyncio.Future:
+        """
+        Wait until the line is between frames (at most timeout) and register
+        for the response to command from the device at address. The caller
+        writes the request next.
+        """
+        if not self.running:
+            raise ConnectionError("Burst listener is not running")
+        if not self._idle.is_set():
+            try:
+                async with asyncio.timeout(timeout):
+                    await self._idle.wait()
+            except TimeoutError:
+                pass  # line noise that never completes a frame; write anyway
+        future = asyncio.get_running_loop().create_future()
+        self._pending = (address, command, future)
+        return future
+
+    def release_slot(self) -> None:
+        self._pending = None
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        if self._pending is not None:
+            _, _, future = self._pending
+            if not future.done():
+                future.set_exception(exc)
+            self._pending = None
+
+    # ---------------- reading ----------------
+
+    async def _run(self, reader: asyncio.StreamReader) -> None:
+        parser = self._bus._parser
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    frame = parser.next_frame()
+                    if frame is None:
+                        if parser.buffered:
+                            self._idle.clear()
+                        else:
+                            self._idle.set()
+                        frame = parser.feed(await reader.readexactly(parser.wants()))
+                except HartProtocolError:
+                    self.errors += 1
+                    continue
+                if frame is not None:
+                    self._dispatch(frame, loop.time())
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            self._fail_pending(ConnectionError(f"Line closed: {e}"))
+            raise
+
+    def _dispatch(self, frame: HartFrameView, now: float) -> None:
+        if frame.is_burst:
+            self.frames += 1
+            streams = None
+            if len(frame.address) == 5:
+                streams = self._streams.get(int.from_bytes(frame.address[2:5], "big"))
+            if not streams:
+                self.unrouted += 1
+                return
+            message = BurstMessage(
+                now, frame.command, frame.response_code, frame.device_status, bytes(frame.payload)
+            )
+            for stream in streams:
+                stream._put(message)
+        elif frame.is_response and self._pending is not None:
+            address, command, future = self._pending
+            if frame.command == command and same_device(frame.address, address) and not future.done():
+                # The view would be overwritten by the next read; hand out a copy.
+                future.set_result(frame.copy())
@@ -0,0 +1,264 @@
+from typing import Any, Iterator, NamedTuple, Optional
+from enum import IntEnum
+import asyncio
+import struct
+import time
+
+
+MAGIC = b"BSLACAP1"
+VERSION = 1
+# magic, version, baud rate, wall clock time at start, reserved
+_HEADER = struct.Struct("<8sIIdQ")
+HEADER_SIZE = _HEADER.size
+# microseconds since the previous record, direction, length; the data follows
+_RECORD = struct.Struct("<IBH")
+_MAX_DELTA = 0xFFFFFFFF
+_MAX_CHUNK = 0xFFFF
+
+
+class Direction(IntEnum):
+    TX = 0  # written to the line
+    RX = 1  # read from the line
+
+
+class CaptureRecord(NamedTuple):
+    timestamp: float  # seconds since the capture started
+    direction: Direction
+    data: bytes
+
+
+class CaptureFile:
+    """
+    Append-only capture of line traffic. Each chunk costs a 7 byte header
+    on top of its data; timestamps are monotonic, stored as microsecond
+    deltas. Longer silences than a delta holds are bridged by empty records.
+    """
+
+    def __init__(self, path: str, baudrate: int = 0) -> None:
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, baudrate, time.time(), 0))
+        self._start = time.monotonic_ns() // 1000
+        self._last = self._start
+        self.records = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def record(self, direction: Direction, data: bytes) -> None:
+        now = time.monotonic_ns() // 1000
+        delta = now - self._last
+        self._last = now
+        write = self._file.write
+        while delta > _MAX_DELTA:
+            write(_RECORD.pack(_MAX_DELTA, direction, 0))
+            delta -= _MAX_DELTA
+        for i in range(0, len(data), _MAX_CHUNK):
+            chunk = data[i : i + _MAX_CHUNK]
+            write(_RECORD.pack(delta, direction, len(chunk)))
+            write(chunk)
+            delta = 0
+        self.records += 1
+
+    def wrap(self, reader: Any, writer: Any) -> tuple["RecordingReader", "RecordingWriter"]:
+        """reader and writer with everything passing through them recorded here."""
+        return RecordingReader(reader, self), RecordingWriter(writer, self)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class RecordingReader:
+    """
+    Read half of a recorded line. Bytes are stamped as the bus takes them,
+    which is on arrival while it waits for a reply or a burst listener runs.
+    """
+
+    __slots__ = ("_reader", "_capture")
+
+    def __init__(self, reader: asyncio.StreamReader, capture: CaptureFile) -> None:
+        self._reader = reader
+        self._capture = capture
+
+    async def read(self, n: int = -1) -> bytes:
+        data = await self._reader.read(n)
+        if data:
+            self._capture.record(Direction.RX, data)
+        return data
+
+    async def readexactly(self, n: int) -> bytes:
+        try:
+            data = await self._reader.readexactly(n)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                self._capture.record(Direction.RX, e.partial)
+            raise
+        self._capture.record(Direction.RX, data)
+        return data
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._reader, name)
+
+
+class RecordingWriter:
+    __slots__ = ("_writer", "_capture")
+
+    def __init__(self, writer: asyncio.StreamWriter, capture: CaptureFile) -> None:
+        self._writer = writer
+        self._capture = capture
+
+    def write(self, data: bytes) -> None:
+        self._capture.record(Direction.TX, data)
+        self._writer.write(data)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._writer, name)
+
+
+class Capture:
+    """A capture file read back."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER_SIZE:
+            raise ValueError(f"{path} is not a brooks-sla capture")
+        magic, version, self.baudrate, self.started_at, _ = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a brooks-sla capture (version {VERSION})")
+        self._data = data
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        data = self._data
+        offset = HEADER_SIZE
+        end = len(data)
+        micros = 0
+        unpack = _RECORD.unpack_from
+        size = _RECORD.size
+        while offset + size <= end:
+            delta, direction, length = unpack(data, offset)
+            offset += size
+            micros += delta
+            if length:
+                if offset + length > end:
+                    break  # cut off mid-record, e.g. by a crash
+                yield CaptureRecord(micros / 1e6, Direction(direction), data[offset : offset + length])
+                offset += length
+
+    def stream(self, direction: Direction = Direction.RX) -> bytes:
+        """All bytes sent one way, e.g. to run HartStreamParser over real traffic."""
+        return b"".join(r.data for r in self if r.direction == direction)
+
+    @property
+    def duration(self) -> float:
+        timestamp = 0.0
+        for timestamp, _, _ in self:
+            pass
+        return timestamp
+
+
+class Replay:
+    """
+    Plays a capture back as a line: what was read is fed to the reader, at
+    the recorded pace scaled by speed or, with speed=None, as fast as the
+    bus takes it. With sync=True every reply waits until the bus has written
+    the request that preceded it in the capture and is timed from that
+    write, so a driver can be run against recorded traffic; writes that
+    differ from the capture are counted in mismatches. sync=False plays the
+    received side on its own timeline, e.g. for burst traffic.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, sync: bool = True) -> None:
+        if speed is not None and speed <= 0.0:
+            raise ValueError("speed must be positive")
+        self.capture = Capture(path)
+        self.speed = speed
+        self.sync = sync
+        self._records = list(self.capture)
+        self._expected = self.capture.stream(Direction.TX)
+        self._written = 0
+        self._written_at = 0.0
+        self._wrote = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.mismatches = 0
+
+    def open_connection(self) -> tuple[asyncio.StreamReader, "ReplayWriter"]:
+        """Reader/writer pair for BrooksBus.attach(); playback starts now."""
+        if self._task is not None:
+            self._task.cancel()
+        self._written = 0
+        reader = asyncio.StreamReader()
+        self._task = asyncio.get_running_loop().create_task(self._play(reader))
+        return reader, ReplayWriter(self)
+
+    @property
+    def finished(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    async def wait(self) -> None:
+        """Until every recorded byte has been fed."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    def _write(self, data: bytes) -> None:
+        start = self._written
+        expected = self._expected[start : start + len(data)]
+        self.mismatches += sum(a != b for a, b in zip(data, expected)) + len(data) - len(expected)
+        self._written = start + len(data)
+        self._written_at = asyncio.get_running_loop().time()
+        self._wrote.set()
+
+    async def _play(self, reader: asyncio.StreamReader) -> None:
+        loop = asyncio.get_running_loop()
+        speed = self.speed
+        anchor, anchored_at = 0.0, loop.time()
+        sent = 0
+        for timestamp, direction, data in self._records:
+            if direction == Direction.TX:
+                sent += len(data)
+                if self.sync:
+                    while self._written < sent:
+                        self._wrote.clear()
+                        await self._wrote.wait()
+                    anchor, anchored_at = timestamp, self._written_at
+                continue
+            if speed is not None:
+                delay = anchored_at + (timestamp - anchor) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            reader.feed_data(data)
+        reader.feed_eof()
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+class ReplayWriter:
+    """The write half of Replay.open_connection()."""
+
+    def __init__(self, replay: Replay) -> None:
+        self._replay = replay
+        self._closed = False
+
+    def write(self, data: bytes) -> None:
+        if self._closed:
+            raise ConnectionError("Replay connection closed")
+        self._replay._write(data)
+
+    async def drain(self) -> None:
+        return None
+
+    def close(self) -> None:
+        self._closed = True
+        self._replay.close()
+
+    def is_closing(self) -> bool:
+        return self._closed
+
+    async def wait_closed(self) -> None:
+        return None
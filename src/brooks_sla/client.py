@@ -0,0 +1,208 @@
+from typing import Any, Coroutine, Iterable, Optional, TypeVar
+import serial_asyncio
+from brooks_sla.core import FlowRateUnit, FlowReference, TemperatureUnit, ValveOverride
+from brooks_sla.driver import BrooksBus, BrooksError, BrooksSLA, FlowReading, FlowSetting, Snapshot
+from brooks_sla.group import GroupResult, SetpointTarget, set_flows
+from brooks_sla.scheduler import Priority
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+T = TypeVar("T")
+
+
+class _LoopThread:
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="brooks-sla-loop", daemon=True)
+        self.thread.start()
+
+
+_shared: Optional[_LoopThread] = None
+_shared_pid = 0
+_shared_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """The event loop shared by synchronous clients in this process, started on first use."""
+    global _shared, _shared_pid
+    with _shared_lock:
+        # A forked child inherits the object but not the thread running it.
+        if _shared is None or _shared_pid != os.getpid():
+            _shared = _LoopThread()
+            _shared_pid = os.getpid()
+        return _shared.loop
+
+
+class SyncClient:
+    """
+    Blocking access to BrooksSLA devices for code without an event loop.
+    Coroutines run on one background loop per process; buses are opened
+    once per port and shared by every device handle on it. Each call costs
+    one cross-thread hand-off, not a new loop or a reopened port.
+    """
+
+    def __init__(self, timeout: Optional[float] = 10.0, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self._loop = loop or background_loop()
+        self._timeout = timeout
+        self._buses: dict[str, BrooksBus] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SyncClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "concurrent.futures.Future[T]":
+        """Schedule coro on the background loop without waiting."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run coro on the background loop and block for its result."""
+        if _on_loop(self._loop):
+            coro.close()
+            raise RuntimeError("SyncClient called from its own event loop; await the device instead")
+        return self.submit(coro).result(self._timeout if timeout is None else timeout)
+
+    def bus(
+        self,
+        port: str,
+        baudrate: int = 19200,
+        parity: str = serial_asyncio.serial.PARITY_ODD,
+    ) -> BrooksBus:
+        """The pooled bus for port, connected on first use."""
+        with self._lock:
+            bus = self._buses.get(port)
+            if bus is None:
+                bus = BrooksBus(port, baudrate, parity=parity)
+                self.run(bus.connect())
+                self._buses[port] = bus
+            elif bus.baudrate != baudrate:
+                raise BrooksError(f"{port} is already open at {bus.baudrate} baud")
+        return bus
+
+    def add_bus(self, port: str, bus: BrooksBus) -> None:
+        """Pool an already connected bus under port, e.g. one attached to an emulator."""
+        with self._lock:
+            if port in self._buses:
+                raise BrooksError(f"{port} is already open")
+            self._buses[port] = bus
+
+    def device(
+        self,
+        tag: str,
+        port: str,
+        address: Optional[int] = None,
+        baudrate: int = 19200,
+        parity: str = serial_asyncio.serial.PARITY_ODD,
+    ) -> "SyncBrooksSLA":
+        bus = self.bus(port, baudrate, parity)
+        dev = SyncBrooksSLA(self, bus.device(tag, address))
+        if address is None and dev.device.config.address is None:
+            dev.get_address()
+        return dev
+
+    def map(self, method: str, devices: Iterable["SyncBrooksSLA"], *args: Any) -> list[Any]:
+        """Call method on every device at once and wait for all results, in order."""
+        futures = [dev.submit(method, *args) for dev in devices]
+        return [future.result(self._timeout) for future in futures]
+
+    def read_flow_many(self, devices: Iterable["SyncBrooksSLA"]) -> list[FlowReading]:
+        return self.map("read_flow", devices)
+
+    def set_flow_percent_many(self, devices: Iterable["SyncBrooksSLA"], flow: float) -> list[FlowSetting]:
+        return self.map("set_flow_percent", devices, flow)
+
+    def set_flows(
+        self,
+        flows: dict["SyncBrooksSLA", float],
+        units: FlowRateUnit = FlowRateUnit.PERCENT,
+    ) -> GroupResult:
+        """Setpoints for many devices as one group; see brooks_sla.group.set_flows."""
+        return self.run(set_flows(SetpointTarget(dev.device, flow, units) for dev, flow in flows.items()))
+
+    def close(self) -> None:
+        with self._lock:
+            buses = list(self._buses.values())
+            self._buses.clear()
+        if buses and not self._loop.is_closed():
+            self.run(_close_all(buses))
+
+
+async def _close_all(buses: list[BrooksBus]) -> None:
+    await asyncio.gather(*(bus.close() for bus in buses), return_exceptions=True)
+
+
+def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+class SyncBrooksSLA:
+    """Blocking wrapper of one BrooksSLA handle; safe to use from any thread."""
+
+    def __init__(self, client: SyncClient, device: BrooksSLA) -> None:
+        self._client = client
+        self._device = device
+
+    @property
+    def device(self) -> BrooksSLA:
+        """The underlying async handle; only use it on the client's loop."""
+        return self._device
+
+    @property
+    def tag(self) -> str:
+        return self._device.tag
+
+    def submit(self, method: str, *args: Any, **kwargs: Any) -> "concurrent.futures.Future[Any]":
+        """Start BrooksSLA.method(*args, **kwargs) and return its future."""
+        if method.startswith("_"):
+            raise BrooksError(f"{method} is not a device operation")
+        return self._client.submit(getattr(self._device, method)(*args, **kwargs))
+
+    def get_address(self) -> None:
+        self._client.run(self._device.get_address())
+
+    def read_flow(self, priority: Priority = Priority.READ) -> FlowReading:
+        return self._client.run(self._device.read_flow(priority))
+
+    def set_flow(self, units: FlowRateUnit, flow: float) -> FlowSetting:
+        return self._client.run(self._device.set_flow(units, flow))
+
+    def set_flow_percent(self, flow: float) -> FlowSetting:
+        return self._client.run(self._device.set_flow_percent(flow))
+
+    def ramp_to(self, flow: float, rate: float) -> FlowSetting:
+        return self._client.run(self._device.ramp_to(flow, rate))
+
+    def read_setpoint(self) -> FlowSetting:
+        return self._client.run(self._device.read_setpoint())
+
+    def read_valve(self) -> float:
+        return self._client.run(self._device.read_valve())
+
+    def read_snapshot(self, include_setpoint: bool = False, include_valve: bool = False) -> Snapshot:
+        return self._client.run(self._device.read_snapshot(include_setpoint, include_valve))
+
+    def select_units(self, units: FlowRateUnit, reference: FlowReference = FlowReference.CALIBRATION) -> None:
+        self._client.run(self._device.select_units(units, reference))
+
+    def select_temperature_units(self, units: TemperatureUnit) -> None:
+        self._client.run(self._device.select_temperature_units(units))
+
+    def select_gas(self, gas: int) -> None:
+        self._client.run(self._device.select_gas(gas))
+
+    def set_valve_override(self, mode: ValveOverride) -> ValveOverride:
+        return self._client.run(self._device.set_valve_override(mode))
+
+    def read_valve_override(self) -> ValveOverride:
+        return self._client.run(self._device.read_valve_override())
@@ -0,0 +1,178 @@
+from typing import Any, NamedTuple, Optional, Union
+from brooks_sla.core import Command
+import struct
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class Layout(NamedTuple):
+    """
+    Declarative description of one command. Formats are struct formats for
+    the request payload and for the response payload after the two status
+    bytes. repeat is a format decoded over and over to the end of the data
+    (collected into the last field); rest takes the remaining bytes as-is.
+    """
+    request: str
+    response: str
+    fields: tuple[str, ...]
+    repeat: Optional[str] = None
+    rest: bool = False
+
+
+def _layout(request: str, response: str, fields: str = "", repeat: Optional[str] = None, rest: bool = False) -> Layout:
+    return Layout(request, response, tuple(fields.split()), repeat, rest)
+
+
+# Vendor commands whose payload layout is not pinned down here: sent as raw
+# bytes in, with the response handed back as raw bytes.
+RAW = _layout("", "", "data", rest=True)
+
+_IDENTITY = "expansion mfg_id device_type preambles universal_revision device_revision " \
+    "software_revision hardware_revision flags device_id"
+_TAG_DESCRIPTOR_DATE = "tag descriptor day month year"
+_SETPOINT = "percent_units percent units value"
+_GAS_DENSITY = "density_units density temperature_units temperature pressure_units pressure " \
+    "flow_units full_scale"
+_CONDITIONS = "temperature_units temperature pressure_units pressure"
+
+LAYOUTS: dict[Command, Layout] = {
+    Command.READ_UNIQUE_IDENTIFIER: _layout("", ">9B3s", _IDENTITY),
+    Command.READ_PRIMARY_VARIABLE: _layout("", ">Bf", "units value"),
+    Command.READ_PRIMARY_VARIABLE_CURRENT_AND_PERCENT_RANGE: _layout("", ">ff", "current percent"),
+    Command.READ_ALL_DYNAMIC_VARIABLES_AND_CURRENT: _layout("", ">f", "current variables", repeat=">Bf"),
+    Command.WRITE_POLLING_ADDRESS: _layout(">B", ">B", "polling_address"),
+    Command.MANUAL_RS485_COMMUNICATIONS: RAW,
+    Command.READ_UNIQUE_IDENTIFIER_ASSOCIATED_WITH_TAG: _layout(">6s", ">9B3s", _IDENTITY),
+    Command.READ_MESSAGE: _layout("", ">24s", "message"),
+    Command.READ_TAG_DESCRIPTOR_DATE: _layout("", ">6s12s3B", _TAG_DESCRIPTOR_DATE),
+    Command.READ_PRIMARY_VARIABLE_SENSOR_INFORMATION: _layout(
+        "", ">3sBfff", "sensor_serial units upper_limit lower_limit minimum_span"
+    ),
+    Command.READ_OUTPUT_INFORMATION: _layout(
+        "", ">BBBfffBB",
+        "alarm_selection transfer_function range_units upper_range lower_range damping write_protect private_label",
+    ),
+    Command.READ_FINAL_ASSEMBLY_NUMBER: _layout("", ">3s", "final_assembly"),
+    Command.WRITE_MESSAGE: _layout(">24s", ">24s", "message"),
+    Command.WRITE_TAG_DESCRIPTOR_DATE: _layout(">6s12s3B", ">6s12s3B", _TAG_DESCRIPTOR_DATE),
+    Command.WRITE_FINAL_ASSEMBLY_NUMBER: _layout(">3s", ">3s", "final_assembly"),
+    Command.SET_PRIMARY_VARIABLE_LOWER_RANGE_VALUE: _layout("", ""),
+    Command.RESET_CONFIGURATION_CHANGED_FLAG: _layout("", ""),
+    Command.EEPROM_CONTROL: _layout(">B", ">B", "control"),
+    Command.PERFORM_MASTER_RESET: _layout("", ""),
+    Command.READ_ADDITIONAL_TRANSMITTER_STATUS: _layout("", "", "status", rest=True),
+    Command.READ_DYNAMIC_VARIABLE_ASSIGNMENTS: _layout("", ">4B", "pv sv tv qv"),
+    Command.WRITE_NUMBER_OF_RESPONSE_PREAMBLES: _layout(">B", ">B", "preambles"),
+    Command.WRITE_ANALOG_OUTPUT_ADDITIONAL_DAMPING: RAW,
+    Command.WRITE_BURST_MODE_COMMAND_NUMBER: _layout(">B", ">B", "command"),
+    Command.BURST_MODE_CONTROL: _layout(">B", ">B", "enabled"),
+    Command.WRITE_DEVICE_UNIQUE_ID: RAW,
+    Command.SELECT_BAUDRATE: _layout(">B", ">B", "baudrate"),
+    Command.ENTER_EXIT_WRITE_PROTECT_MODE: RAW,
+    Command.WRITE_MANUFACTURER_DEVICE_TYPE_CODE: RAW,
+    Command.READ_SERIAL_NUMBER: _layout("", "", "serial", rest=True),
+    Command.READ_MODEL_NUMBER: _layout("", "", "model", rest=True),
+    Command.READ_FIRMWARE_REVISION: _layout("", "", "revision", rest=True),
+    Command.READ_GAS_NAME: _layout(">B", "", "name", rest=True),
+    Command.READ_GAS_DENSITY_FLOW_REF_AND_FLOW_RANGE: _layout(">B", ">BfBfBfBf", _GAS_DENSITY),
+    Command.READ_FULL_SCALE_FLOW_RANGE: _layout(">B", ">Bf", "units value"),
+    Command.READ_FULL_SCALE_PRESSURE_RANGE: RAW,
+    Command.READ_CALIBRATED_PRESSURE_RANGE: RAW,
+    Command.READ_STANDARD_TEMPERATURE_AND_PRESSURE: _layout("", ">BfBf", _CONDITIONS),
+    Command.WRITE_STANDARD_TEMPERATURE_AND_PRESSURE: _layout(">BfBf", ">BfBf", _CONDITIONS),
+    Command.READ_OPERATIONAL_SETTINGS_PRESSURE: RAW,
+    Command.READ_OPERATIONAL_SETTINGS_FLOW: RAW,
+    Command.SELECT_PRESSURE_APPLICATION_NUMBER: _layout(">B", ">B", "application"),
+    Command.SELECT_GAS_CALIBRATION_FLOW_NUMBER: _layout(">B", ">B", "gas"),
+    Command.SELECT_FLOW_UNIT: _layout(">BB", ">BB", "reference units"),
+    Command.SELECT_TEMPERATURE_UNIT: _layout(">B", ">B", "units"),
+    Command.SELECT_PRESSURE_UNIT: _layout(">B", ">B", "units"),
+    Command.SELECT_PRESSURE_FLOW_CONTROL: _layout(">B", ">B", "mode"),
+    Command.READ_SETPOINT_SETTINGS: RAW,
+    Command.SELECT_SETPOINT_SOURCE: _layout(">B", ">B", "source"),
+    Command.SELECT_SOFTSTART: _layout(">B", ">B", "mode"),
+    Command.WRITE_LINEAR_SOFTSTART_RAMP_VALUE: _layout(">f", ">f", "rate"),
+    Command.READ_PID_CONTROLLER_VALUES: RAW,
+    Command.WRITE_PID_CONTROLLER_VALUES: RAW,
+    Command.READ_VALVE_RANGE_AND_OFFSET: RAW,
+    Command.WRITE_VALVE_RANGE_AND_OFFSET: RAW,
+    Command.GET_VALVE_OVERRIDE_STATUS: _layout("", ">B", "override"),
+    Command.SET_VALVE_OVERRIDE_STATUS: _layout(">B", ">B", "override"),
+    Command.READ_SETPOINT_PERCENT_AND_SELECTED_UNITS: _layout("", ">BfBf", _SETPOINT),
+    Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS: _layout(">Bf", ">BfBf", _SETPOINT),
+    Command.READ_VALVE_CONTROL_VALUE: _layout("", ">Bf", "units value"),
+    Command.READ_TOTALIZER_STATUS: _layout("", ">B", "running"),
+    Command.SET_TOTALIZER_CONTROL: _layout(">B", ">B", "control"),
+    Command.READ_TOTALIZER_VALUE_AND_UNIT: _layout("", ">Bf", "units value"),
+    Command.READ_HIGH_LOW_PRESSURE_ALARM: _layout("", ">ff", "high low"),
+    Command.WRITE_HIGH_LOW_PRESSURE_ALARM: _layout(">ff", ">ff", "high low"),
+    Command.READ_ALARM_ENABLE_SETTING: _layout("", ">B", "enabled"),
+    Command.WRITE_ALARM_ENABLE_SETTING: _layout(">B", ">B", "enabled"),
+    Command.READ_HIGH_LOW_FLOW_ALARM: _layout("", ">ff", "high low"),
+    Command.WRITE_HIGH_LOW_FLOW_ALARM: _layout(">ff", ">ff", "high low"),
+    Command.CHANGE_USER_PASSWORD: RAW,
+}
+
+
+class CommandCodec:
+    """
+    A compiled Layout: request and response structs built once, and a
+    NamedTuple result type (no per-instance dict) the response is unpacked
+    straight into from the frame buffer.
+    """
+
+    __slots__ = ("command", "layout", "result", "request_size", "response_size", "_request", "_response", "_repeat", "_new")
+
+    def __init__(self, command: int, layout: Layout) -> None:
+        self.command = command
+        self.layout = layout
+        try:
+            name = Command(command).name.title().replace("_", "")
+        except ValueError:
+            name = f"Command{int(command)}"
+        self.result: type = NamedTuple(name, [(field, Any) for field in layout.fields])
+        self._request = struct.Struct(layout.request or ">")
+        self._response = struct.Struct(layout.response or ">")
+        self._repeat = struct.Struct(layout.repeat) if layout.repeat else None
+        self.request_size = self._request.size
+        self.response_size = self._response.size
+        self._new = tuple.__new__
+
+    def encode(self, *values: Any) -> bytes:
+        """Request payload for values; raw layouts take the payload bytes themselves."""
+        if self.layout.request:
+            return self._request.pack(*values)
+        if values:
+            if not self.layout.rest:
+                raise TypeError(f"{self.result.__name__} takes no request fields")
+            return bytes(values[0])
+        return b""
+
+    def decode(self, data: Buffer, offset: int = 0) -> Any:
+        """Result for the response payload in data starting at offset (2 skips the status bytes)."""
+        response = self._response
+        if self._repeat is None and not self.layout.rest:
+            return self._new(self.result, response.unpack_from(data, offset))
+        values = response.unpack_from(data, offset)
+        offset += response.size
+        if self.layout.rest:
+            return self._new(self.result, values + (bytes(data[offset:]),))
+        repeat = self._repeat
+        groups = tuple(repeat.iter_unpack(data[offset : offset + (len(data) - offset) // repeat.size * repeat.size]))
+        return self._new(self.result, values + (groups,))
+
+
+CODECS: dict[int, CommandCodec] = {int(command): CommandCodec(command, layout) for command, layout in LAYOUTS.items()}
+
+
+def codec(command: int) -> CommandCodec:
+    try:
+        return CODECS[command]
+    except KeyError:
+        raise KeyError(f"No codec registered for command {command}") from None
+
+
+def register(command: int, layout: Layout) -> CommandCodec:
+    """Add or replace the codec for command, e.g. for a firmware-specific layout."""
+    compiled = CODECS[int(command)] = CommandCodec(command, layout)
+    return compiled
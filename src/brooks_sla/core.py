@@ -1,4 +1,5 @@
 from enum import IntEnum
+from typing import NamedTuple
 from pydantic import BaseModel, Field, model_validator
 from enum import IntEnum
 
@@ -117,6 +118,111 @@ class DensityUnit(IntEnum):
     GRAMS_PER_L = 97
     LBS_PER_IN3 = 98
 
+class BaudRate(IntEnum):
+    """
+    Rate codes sent with SELECT_BAUDRATE
+    """
+    BAUD_1200 = 0
+    BAUD_2400 = 1
+    BAUD_4800 = 2
+    BAUD_9600 = 3
+    BAUD_19200 = 4
+    BAUD_38400 = 5
+
+    @property
+    def rate(self) -> int:
+        return int(self.name[5:])
+
+    @classmethod
+    def from_rate(cls, rate: int) -> "BaudRate":
+        try:
+            return cls[f"BAUD_{rate}"]
+        except KeyError:
+            raise ValueError(f"Unsupported baud rate: {rate}") from None
+
+
+class SoftstartMode(IntEnum):
+    """
+    Selection codes sent with SELECT_SOFTSTART
+    """
+    DISABLED = 0
+    LINEAR = 1  # setpoint changes ramp at the WRITE_LINEAR_SOFTSTART_RAMP_VALUE rate (%/s)
+
+
+class ValveOverride(IntEnum):
+    """
+    Selection codes sent with SET_VALVE_OVERRIDE_STATUS
+    """
+    NORMAL = 0  # the valve follows the setpoint
+    CLOSED = 1
+    OPEN = 2
+
+
+class CommunicationFlags(NamedTuple):
+    raw: int
+    communication_error: bool  # bit 7
+    parity_error: bool         # bit 6
+    overrun_error: bool        # bit 5
+    framing_error: bool        # bit 4
+    checksum_error: bool       # bit 3
+    reserved: bool             # bit 2
+    rx_buffer_overflow: bool   # bit 1
+    undefined: bool            # bit 0
+
+    def model(self) -> "CommunicationStatus":
+        return CommunicationStatus(raw=self.raw)
+
+
+class CommandFlags(NamedTuple):
+    raw: int
+    device_malfunction: bool  # bit 7
+    error_code: int           # bits 6–0
+    configuration_changed: bool
+    cold_start: bool
+    more_status_available: bool
+    primary_var_fixed: bool
+    primary_var_saturated: bool
+    non_primary_out_of_range: bool
+    primary_var_out_of_range: bool
+
+    def model(self) -> "CommandStatus":
+        return CommandStatus(raw=self.raw)
+
+
+def _communication_flags(v: int) -> CommunicationFlags:
+    return CommunicationFlags(
+        v,
+        bool(v & 0x80),
+        bool(v & 0x40),
+        bool(v & 0x20),
+        bool(v & 0x10),
+        bool(v & 0x08),
+        bool(v & 0x04),
+        bool(v & 0x02),
+        bool(v & 0x01),
+    )
+
+
+def _command_flags(v: int) -> CommandFlags:
+    code = v & 0x7F
+    return CommandFlags(
+        v,
+        bool(v & 0x80),
+        code,
+        code == 6,
+        code == 5,
+        code == 4,
+        code == 3,
+        code == 2,
+        code == 1,
+        code == 0,
+    )
+
+
+# Decoded status for every possible byte value, indexed by the raw byte.
+COMMUNICATION_STATUS_TABLE: tuple[CommunicationFlags, ...] = tuple(_communication_flags(v) for v in range(256))
+COMMAND_STATUS_TABLE: tuple[CommandFlags, ...] = tuple(_command_flags(v) for v in range(256))
+
 
 class CommunicationStatus(BaseModel):
     raw: int = Field(..., ge=0, le=0xFF)
@@ -132,15 +238,15 @@ class CommunicationStatus(BaseModel):
 
     @model_validator(mode="after")
     def decode_bits(self):
-        v = self.raw
-        self.communication_error = bool(v & 0x80)
-        self.parity_error = bool(v & 0x40)
-        self.overrun_error = bool(v & 0x20)
-        self.framing_error = bool(v & 0x10)
-        self.checksum_error = bool(v & 0x08)
-        self.reserved = bool(v & 0x04)
-        self.rx_buffer_overflow = bool(v & 0x02)
-        self.undefined = bool(v & 0x01)
+        flags = COMMUNICATION_STATUS_TABLE[self.raw]
+        self.communication_error = flags.communication_error
+        self.parity_error = flags.parity_error
+        self.overrun_error = flags.overrun_error
+        self.framing_error = flags.framing_error
+        self.checksum_error = flags.checksum_error
+        self.reserved = flags.reserved
+        self.rx_buffer_overflow = flags.rx_buffer_overflow
+        self.undefined = flags.undefined
         return self
 
 class CommandStatus(BaseModel):
@@ -157,16 +263,16 @@ class CommandStatus(BaseModel):
 
     @model_validator(mode="after")
     def decode(self):
-        v = self.raw
-        self.device_malfunction = bool(v & 0x80)
-        self.error_code = v & 0x7F
-        self.configuration_changed = self.error_code == 6
-        self.cold_start = self.error_code == 5
-        self.more_status_available = self.error_code == 4
-        self.primary_var_fixed = self.error_code == 3
-        self.primary_var_saturated = self.error_code == 2
-        self.non_primary_out_of_range = self.error_code == 1
-        self.primary_var_out_of_range = self.error_code == 0
+        flags = COMMAND_STATUS_TABLE[self.raw]
+        self.device_malfunction = flags.device_malfunction
+        self.error_code = flags.error_code
+        self.configuration_changed = flags.configuration_changed
+        self.cold_start = flags.cold_start
+        self.more_status_available = flags.more_status_available
+        self.primary_var_fixed = flags.primary_var_fixed
+        self.primary_var_saturated = flags.primary_var_saturated
+        self.non_primary_out_of_range = flags.non_primary_out_of_range
+        self.primary_var_out_of_range = flags.primary_var_out_of_range
         return self
 
 class CommandErrorId(IntEnum):
@@ -190,6 +296,11 @@ class CommandErrorId(IntEnum):
     DEVICE_BUSY = 32
     COMMAND_NOT_IMPLEMENTED = 64
 
+# Response codes HART classes as warnings: the command was carried out and
+# the reply carries valid data, e.g. 8 "set to nearest possible value".
+# Any other nonzero code is an error.
+WARNING_RESPONSE_CODES = frozenset((8, 14, 24, 25, 26, 27, 30, 31, *range(96, 128)))
+
 class DeviceStatus(BaseModel):
     comms: CommunicationStatus
     command: CommandStatus
@@ -225,6 +336,8 @@ class Command(IntEnum):
     READ_DYNAMIC_VARIABLE_ASSIGNMENTS = 50
     WRITE_NUMBER_OF_RESPONSE_PREAMBLES = 59
     WRITE_ANALOG_OUTPUT_ADDITIONAL_DAMPING = 64
+    WRITE_BURST_MODE_COMMAND_NUMBER = 108
+    BURST_MODE_CONTROL = 109
     WRITE_DEVICE_UNIQUE_ID = 122
     SELECT_BAUDRATE = 123
     ENTER_EXIT_WRITE_PROTECT_MODE = 128  # NON-PUBLIC
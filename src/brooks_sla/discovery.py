@@ -0,0 +1,217 @@
+from typing import Iterable, Optional
+from pydantic import BaseModel
+from brooks_sla.core import Command, FlowRateUnit
+from brooks_sla.driver import BrooksBus, BrooksSLA, FlowRange, ResponseError
+from brooks_sla.hart import FrameType, HartFrame, HartProtocolError, ShortAddress, pack_ascii_batch, unpack_ascii
+import asyncio
+import hart_protocol
+import json
+import os
+import struct
+import time
+
+
+REGISTRY_VERSION = 1
+
+
+class DeviceRecord(BaseModel):
+    """What discovery learned about one device."""
+    tag: Optional[str] = None  # None if the device answered but its tag could not be read
+    address: int  # identification number, the low 3 bytes of the long address
+    polling_address: Optional[int] = None
+    mfg_id: int = 0
+    device_type: int = 0
+    model: Optional[str] = None
+    serial: Optional[str] = None
+    flow_units: Optional[FlowRateUnit] = None
+    flow_ranges: dict[int, FlowRange] = {}
+    seen_at: float = 0.0  # wall clock time of the last successful contact
+
+
+class _RegistryFile(BaseModel):
+    version: int = REGISTRY_VERSION
+    devices: dict[str, DeviceRecord] = {}
+
+
+class DeviceRegistry:
+    """
+    Device records keyed by tag, persisted as JSON at path. restore() builds
+    handles from it without touching the bus; each one is verified by its
+    first transaction and re-resolved by tag if its cached address is silent.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._records: dict[str, DeviceRecord] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                registry = _RegistryFile.model_validate(json.load(f))
+            if registry.version == REGISTRY_VERSION:
+                self._records = registry.devices
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def records(self) -> list[DeviceRecord]:
+        return list(self._records.values())
+
+    def get(self, tag: str) -> Optional[DeviceRecord]:
+        return self._records.get(tag)
+
+    def update(self, record: DeviceRecord) -> None:
+        self._records[record.tag] = record
+
+    def remove(self, tag: str) -> None:
+        self._records.pop(tag, None)
+
+    def readdress(self, tag: str, address: Optional[int]) -> None:
+        """Record a new address found for tag and save."""
+        record = self._records.get(tag)
+        if record is None or address is None:
+            return
+        self._records[tag] = record.model_copy(update={"address": address, "seen_at": time.time()})
+        self.save()
+
+    def save(self) -> None:
+        text = _RegistryFile(devices=self._records).model_dump_json(indent=2)
+        with open(self._path + ".tmp", "w") as f:
+            f.write(text)
+        os.replace(self._path + ".tmp", self._path)
+
+    def restore(self, bus: BrooksBus, tags: Optional[Iterable[str]] = None) -> list[BrooksSLA]:
+        """Handles on bus for the cached devices (or just tags), trusted until they fail."""
+        selected = self._records.values() if tags is None else (self._records[t] for t in tags if t in self._records)
+        handles = []
+        for record in selected:
+            dev = bus.device(record.tag, address=record.address)
+            dev._config.flow_ranges.update(record.flow_ranges)
+            dev._unverified = True
+            dev._registry = self
+            handles.append(dev)
+        return handles
+
+
+async def discover(
+    bus: BrooksBus,
+    tags: Iterable[str] = (),
+    polling_addresses: Iterable[int] = (),
+    probe_timeout: float = 0.05,
+    registry: Optional[DeviceRegistry] = None,
+    details: bool = True,
+) -> list[DeviceRecord]:
+    """
+    Find devices on bus by tag (command 11) and by polling address
+    (command 0). All probes are queued at once and each waits at most
+    probe_timeout beyond wire time, so an absent device costs little. With
+    details, model, serial, flow units and the gas 1 range are read from
+    every device found. A device that fails while its tag or details are
+    read keeps what was learned so far; records without a tag are returned
+    but not stored in registry, which is keyed by tag.
+    """
+    tags = list(tags)
+    probes = [
+        _probe(bus, hart_protocol.universal.read_unique_identifier_associated_with_tag(packed), probe_timeout)
+        for packed in pack_ascii_batch(tag[-8:] for tag in tags)
+    ] + [
+        _probe(bus, _short_request(n, Command.READ_UNIQUE_IDENTIFIER), probe_timeout, polling_address=n)
+        for n in polling_addresses
+    ]
+    found = await asyncio.gather(*probes)
+    records: dict[int, DeviceRecord] = {}
+    for tag, record in zip(tags + [None] * len(found), found):
+        if record is None:
+            continue
+        if tag is not None:
+            record.tag = tag
+        known = records.get(record.address)
+        if known is None:
+            records[record.address] = record
+        else:
+            # Found both ways: keep the caller's tag and the polling address
+            known.tag = known.tag or record.tag
+            if known.polling_address is None:
+                known.polling_address = record.polling_address
+
+    results = list(records.values())
+    outcomes = await asyncio.gather(*(_complete(bus, record, details) for record in results), return_exceptions=True)
+    for outcome in outcomes:
+        # One misbehaving device must not cost the others; cancellation still propagates
+        if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+            raise outcome
+    if registry is not None:
+        for record in results:
+            if record.tag is not None:
+                registry.update(record)
+        registry.save()
+    return results
+
+
+def _short_request(polling_address: int, command: int) -> bytes:
+    return HartFrame(
+        preamble_chars=5,
+        frame_type=FrameType.SHORT_STX_FRAME,
+        address=ShortAddress(slave=polling_address),
+        command=command,
+        data=None,
+    ).to_packet()
+
+
+async def _probe(
+    bus: BrooksBus,
+    request: bytes,
+    probe_timeout: float,
+    polling_address: Optional[int] = None,
+) -> Optional[DeviceRecord]:
+    try:
+        # No answer is the expected result for a missing device; one try is enough
+        response = await bus.transaction(request, allowance=probe_timeout, retry=False)
+    except (TimeoutError, HartProtocolError):
+        return None
+    if response.response_code or len(response.data) < 12:
+        return None
+    return DeviceRecord(
+        address=int.from_bytes(response.data[9:12], "big"),
+        polling_address=polling_address,
+        mfg_id=response.data[1],
+        device_type=response.data[2],
+        seen_at=time.time(),
+    )
+
+
+async def _complete(bus: BrooksBus, record: DeviceRecord, details: bool) -> DeviceRecord:
+    if not record.tag:
+        record.tag = await _read_tag(bus, record.address)
+    if not details:
+        return record
+    # Without a tag the handle is not registered on the bus
+    dev = bus.device(record.tag, address=record.address) if record.tag else BrooksSLA("", bus=bus, address=record.address)
+    record.model = await _read_text(dev, Command.READ_MODEL_NUMBER)
+    record.serial = await _read_text(dev, Command.READ_SERIAL_NUMBER)
+    try:
+        flow_range = await dev.read_flow_range(1)
+        record.flow_ranges = {1: flow_range}
+        record.flow_units = flow_range.units
+    except (TimeoutError, HartProtocolError, ResponseError, ValueError, struct.error):
+        pass
+    return record
+
+
+async def _read_tag(bus: BrooksBus, address: int) -> Optional[str]:
+    request = hart_protocol.tools.pack_command(address, int(Command.READ_TAG_DESCRIPTOR_DATE))
+    try:
+        response = await bus.transaction(request)
+    except (TimeoutError, HartProtocolError):
+        return None
+    if response.response_code or len(response.data) < 6:
+        return None
+    return unpack_ascii(response.data[:6]).rstrip()
+
+
+async def _read_text(dev: BrooksSLA, command: Command) -> Optional[str]:
+    try:
+        response = await dev.transaction(dev.construct_command(command))
+    except (TimeoutError, HartProtocolError, ResponseError):
+        return None
+    return response.data.rstrip(b"\x00 ").decode("latin-1")
@@ -1,20 +1,77 @@
-from typing import Optional
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Iterable, NamedTuple, Optional, Union
 from pydantic import BaseModel
 import serial_asyncio
-from brooks_sla.core import Command, FlowRateUnit, FlowReference, TemperatureUnit
+from brooks_sla.core import (
+    COMMAND_STATUS_TABLE,
+    BaudRate,
+    COMMUNICATION_STATUS_TABLE,
+    Command,
+    CommandErrorId,
+    CommandFlags,
+    CommunicationFlags,
+    FlowRateUnit,
+    FlowReference,
+    SoftstartMode,
+    TemperatureUnit,
+    ValveOverride,
+    WARNING_RESPONSE_CODES,
+)
+from brooks_sla.burst import BurstListener, BurstStream
+from brooks_sla.codec import CODECS, CommandCodec
+from brooks_sla.hart import (
+    HartFrameView,
+    HartProtocolError,
+    HartStreamParser,
+    RequestTemplate,
+    hart_checksum,
+    pack_ascii,
+    same_device,
+)
+from brooks_sla.metrics import BusMetrics
+from brooks_sla.recovery import IDEMPOTENT_COMMANDS, BreakerPolicy, CircuitBreaker, DeviceUnavailable, RetryPolicy
+from brooks_sla.scheduler import DeadlineMissed, Priority, TransactionScheduler
+from brooks_sla.timing import MARGIN_CHARS, TurnaroundEstimator, response_chars
 import asyncio
 import hart_protocol
 import struct
 
-class FlowReading(BaseModel):
+if TYPE_CHECKING:
+    from brooks_sla.capture import CaptureFile
+    from brooks_sla.discovery import DeviceRegistry
+    from brooks_sla.group import GroupResult
+    from brooks_sla.ramp import RampSegment, SegmentRun
+    from brooks_sla.stream import FlowBatch, FlowRing
+    from brooks_sla.units import UnitConverter
+
+_Connection = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+_GATEWAY_URLS = ("tcp://", "rfc2217://")
+# Reopens an attached line at a new baud rate
+Reopener = Callable[[int], Union[_Connection, Awaitable[_Connection]]]
+
+class FlowReadingModel(BaseModel):
+    reading: float
+    units: FlowRateUnit
+
+class FlowSettingModel(BaseModel):
+    percent: float
+    units: FlowRateUnit
+    value: float
+
+class FlowReading(NamedTuple):
     reading: float
     units: FlowRateUnit
 
-class FlowSetting(BaseModel):
+    def model(self) -> FlowReadingModel:
+        return FlowReadingModel(reading=self.reading, units=self.units)
+
+class FlowSetting(NamedTuple):
     percent: float
     units: FlowRateUnit
     value: float
 
+    def model(self) -> FlowSettingModel:
+        return FlowSettingModel(percent=self.percent, units=self.units, value=self.value)
+
 class FlowRange(BaseModel):
     units: FlowRateUnit
     value: float
@@ -23,6 +80,60 @@ class TempReading(BaseModel):
     reading: float
     units: TemperatureUnit
 
+TEMPERATURE_UNIT_CODES = frozenset(int(u) for u in TemperatureUnit)
+_RAMP = struct.Struct(">f")
+_PRIMARY = CODECS[Command.READ_PRIMARY_VARIABLE]
+_WRITE_SETPOINT = CODECS[Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS]
+
+class DynamicVariable(NamedTuple):
+    value: float
+    units: int
+
+class Snapshot(NamedTuple):
+    """
+    Loop current and dynamic variables (PV, SV, TV, QV as reported) from one
+    READ_ALL_DYNAMIC_VARIABLES_AND_CURRENT, plus the optional extra reads.
+    """
+    current: float
+    variables: tuple[DynamicVariable, ...]
+    setpoint: Optional[FlowSetting] = None
+    valve: Optional[float] = None
+
+    @property
+    def flow(self) -> FlowReading:
+        pv = self.variables[0]
+        return FlowReading(pv.value, FlowRateUnit(pv.units))
+
+    @property
+    def temperature(self) -> Optional[TempReading]:
+        for variable in self.variables[1:]:
+            if variable.units in TEMPERATURE_UNIT_CODES:
+                return TempReading(reading=variable.value, units=TemperatureUnit(variable.units))
+        return None
+
+class DeviceConfig(BaseModel):
+    """
+    Cached device configuration. Everything but the address is dropped when
+    the device reports a configuration change or cold start.
+    """
+    address: Optional[int] = None
+    flow_units: Optional[FlowRateUnit] = None
+    flow_reference: Optional[FlowReference] = None
+    temp_units: Optional[TemperatureUnit] = None
+    gas: Optional[int] = None
+    flow_ranges: dict[int, FlowRange] = {}
+    softstart: Optional[SoftstartMode] = None
+    ramp_rate: Optional[float] = None  # %/s
+
+    def invalidate(self) -> None:
+        self.flow_units = None
+        self.flow_reference = None
+        self.temp_units = None
+        self.gas = None
+        self.flow_ranges = {}
+        self.softstart = None
+        self.ramp_rate = None
+
 class HartResponseFrame(BaseModel):
     command: int
     bytecount: int
@@ -32,36 +143,275 @@ class HartResponseFrame(BaseModel):
     device_status: bytes
     response_code: bytes
 
+class HartResponse:
+    """
+    Decoded response on the hot path. data is the payload after the status
+    bytes; the pydantic HartResponseFrame is only built on model().
+    """
+
+    __slots__ = ("command", "bytecount", "address", "response_code", "device_status", "data", "_raw")
+
+    def __init__(
+        self,
+        command: int,
+        bytecount: int,
+        address: int,
+        response_code: int,
+        device_status: int,
+        data: bytes,
+        raw: bytes,
+    ) -> None:
+        self.command = command
+        self.bytecount = bytecount
+        self.address = address
+        self.response_code = response_code
+        self.device_status = device_status
+        self.data = data
+        self._raw = raw
+
+    @classmethod
+    def from_frame(cls, frame: HartFrameView) -> "HartResponse":
+        raw = bytes(frame.raw)
+        bc = frame.byte_count
+        return cls(
+            frame.command,
+            bc,
+            frame.address_int,
+            raw[-bc - 1] if bc >= 1 else 0,
+            raw[-bc] if bc >= 2 else 0,
+            raw[-bc + 1 : -1] if bc > 2 else b"",
+            raw,
+        )
+
+    @property
+    def full_response(self) -> bytes:
+        return self._raw[:-1]
+
+    @property
+    def communication_status(self) -> CommunicationFlags:
+        return COMMUNICATION_STATUS_TABLE[self.response_code]
+
+    @property
+    def command_status(self) -> CommandFlags:
+        return COMMAND_STATUS_TABLE[self.device_status]
+
+    def model(self) -> HartResponseFrame:
+        return HartResponseFrame(
+            command=self.command,
+            bytecount=self.bytecount,
+            address=self.address,
+            data=self.data,
+            full_response=self.full_response,
+            device_status=bytes([self.device_status]),
+            response_code=bytes([self.response_code]),
+        )
+
 
 class BrooksError(Exception):
     """Base Brooks Exception Code"""
 
-class BrooksSLA:
+class ResponseError(BrooksError):
+    """The device answered, but with a nonzero command response code."""
 
-    def __init__(self, tag: str, port: str, baudrate: int = 19200, address: Optional[int] = None) -> None:
-        self._raw_tag = tag
-        self._tag = hart_protocol.tools.pack_ascii(tag[-8:])
+    def __init__(self, command: int, response_code: int) -> None:
+        super().__init__(command, response_code)
+        self.command = command
+        self.response_code = response_code
+
+    def __str__(self) -> str:
+        return f"Command {self.command} failed with response code {self.response_code}"
+
+class BrooksBus:
+    """
+    One RS-485 line: owns the serial connection and framing state and
+    serializes transactions for every device handle bound to it.
+    """
+
+    def __init__(
+        self,
+        port: str,
+        baudrate: int = 19200,
+        gap_chars: float = 3.5,
+        response_preambles: int = 5,
+        parity: str = serial_asyncio.serial.PARITY_ODD,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[BreakerPolicy] = None,
+    ) -> None:
         self._port = port
         self._baudrate = baudrate
-        self._parity = serial_asyncio.serial.PARITY_ODD
+        self._parity = parity
         self._stop_bits = serial_asyncio.serial.STOPBITS_ONE
-        self._temp_units: Optional[TemperatureUnit] = None
-        self._flow_units: Optional[FlowRateUnit] = None
         self._reader: Optional[asyncio.StreamReader] = None
         self._writer: Optional[asyncio.StreamWriter] = None
-        self._address: Optional[int] = None
-        self._lock = asyncio.Lock()
-        self._timeout = 1.0
+        self._parser = HartStreamParser()
+        self._scheduler = TransactionScheduler()
+        self._timeout = 1.0  # upper bound for any single response
+        self._response_preambles = response_preambles
+        # per (device address, command): a slow configuration write must not
+        # be timed by what fast reads of the same device taught
+        self._turnaround: dict[tuple[bytes, int], TurnaroundEstimator] = {}
+        self._gap_chars = gap_chars
+        self._ready_at = 0.0
+        self._devices: dict[str, "BrooksSLA"] = {}
+        self._listener: Optional[BurstListener] = None
+        self._reopener: Optional[Reopener] = None
+        self._metrics: Optional[BusMetrics] = None
+        self.retry_policy = retry or RetryPolicy()
+        self.breaker_policy = breaker or BreakerPolicy()
+        self._breakers: dict[bytes, CircuitBreaker] = {}
+        self._capture: Optional["CaptureFile"] = None
+        self._gate: Optional[asyncio.Semaphore] = None  # shared by the lines of one gateway
+
+    @property
+    def port(self) -> str:
+        return self._port
+
+    @property
+    def baudrate(self) -> int:
+        return self._baudrate
+
+    @property
+    def metrics(self) -> Optional[BusMetrics]:
+        return self._metrics
+
+    def enable_metrics(self) -> BusMetrics:
+        """Start collecting wire-level metrics; returns the (kept) collector."""
+        if self._metrics is None:
+            self._metrics = BusMetrics(self)
+        return self._metrics
+
+    def disable_metrics(self) -> None:
+        self._metrics = None
+
+    @property
+    def char_time(self) -> float:
+        """Seconds on the wire per character (start + 8 data + parity + stop)."""
+        bits = 1 + 8 + (0 if self._parity == serial_asyncio.serial.PARITY_NONE else 1) + self._stop_bits
+        return bits / self._baudrate
+
+    @property
+    def frame_gap(self) -> float:
+        """Minimum idle time between the end of one frame and the next request."""
+        return self._gap_chars * self.char_time
+
+    def device(self, tag: str, address: Optional[int] = None) -> "BrooksSLA":
+        """Return the handle for tag on this bus, creating it on first use."""
+        dev = self._devices.get(tag)
+        if dev is None:
+            dev = BrooksSLA(tag, address=address, bus=self)
+            self._devices[tag] = dev
+        elif address is not None:
+            dev._address = address
+        return dev
+
+    @property
+    def scheduler(self) -> TransactionScheduler:
+        return self._scheduler
+
+    def hold(self, priority: Priority = Priority.SETPOINT, deadline: Optional[float] = None) -> "HeldBus":
+        """
+        Async context manager keeping the line for a run of back-to-back
+        exchanges, with nothing else queued for the bus in between.
+        """
+        return HeldBus(self, priority, deadline)
+
+    async def set_flows(
+        self,
+        flows: dict[str, float],
+        units: FlowRateUnit = FlowRateUnit.PERCENT,
+        priority: Priority = Priority.SETPOINT,
+    ) -> "GroupResult":
+        """
+        Write a setpoint to each device tag in flows as one group. See
+        brooks_sla.group.set_flows.
+        """
+        from brooks_sla.group import SetpointTarget, set_flows
+
+        return await set_flows((SetpointTarget(self.device(tag), flow, units) for tag, flow in flows.items()), priority)
+
+    @property
+    def devices(self) -> list["BrooksSLA"]:
+        return list(self._devices.values())
 
     async def connect(self) -> None:
+        """
+        Open the port: a serial device or pyserial URL, or a line behind an
+        Ethernet gateway as tcp://host:port (raw) or rfc2217://host:port,
+        connected through the gateway pool of the running loop.
+        """
+        if self._port.startswith(_GATEWAY_URLS):
+            from brooks_sla.gateway import gateway_pool
+
+            pool = gateway_pool()
+            reader, writer = await pool.acquire(self._port, self._baudrate, self._parity)
+            self.attach(reader, writer)
+            self._gate = writer.line.gate
+            return
         reader, writer = await serial_asyncio.open_serial_connection(
             url=self._port,
             baudrate=self._baudrate,
+            parity=self._parity,
+            stopbits=self._stop_bits,
         )
+        self.attach(reader, writer)
+
+    def attach(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        reopen: Optional[Reopener] = None,
+    ) -> None:
+        """
+        Use an already open reader/writer pair as the line. reopen(baudrate)
+        returns a new pair at another rate; without it the port is reopened.
+        """
+        self._reopener = reopen
         self._reader = reader
         self._writer = writer
+        self._gate = None
+        if self._capture is not None:
+            self._reader, self._writer = self._capture.wrap(reader, writer)
+        self._parser.clear()
+        self._ready_at = 0.0
+
+    def start_capture(self, path: str) -> "CaptureFile":
+        """
+        Record all traffic on the line to path, with timestamps, until
+        stop_capture() or close(); reopening the line keeps recording. See
+        brooks_sla.capture for reading and replaying it.
+        """
+        from brooks_sla.capture import CaptureFile
+
+        if self._listener is not None:
+            raise BrooksError("Start the capture before the burst listener")
+        self.stop_capture()
+        self._capture = CaptureFile(path, self._baudrate)
+        if self._reader is not None and self._writer is not None:
+            self._reader, self._writer = self._capture.wrap(self._reader, self._writer)
+        return self._capture
+
+    def stop_capture(self) -> None:
+        capture, self._capture = self._capture, None
+        if capture is None:
+            return
+        from brooks_sla.capture import RecordingReader, RecordingWriter
+
+        if isinstance(self._reader, RecordingReader):
+            self._reader = self._reader._reader
+        if isinstance(self._writer, RecordingWriter):
+            self._writer = self._writer._writer
+        capture.close()
+
+    @property
+    def connected(self) -> bool:
+        return self._reader is not None and self._writer is not None
 
     async def close(self) -> None:
+        await self._close_line()
+        self.stop_capture()
+
+    async def _close_line(self) -> None:
+        await self.stop_burst_listener()
         if self._writer is not None:
             self._writer.close()
             try:
@@ -71,38 +421,570 @@ class BrooksSLA:
         self._reader = None
         self._writer = None
 
+    async def reopen(self, baudrate: int) -> None:
+        """Close the line and open it again at baudrate."""
+        reopener = self._reopener
+        await self._close_line()
+        self._baudrate = baudrate
+        if reopener is None:
+            await self.connect()
+            return
+        connection = reopener(baudrate)
+        if not isinstance(connection, tuple):
+            connection = await connection
+        self.attach(*connection, reopen=reopener)
+
     def _ensure_connected(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
         if self._reader is None or self._writer is None:
             raise RuntimeError("Not connected. Call await connect() first.")
         return self._reader, self._writer
 
-    async def flush_input(self) -> None:
+    async def flush_input(self, quiet: Optional[float] = None) -> None:
+        """
+        Discard input until the line has been idle for quiet seconds (by
+        default one frame gap plus a few characters), at most the bus timeout.
+        """
         reader, _ = self._ensure_connected()
+        self._parser.clear()
+        if self._listener is not None:
+            return  # the listener owns the reader and keeps it drained
+        if quiet is None:
+            quiet = self.frame_gap + MARGIN_CHARS * self.char_time
+        try:
+            async with asyncio.timeout(self._timeout):
+                while True:
+                    try:
+                        async with asyncio.timeout(quiet):
+                            chunk = await reader.read(1024)
+                    except TimeoutError:
+                        return
+                    if not chunk:
+                        return
+        except TimeoutError:
+            return
+
+    @property
+    def burst_listener(self) -> Optional[BurstListener]:
+        return self._listener
+
+    def start_burst_listener(self, queue_size: int = 256) -> BurstListener:
+        """
+        Hand the read side of the line to a BurstListener. Transactions keep
+        working; their responses are picked out of the burst traffic.
+        """
+        if self._listener is None:
+            self._listener = BurstListener(self, queue_size)
+        self._listener.start()
+        return self._listener
+
+    async def stop_burst_listener(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            await listener.stop()
+
+    async def transaction(
+        self,
+        data: bytes,
+        priority: Priority = Priority.READ,
+        deadline: Optional[float] = None,
+        allowance: Optional[float] = None,
+        retry: Optional[bool] = None,
+    ) ->  HartResponse:
+        return HartResponse.from_frame(await self.exchange(data, priority, deadline, allowance, retry))
+
+    async def exchange(
+        self,
+        data: bytes,
+        priority: Priority = Priority.READ,
+        deadline: Optional[float] = None,
+        allowance: Optional[float] = None,
+        retry: Optional[bool] = None,
+    ) -> HartFrameView:
+        """
+        Like transaction() but returns the parser's frame view. The view is
+        only valid until the next transaction, so decode it before awaiting.
+        While a burst listener runs, requests are written between frames and
+        the response is routed back by the listener. allowance caps the
+        device turnaround waited for on top of wire time, e.g. for probes.
+
+        Reads are sent again per retry_policy after a timeout, a malformed
+        reply or DEVICE_BUSY; writes only with retry=True. Timeouts are only
+        retried for devices that have answered before, never for broadcasts.
+        Each attempt queues
+        for the bus anew. A device that keeps timing out is skipped for the
+        breaker cooldown, failing with DeviceUnavailable without using the line.
+        """
+        self._ensure_connected()
+        header = self._request_header(data)
+        address, command = header
+        if retry is None:
+            retry = command in IDEMPOTENT_COMMANDS
+        policy = self.retry_policy
+        attempts = policy.attempts if retry else 1
+        breaker = self._breaker(address)
+        loop = asyncio.get_running_loop()
+        backoff = policy.backoff
+        attempt = 1
         while True:
+            if breaker is not None and not breaker.allows(loop.time()):
+                raise DeviceUnavailable(f"Device {address.hex()} is not answering; skipped for now")
             try:
-                chunk = await asyncio.wait_for(reader.read(1024), timeout=0.05)
-            except asyncio.TimeoutError:
-                return
-            if not chunk:
-                return
+                async with self._scheduler.slot(priority, deadline):
+                    frame = await self._exchange(data, allowance, header)
+            except DeadlineMissed:
+                raise
+            except TimeoutError:
+                opened = breaker is not None and breaker.failure(loop.time())
+                # A device that never answered is more likely absent than unlucky.
+                # Broadcasts (no breaker) share one estimator across every tag
+                # probed, so an answer to one says nothing about the next.
+                if opened or attempt == attempts or breaker is None or not self._has_answered(address):
+                    raise
+            except HartProtocolError:
+                if attempt == attempts:
+                    raise
+            else:
+                if breaker is not None:
+                    breaker.success()
+                if frame.response_code != CommandErrorId.DEVICE_BUSY or attempt == attempts:
+                    return frame
+            if self._metrics is not None:
+                self._metrics.retry(address)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, policy.max_backoff)
+            attempt += 1
 
-    async def transaction(self, data: bytes) ->  HartResponseFrame:
+    def _breaker(self, address: bytes) -> Optional[CircuitBreaker]:
+        """The breaker for a device address; None for broadcasts, which no single device owns."""
+        breaker = self._breakers.get(address)
+        if breaker is None:
+            if len(address) == 5 and not any(address[2:]):
+                return None
+            breaker = self._breakers[address] = CircuitBreaker(self.breaker_policy)
+        return breaker
+
+    def device_unavailable(self, address: int) -> bool:
+        """Whether requests to the device with identification number address are being skipped."""
+        now = asyncio.get_running_loop().time()
+        return any(
+            breaker.is_open(now)
+            for key, breaker in self._breakers.items()
+            if len(key) == 5 and int.from_bytes(key[2:], "big") == address
+        )
+
+    async def _exchange(
+        self,
+        data: bytes,
+        allowance: Optional[float] = None,
+        header: Optional[tuple[bytes, int]] = None,
+    ) -> HartFrameView:
+        """One request/response; the caller holds the scheduler slot."""
+        gate = self._gate
+        if gate is None:
+            return await self._transfer(data, allowance, header)
+        async with gate:
+            return await self._transfer(data, allowance, header)
+
+    async def _transfer(
+        self,
+        data: bytes,
+        allowance: Optional[float] = None,
+        header: Optional[tuple[bytes, int]] = None,
+    ) -> HartFrameView:
         reader, writer = self._ensure_connected()
-        async with self._lock:
+        loop = asyncio.get_running_loop()
+        delay = self._ready_at - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        address, command = header or self._request_header(data)
+        estimator = self._estimator(address, command)
+        wire = self._wire_time(data, address, command)
+        listener = self._listener
+        metrics = self._metrics
+        try:
+            if listener is not None:
+                response = await listener.claim_slot(address, command, self._timeout)
             writer.write(data)
-            unpacker = hart_protocol.Unpacker(reader, on_error="raise")
-            async with asyncio.Timeout(self._timeout):
-                for msg in unpacker:
-                    return HartResponseFrame(
-                        command=msg.command,
-                        bytecount=msg.bytecount,
-                        address=msg.address,
-                        data=msg.data,
-                        full_response=msg.full_response,
-                        device_status=msg.device_status,
-                        response_code=msg.response_code
-                    )
-        raise BrooksError("No Response From Device")
+            sent = loop.time()
+            async with asyncio.timeout(self._response_timeout(wire, estimator, allowance)):
+                if listener is None:
+                    frame = await self._read_response(reader, address, command)
+                else:
+                    frame = await response
+            elapsed = loop.time() - sent
+            estimator.update(elapsed - wire)
+            if metrics is not None:
+                metrics.observe(
+                    address, command, elapsed, len(data), len(frame.raw),
+                    frame.response_code, frame.device_status,
+                )
+        except TimeoutError:
+            estimator.timed_out()
+            if metrics is not None:
+                metrics.timeout(address, len(data))
+            if listener is None:
+                # Drop a truncated reply and its late tail so neither merges with the next one
+                await self.flush_input()
+            raise
+        except HartProtocolError:
+            if metrics is not None:
+                metrics.protocol_error()
+            if listener is None:
+                await self.flush_input()
+            raise
+        finally:
+            if listener is not None:
+                listener.release_slot()
+            self._ready_at = loop.time() + self.frame_gap
+        return frame
+
+    def _wire_time(self, request: bytes, address: bytes, command: int) -> float:
+        chars = len(request) + response_chars(command, self._response_preambles, len(address) == 5)
+        return chars * self.char_time
+
+    def _response_timeout(
+        self,
+        wire: float,
+        estimator: TurnaroundEstimator,
+        allowance: Optional[float] = None,
+    ) -> float:
+        turnaround = estimator.allowance()
+        if allowance is not None:
+            turnaround = min(turnaround, allowance)
+        return min(wire + MARGIN_CHARS * self.char_time + turnaround, self._timeout)
+
+    def _estimator(self, address: bytes, command: int) -> TurnaroundEstimator:
+        key = (address, command)
+        estimator = self._turnaround.get(key)
+        if estimator is None:
+            # Devices on one line tend to answer a command alike; start from
+            # the slowest peer that has learned it, else from the generous default.
+            learned = [e.estimate for (_, c), e in self._turnaround.items() if c == command and e.samples]
+            estimator = TurnaroundEstimator(max(learned)) if learned else TurnaroundEstimator()
+            self._turnaround[key] = estimator
+        return estimator
+
+    def _has_answered(self, address: bytes) -> bool:
+        return any(e.samples for (a, _), e in self._turnaround.items() if a == address)
+
+    async def upgrade_baudrate(self, baudrate: int, devices: Optional[list["BrooksSLA"]] = None) -> int:
+        """
+        Move every device on the line (or devices) and then the port to
+        baudrate. SELECT_BAUDRATE for the new rate is the probe: a device that
+        does not support it refuses without switching. Once all have accepted,
+        the port is reopened at the new rate and every device is read back.
+        If any step fails, reopening included, the switched devices are set
+        back and the port returns to the old rate. Returns the rate the line
+        runs at afterwards.
+        """
+        new_code = BaudRate.from_rate(baudrate)
+        old = self._baudrate
+        BaudRate.from_rate(old)  # the fallback must be a rate the devices know
+        if baudrate == old:
+            return old
+        if self._port.startswith("tcp://"):
+            raise BrooksError(f"{self._port}: the baud rate of a raw TCP line is set on its gateway")
+        if self._listener is not None:
+            raise BrooksError("Stop the burst listener before changing the baud rate")
+        targets = self.devices if devices is None else devices
+        for dev in targets:
+            if dev._address is None:
+                raise BrooksError(f"{dev.tag}: address unknown; call get_address() first")
+
+        async with self._scheduler.slot(Priority.SETPOINT):
+            switched: list[BrooksSLA] = []
+            try:
+                for dev in targets:
+                    # A lost reply may still have switched the device, so count it in.
+                    switched.append(dev)
+                    try:
+                        await self._select_baudrate(dev, new_code)
+                    except ResponseError:
+                        switched.pop()  # refused, so still at the old rate
+                        raise
+                await self.reopen(baudrate)
+                for dev in targets:
+                    frame = await self._exchange(dev.construct_command(Command.READ_UNIQUE_IDENTIFIER))
+                    if frame.response_code:
+                        raise BrooksError(f"{dev.tag}: no valid reply at {baudrate} baud")
+            except (BrooksError, TimeoutError, HartProtocolError, OSError):
+                await self._restore_baudrate(switched, old, baudrate)
+            return self._baudrate
+
+    async def _select_baudrate(self, dev: "BrooksSLA", code: BaudRate) -> None:
+        frame = await self._exchange(dev.construct_command(Command.SELECT_BAUDRATE, bytes([code])))
+        if frame.response_code:
+            raise ResponseError(Command.SELECT_BAUDRATE, frame.response_code)
+
+    async def _restore_baudrate(self, switched: list["BrooksSLA"], old: int, new: int) -> None:
+        old_code = BaudRate.from_rate(old)
+        if switched:
+            try:
+                if self._baudrate != new or self._reader is None:
+                    await self.reopen(new)
+                for dev in switched:
+                    try:
+                        await self._select_baudrate(dev, old_code)
+                    except (BrooksError, TimeoutError, HartProtocolError):
+                        pass  # never switched, or unreachable at either rate
+            except OSError:
+                pass  # the new rate cannot be opened; switched devices stay lost until reset
+        if self._baudrate != old or self._reader is None:
+            await self.reopen(old)
+
+    def deadline_for(self, request: bytes) -> float:
+        """Response timeout the bus would use for this request right now."""
+        address, command = self._request_header(request)
+        return self._response_timeout(self._wire_time(request, address, command), self._estimator(address, command))
+
+    async def _read_response(self, reader: asyncio.StreamReader, address: bytes, command: int) -> HartFrameView:
+        parser = self._parser
+        while True:
+            try:
+                frame = parser.next_frame()
+                if frame is None:
+                    chunk = await reader.readexactly(parser.wants())
+                    frame = parser.feed(chunk)
+                    if frame is None:
+                        continue
+            except HartProtocolError:
+                # Noise or a stale frame ahead of the reply: resync on the next
+                # preamble. Only a bad frame with nothing after it is our reply.
+                if not parser.buffered:
+                    raise
+                if self._metrics is not None:
+                    self._metrics.protocol_error()
+                continue
+            # Skip the echo of our own request and anything not answering it
+            if frame.is_response and frame.command == command and same_device(frame.address, address):
+                return frame
+
+    @staticmethod
+    def _request_header(data: bytes) -> tuple[bytes, int]:
+        """Address bytes and command number of a packed request."""
+        i = 0
+        while data[i] == 0xFF:
+            i += 1
+        end = i + (6 if data[i] & 0x80 else 2)
+        return bytes(data[i + 1 : end]), data[end]
+
+
+class HeldBus:
+    """
+    The line as held by BrooksBus.hold(). Each exchange goes out once, as
+    soon as the previous one is answered; breakers are honoured and kept up
+    to date, but nothing is retried.
+    """
+
+    __slots__ = ("_bus", "_slot")
+
+    def __init__(self, bus: BrooksBus, priority: Priority, deadline: Optional[float]) -> None:
+        self._bus = bus
+        self._slot = bus.scheduler.slot(priority, deadline)
+
+    async def __aenter__(self) -> "HeldBus":
+        await self._slot.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._slot.__aexit__(*exc)
+
+    async def exchange(self, data: bytes, allowance: Optional[float] = None) -> HartFrameView:
+        bus = self._bus
+        header = bus._request_header(data)
+        breaker = bus._breaker(header[0])
+        loop = asyncio.get_running_loop()
+        if breaker is not None and not breaker.allows(loop.time()):
+            raise DeviceUnavailable(f"Device {header[0].hex()} is not answering; skipped for now")
+        try:
+            frame = await bus._exchange(data, allowance, header)
+        except TimeoutError:
+            if breaker is not None:
+                breaker.failure(loop.time())
+            raise
+        if breaker is not None:
+            breaker.success()
+        return frame
+
+
+class BrooksSLA:
+    """
+    Handle for one controller. Without a bus it opens a private one on port;
+    with bus= it is a lightweight handle sharing that line with other devices.
+    """
+
+    # Upper bound on distinct (command, payload) frames kept per device
+    _FRAME_CACHE_SIZE = 64
+
+    def __init__(
+        self,
+        tag: str,
+        port: Optional[str] = None,
+        baudrate: int = 19200,
+        address: Optional[int] = None,
+        bus: Optional[BrooksBus] = None,
+    ) -> None:
+        if bus is None:
+            if port is None:
+                raise BrooksError("Either a port or a bus is required")
+            bus = BrooksBus(port, baudrate)
+            self._owns_bus = True
+        else:
+            self._owns_bus = False
+        self._bus = bus
+        self._raw_tag = tag
+        self._tag = pack_ascii(tag[-8:], 8)
+        self._frames: dict[tuple[int, Optional[bytes]], bytes] = {}
+        self._templates: dict[tuple[int, bytes, str], RequestTemplate] = {}
+        self._config = DeviceConfig(address=address)
+        self._config_flagged = False
+        # Set when a reply raised the configuration changed flag and it has not been reset yet
+        self._reset_pending = False
+        # Set when the address came from a registry and has not answered yet
+        self._unverified = False
+        self._registry: Optional["DeviceRegistry"] = None
+
+    @property
+    def bus(self) -> BrooksBus:
+        return self._bus
+
+    @property
+    def tag(self) -> str:
+        return self._raw_tag
+
+    @property
+    def config(self) -> DeviceConfig:
+        return self._config
+
+    @property
+    def _address(self) -> Optional[int]:
+        return self._config.address
+
+    @_address.setter
+    def _address(self, address: Optional[int]) -> None:
+        if address != self._config.address:
+            self._frames.clear()
+            self._templates.clear()
+        self._config.address = address
+
+    async def connect(self) -> None:
+        if self._owns_bus:
+            await self._bus.connect()
+
+    async def close(self) -> None:
+        if self._owns_bus:
+            await self._bus.close()
+
+    async def flush_input(self, quiet: Optional[float] = None) -> None:
+        await self._bus.flush_input(quiet)
+
+    async def transaction(
+        self,
+        data: bytes,
+        priority: Priority = Priority.READ,
+        deadline: Optional[float] = None,
+        retry: Optional[bool] = None,
+    ) ->  HartResponse:
+        """
+        Send data and decode the reply; an error response code raises
+        ResponseError, while warnings come back with the response. retry as
+        for BrooksBus.exchange.
+        """
+        try:
+            response = await self._bus.transaction(data, priority, deadline, retry=retry)
+        except (DeadlineMissed, DeviceUnavailable):
+            raise  # not a sign that the device moved
+        except TimeoutError:
+            if not self._unverified:
+                raise
+            response = await self._bus.transaction(await self._reresolve(data), priority, deadline, retry=retry)
+        self._unverified = False
+        if response.bytecount >= 2:
+            self._check_config_status(response.device_status)
+        if self._reset_pending:
+            await self._reset_config_flag(priority)
+        if response.response_code and response.response_code not in WARNING_RESPONSE_CODES:
+            raise ResponseError(response.command, response.response_code)
+        return response
+
+    async def exchange(
+        self,
+        data: bytes,
+        priority: Priority = Priority.READ,
+        deadline: Optional[float] = None,
+        retry: Optional[bool] = None,
+    ) -> HartFrameView:
+        try:
+            frame = await self._bus.exchange(data, priority, deadline, retry=retry)
+        except (DeadlineMissed, DeviceUnavailable):
+            raise  # not a sign that the device moved
+        except TimeoutError:
+            if not self._unverified:
+                raise
+            frame = await self._bus.exchange(await self._reresolve(data), priority, deadline, retry=retry)
+        self._unverified = False
+        return self._checked(frame)
+
+    def _checked(self, frame: HartFrameView) -> HartFrameView:
+        """frame after its status bytes are applied; an error response code raises ResponseError."""
+        if frame.byte_count >= 2:
+            self._check_config_status(frame.device_status)
+        if frame.response_code and frame.response_code not in WARNING_RESPONSE_CODES:
+            raise ResponseError(frame.command, frame.response_code)
+        return frame
+
+    async def _reresolve(self, request: bytes) -> bytes:
+        """
+        A cached address went silent: look the tag up again, record the
+        result and return request re-addressed for the retry.
+        """
+        self._unverified = False
+        await self.get_address()
+        if self._registry is not None:
+            self._registry.readdress(self._raw_tag, self._address)
+        return self._retarget(request)
+
+    def _retarget(self, request: bytes) -> bytes:
+        i = 0
+        while request[i] == 0xFF:
+            i += 1
+        if not request[i] & 0x80:
+            return request
+        body = bytearray(request[i:-1])
+        body[1:6] = (0x8000000000 | (self._address or 0)).to_bytes(5, "big")
+        return request[:i] + bytes(body) + bytes([hart_checksum(body)])
+
+    def _check_config_status(self, raw: int) -> None:
+        status = COMMAND_STATUS_TABLE[raw]
+        flagged = status.configuration_changed or status.cold_start
+        # The flag stays up until reset, so only the rising edge invalidates.
+        if flagged and not self._config_flagged:
+            self._config.invalidate()
+            self._reset_pending = True
+        self._config_flagged = flagged
+
+    async def _reset_config_flag(self, priority: Priority) -> None:
+        """
+        Reset the flag the last reply raised, our own configuration writes
+        included, so the next change made by anyone raises it again. Sent
+        once the reply is decoded; a failed reset is tried after the next
+        transaction instead.
+        """
+        self._reset_pending = False
+        try:
+            await self.reset_configuration_changed(priority)
+        except (TimeoutError, HartProtocolError, BrooksError):
+            self._reset_pending = True
+
+    async def upgrade_baudrate(self, baudrate: int) -> int:
+        """
+        Move the line this device is on to baudrate. Every device on the bus
+        is switched with it; see BrooksBus.upgrade_baudrate.
+        """
+        return await self._bus.upgrade_baudrate(baudrate)
+
+    async def reset_configuration_changed(self, priority: Priority = Priority.READ) -> None:
+        await self.transaction(self.construct_command(Command.RESET_CONFIGURATION_CHANGED_FLAG), priority)
 
 
     async def get_address(self) -> None:
@@ -112,60 +994,264 @@ class BrooksSLA:
         self._address = device_id
 
 
-    def construct_command(self, command: int, data: Optional[bytes] = None) -> bytes:
-        if self._address == None:
+    def construct_command(self, command: int, data: Optional[Union[bytes, bytearray, memoryview]] = None) -> bytes:
+        if data is not None and type(data) is not bytes:
+            data = bytes(data)  # hashable for the cache key
+        key = (command, data)
+        frame = self._frames.get(key)
+        if frame is None:
+            if self._address == None:
+                frame = hart_protocol.tools.pack_command(0, int(command), data)
+            else:
+                frame = hart_protocol.tools.pack_command(self._address, int(command), data)
+            if len(self._frames) < self._FRAME_CACHE_SIZE:
+                self._frames[key] = frame
+        return frame
 
-            return hart_protocol.tools.pack_command(0, command, data)
-        else:
-            return hart_protocol.tools.pack_command(self._address, command, data)
-
-    async def read_flow(self) -> FlowReading:
-        response = await self.transaction(self.construct_command(Command.READ_PRIMARY_VARIABLE))
-        units, variable = struct.unpack_from(">Bf", response.data)
-        return FlowReading(
-            units=FlowRateUnit(units),
-            reading=variable
+    def command_template(self, command: int, prefix: bytes, fmt: str) -> RequestTemplate:
+        """
+        Template for command whose payload is prefix followed by fields packed
+        with fmt, e.g. a unit code and a float setpoint.
+        """
+        key = (command, prefix, fmt)
+        template = self._templates.get(key)
+        if template is None:
+            size = struct.calcsize(fmt)
+            frame = hart_protocol.tools.pack_command(self._address or 0, int(command), prefix + bytes(size))
+            template = self._templates[key] = RequestTemplate(frame, fmt)
+        return template
+
+    def _setpoint_request(self, units: FlowRateUnit, flow: float) -> bytes:
+        template = self.command_template(
+            Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS, bytes([units.value]), ">f"
         )
+        return template.pack(flow)
+
+    async def call(
+        self,
+        command: Command,
+        *values: Any,
+        priority: Optional[Priority] = None,
+        retry: Optional[bool] = None,
+    ) -> Any:
+        """
+        Send command with values packed by its codec (see brooks_sla.codec)
+        and return the decoded response, e.g. units and value fields for
+        READ_PRIMARY_VARIABLE. Reads default to Priority.READ, anything that
+        changes the device to Priority.SETPOINT.
+        """
+        if priority is None:
+            priority = Priority.READ if command in IDEMPOTENT_COMMANDS else Priority.SETPOINT
+        codec = CODECS[command]
+        return await self._decoded(codec, self.construct_command(command, codec.encode(*values) or None), priority, retry)
+
+    async def _decoded(
+        self,
+        codec: CommandCodec,
+        request: bytes,
+        priority: Priority = Priority.READ,
+        retry: Optional[bool] = None,
+    ) -> Any:
+        frame = await self.exchange(request, priority, retry=retry)
+        # Straight from the parser buffer, past the two status bytes
+        result = codec.decode(frame.data, 2)
+        if self._reset_pending:
+            await self._reset_config_flag(priority)
+        return result
+
+    async def read_flow(self, priority: Priority = Priority.READ) -> FlowReading:
+        units, variable = await self.call(Command.READ_PRIMARY_VARIABLE, priority=priority)
+        reading = FlowReading(variable, FlowRateUnit(units))
+        self._config.flow_units = reading.units
+        return reading
+
+    def stream_flow(
+        self,
+        rate: Optional[float] = None,
+        batch: int = 256,
+        ring: Optional["FlowRing"] = None,
+        priority: Priority = Priority.TELEMETRY,
+    ) -> AsyncIterator["FlowBatch"]:
+        """
+        Continuous flow capture into a NumPy ring buffer, yielded in batches.
+        See brooks_sla.stream.stream_flow; requires numpy.
+        """
+        from brooks_sla.stream import stream_flow
+
+        return stream_flow(self, rate, batch, ring, priority)
+
+    async def unit_converter(self, gas: int = 1) -> "UnitConverter":
+        """
+        Converter for readings of gas, built from the density, standard
+        conditions and full scale the device reports. See brooks_sla.units.
+        """
+        from brooks_sla.units import UnitConverter, read_gas_reference
+
+        return UnitConverter(await read_gas_reference(self, gas))
+
+    async def enable_burst(self, command: Command = Command.READ_PRIMARY_VARIABLE) -> BurstStream:
+        """
+        Put the device in burst mode publishing command and return the stream
+        its frames arrive on. Starts the bus burst listener if needed.
+        """
+        if self._address is None:
+            raise BrooksError("Device address unknown; call get_address() first")
+        await self.transaction(self.construct_command(Command.WRITE_BURST_MODE_COMMAND_NUMBER, bytes([command])))
+        # Listen before the first burst so none reach the request/response path.
+        stream = self._bus.start_burst_listener().subscribe(self._address)
+        try:
+            await self.transaction(self.construct_command(Command.BURST_MODE_CONTROL, b"\x01"))
+        except BaseException:
+            stream.close()
+            raise
+        return stream
+
+    async def disable_burst(self) -> None:
+        await self.transaction(self.construct_command(Command.BURST_MODE_CONTROL, b"\x00"), Priority.SETPOINT)
+
+    async def burst_flow(self) -> AsyncIterator[FlowReading]:
+        """
+        Flow readings pushed by the device in burst mode, without polling.
+        Burst mode is switched off again when the iteration is closed.
+        """
+        stream = await self.enable_burst(Command.READ_PRIMARY_VARIABLE)
+        try:
+            async for message in stream:
+                if message.command == Command.READ_PRIMARY_VARIABLE and len(message.data) >= _PRIMARY.response_size:
+                    units, value = _PRIMARY.decode(message.data)
+                    yield FlowReading(value, FlowRateUnit(units))
+        finally:
+            stream.close()
+            await self.disable_burst()
 
     async def set_flow(self, units: FlowRateUnit, flow: float) -> FlowSetting:
-        await self.select_units(units)
-        data = struct.pack(">Bf", FlowRateUnit.NOT_USED.value, flow)
-        response = await self.transaction(self.construct_command(Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS, data))
-        _, percent, units, variable = struct.unpack_from(">BfBf", response.data)
-        return FlowSetting(
-            percent=percent,
-            units=FlowRateUnit(units),
-            value=variable
-        )
+        if self._config.flow_units != units or self._config.flow_reference != FlowReference.CALIBRATION:
+            await self.select_units(units, priority=Priority.SETPOINT)
+        request = self._setpoint_request(FlowRateUnit.NOT_USED, flow)
+        _, percent, units, variable = await self._decoded(_WRITE_SETPOINT, request, Priority.SETPOINT)
+        return FlowSetting(percent, FlowRateUnit(units), variable)
 
     async def set_flow_percent(self, flow: float) -> FlowSetting:
         if flow < 0.0 or flow > 100.0:
             raise BrooksError("Flow Percent must be 0.0-100.0")
 
-        data = struct.pack(">Bf", FlowRateUnit.PERCENT.value, flow)
-        response = await self.transaction(self.construct_command(Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS, data))
-        _, percent, units, variable = struct.unpack_from(">BfBf", response.data)
-        return FlowSetting(
-            percent=percent,
-            units=FlowRateUnit(units),
-            value=variable
-        )
+        request = self._setpoint_request(FlowRateUnit.PERCENT, flow)
+        _, percent, units, variable = await self._decoded(_WRITE_SETPOINT, request, Priority.SETPOINT)
+        return FlowSetting(percent, FlowRateUnit(units), variable)
+
+    async def select_softstart(self, mode: SoftstartMode, priority: Priority = Priority.SETPOINT) -> None:
+        if self._config.softstart == mode:
+            return
+        (selected,) = await self.call(Command.SELECT_SOFTSTART, mode, priority=priority)
+        self._config.softstart = SoftstartMode(selected)
+
+    async def write_softstart_ramp(self, rate: float, priority: Priority = Priority.SETPOINT) -> float:
+        """Linear softstart ramp rate in percent of full scale per second; returns the stored value."""
+        (stored,) = _RAMP.unpack(_RAMP.pack(rate))
+        if self._config.ramp_rate == stored:
+            return stored
+        (stored,) = await self.call(Command.WRITE_LINEAR_SOFTSTART_RAMP_VALUE, rate, priority=priority)
+        self._config.ramp_rate = stored
+        return stored
+
+    async def ramp_to(self, flow: float, rate: float) -> FlowSetting:
+        """
+        Ramp to flow percent at rate %/s in the device: linear softstart is
+        selected and the rate written (each only if changed), then only the
+        endpoint setpoint is sent.
+        """
+        if flow < 0.0 or flow > 100.0:
+            raise BrooksError("Flow Percent must be 0.0-100.0")
+        if rate <= 0.0:
+            raise BrooksError("Ramp rate must be positive")
+        await self.write_softstart_ramp(rate)
+        await self.select_softstart(SoftstartMode.LINEAR)
+        return await self.set_flow_percent(flow)
+
+    async def run_profile(
+        self,
+        segments: Iterable["RampSegment"],
+        start: Optional[float] = None,
+        step: float = 0.1,
+    ) -> list["SegmentRun"]:
+        """
+        Run a setpoint profile, ramping in the device wherever the firmware
+        can. See brooks_sla.ramp.run_profile.
+        """
+        from brooks_sla.ramp import run_profile
+
+        return await run_profile(self, segments, start, step)
+
+    async def select_units(
+        self,
+        units: FlowRateUnit,
+        reference: FlowReference = FlowReference.CALIBRATION,
+        priority: Priority = Priority.SETPOINT,
+    ) -> None:
+        flow_reference, flow_units = await self.call(Command.SELECT_FLOW_UNIT, reference, units, priority=priority)
+        self._config.flow_units = FlowRateUnit(flow_units)
+        self._config.flow_reference = FlowReference(flow_reference)
+
+    async def select_temperature_units(self, units: TemperatureUnit, priority: Priority = Priority.SETPOINT) -> None:
+        (temp_units,) = await self.call(Command.SELECT_TEMPERATURE_UNIT, units, priority=priority)
+        self._config.temp_units = TemperatureUnit(temp_units)
+
+    async def select_gas(self, gas: int, priority: Priority = Priority.SETPOINT) -> None:
+        if gas < 1 or gas > 6:
+            raise BrooksError("Gas Must be between 1-6")
+        (selected,) = await self.call(Command.SELECT_GAS_CALIBRATION_FLOW_NUMBER, gas, priority=priority)
+        self._config.gas = selected
+
+    async def set_valve_override(self, mode: ValveOverride, priority: Priority = Priority.SETPOINT) -> ValveOverride:
+        """Force the valve closed or open, or back to following the setpoint with NORMAL."""
+        (override,) = await self.call(Command.SET_VALVE_OVERRIDE_STATUS, mode, priority=priority)
+        return ValveOverride(override)
+
+    async def read_valve_override(self, priority: Priority = Priority.READ) -> ValveOverride:
+        (override,) = await self.call(Command.GET_VALVE_OVERRIDE_STATUS, priority=priority)
+        return ValveOverride(override)
+
+    async def read_setpoint(self, priority: Priority = Priority.READ) -> FlowSetting:
+        _, percent, units, variable = await self.call(Command.READ_SETPOINT_PERCENT_AND_SELECTED_UNITS, priority=priority)
+        return FlowSetting(percent, FlowRateUnit(units), variable)
+
+    async def read_valve(self, priority: Priority = Priority.READ) -> float:
+        """Valve control value in percent."""
+        return (await self.call(Command.READ_VALVE_CONTROL_VALUE, priority=priority)).value
+
+    async def read_snapshot(
+        self,
+        include_setpoint: bool = False,
+        include_valve: bool = False,
+        priority: Priority = Priority.READ,
+    ) -> Snapshot:
+        """
+        All dynamic variables in one transaction. The setpoint and valve value
+        cost one extra transaction each and are only read when asked for.
+        """
+        current, groups = await self.call(Command.READ_ALL_DYNAMIC_VARIABLES_AND_CURRENT, priority=priority)
+        if not groups:
+            raise BrooksError("Short dynamic variable response")
+        variables = [DynamicVariable(value, units) for units, value in groups]
+        self._config.flow_units = FlowRateUnit(variables[0].units)
 
-    async def select_units(self, units: FlowRateUnit, reference: FlowReference = FlowReference.CALIBRATION) -> None:
-        data = struct.pack(">BB", reference.value, units.value)
-        response = await self.transaction(self.construct_command(Command.SELECT_FLOW_UNIT, data))
-        _, flow_units = struct.unpack(">BB", response.data)
-        self._flow_units = FlowRateUnit(flow_units)
+        setpoint = await self.read_setpoint(priority) if include_setpoint else None
+        valve = await self.read_valve(priority) if include_valve else None
+        return Snapshot(current, tuple(variables), setpoint, valve)
 
     async def master_reset(self) -> None:
         await self.transaction(self.construct_command(Command.PERFORM_MASTER_RESET))
+        self._config.invalidate()
 
-    async def read_flow_range(self, gas: int = 1) -> FlowRange:
+    async def read_flow_range(self, gas: int = 1, refresh: bool = False) -> FlowRange:
         if gas < 0 or gas > 6:
             raise BrooksError("Gas Must be between 0-6")
-        data = struct.pack(">B",gas)
-        response = await self.transaction(self.construct_command(Command.READ_FULL_SCALE_FLOW_RANGE, data))
-        units, variable = struct.unpack_from(">Bf", response.data)
-        return FlowRange(units=FlowRateUnit(units), value=variable)
+        cached = self._config.flow_ranges.get(gas)
+        if cached is not None and not refresh:
+            return cached
+        units, variable = await self.call(Command.READ_FULL_SCALE_FLOW_RANGE, gas)
+        flow_range = FlowRange(units=FlowRateUnit(units), value=variable)
+        self._config.flow_ranges[gas] = flow_range
+        return flow_range
 
 
@@ -0,0 +1,685 @@
+from typing import Callable, Optional
+from pydantic import BaseModel
+from brooks_sla.core import (
+    BaudRate,
+    Command,
+    CommandErrorId,
+    DensityUnit,
+    FlowRateUnit,
+    FlowReference,
+    PressureUnit,
+    SoftstartMode,
+    TemperatureUnit,
+)
+from brooks_sla.hart import FrameType, HartFrameView, HartProtocolError, HartStreamParser, hart_checksum, pack_ascii
+import asyncio
+import math
+import os
+import random
+import struct
+import tty
+
+
+class EmulatorFaults(BaseModel):
+    """Probabilities (0.0-1.0) of corrupting a response."""
+    checksum_error_rate: float = 0.0
+    drop_byte_rate: float = 0.0
+    busy_rate: float = 0.0
+    seed: Optional[int] = None
+
+
+class EmulatedDevice:
+    """
+    State of one simulated SLA controller. Flow follows the setpoint
+    immediately, or at the softstart ramp rate when linear softstart is
+    selected; values are not converted when units change. Firmware without
+    softstart is modelled with softstart=False.
+    """
+
+    def __init__(
+        self,
+        tag: str,
+        device_id: int,
+        polling_address: int = 0,
+        mfg_id: int = 10,
+        device_type: int = 100,
+        full_scale: float = 100.0,
+        flow_units: FlowRateUnit = FlowRateUnit.LITERS_PER_MIN,
+        temperature: float = 21.5,
+        response_preambles: int = 5,
+        max_baudrate: int = 38400,
+        softstart: bool = True,
+        max_ramp_rate: float = 100.0,
+    ) -> None:
+        self.tag = tag
+        self.packed_tag = pack_ascii(tag[-8:], 8)
+        self.device_id = device_id
+        self.polling_address = polling_address
+        self.mfg_id = mfg_id
+        self.device_type = device_type
+        self.descriptor = "BROOKS SLA"
+        self.model = "SLA5850S"
+        self.serial = f"F{device_id:07d}"
+        self.response_preambles = response_preambles
+        self.flow_units = flow_units
+        self.flow_reference = FlowReference.CALIBRATION
+        self.temp_units = TemperatureUnit.CELSIUS
+        self.temperature = temperature
+        self.gas = 1
+        self.full_scale = {gas: full_scale for gas in range(1, 7)}
+        # Nitrogen at 0 degC and 1 atm; standard conditions of 20 degC and 1 atm
+        self.gas_density = {gas: 1.2506 for gas in range(1, 7)}  # g/l
+        self.reference_conditions = (0.0, 101.325)  # degC, kPa
+        self.standard_conditions = (20.0, 101.325)
+        self.setpoint_percent = 0.0
+        self.valve_override = 0
+        self.totalizer_running = False
+        self.totalizer = 0.0
+        self.totalizer_at: Optional[float] = None
+        self.alarm_enable = 0
+        self.flow_alarm = (100.0, 0.0)
+        self.online = True
+        self.configuration_changed = False
+        self.cold_start = False
+        self.baudrate = 19200
+        self.max_baudrate = max_baudrate
+        self.burst_mode = False
+        self.burst_command = int(Command.READ_PRIMARY_VARIABLE)
+        self.softstart_supported = softstart
+        self.softstart = SoftstartMode.DISABLED
+        self.ramp_rate = 0.0  # %/s
+        self.max_ramp_rate = max_ramp_rate
+        self._ramp_from = 0.0
+        self._ramp_at = 0.0
+        self._now = 0.0  # time of the request being handled
+        self.requests = 0
+
+    @property
+    def output_percent(self) -> float:
+        """The setpoint being followed right now, partway through a softstart ramp."""
+        target = self.setpoint_percent
+        if self.softstart != SoftstartMode.LINEAR or self.ramp_rate <= 0.0:
+            return target
+        moved = self.ramp_rate * (self._now - self._ramp_at)
+        if abs(target - self._ramp_from) <= moved:
+            return target
+        return self._ramp_from + math.copysign(moved, target - self._ramp_from)
+
+    def _restart_ramp(self, now: float) -> None:
+        self._ramp_from = self.output_percent
+        self._ramp_at = now
+
+    @property
+    def flow_percent(self) -> float:
+        if self.valve_override == 1:  # closed
+            return 0.0
+        if self.valve_override == 2:  # open
+            return 100.0
+        return self.output_percent
+
+    @property
+    def flow(self) -> float:
+        return self.flow_percent / 100.0 * self.full_scale[self.gas]
+
+    def status_byte(self) -> int:
+        # Same encoding CommandStatus decodes
+        if self.cold_start:
+            self.cold_start = False
+            return 5
+        if self.configuration_changed:
+            return 6
+        return 0
+
+    def _advance_totalizer(self, now: float) -> None:
+        if self.totalizer_running and self.totalizer_at is not None:
+            self.totalizer += self.flow * (now - self.totalizer_at) / 60.0
+        self.totalizer_at = now
+
+    def identity(self) -> bytes:
+        return bytes([
+            254,
+            self.mfg_id & 0x3F,
+            self.device_type,
+            self.response_preambles,
+            5, 1, 1, 1, 0,
+        ]) + self.device_id.to_bytes(3, "big")
+
+    def handle(self, command: int, data: bytes, now: float) -> tuple[int, bytes]:
+        """Return (response code, payload) for one request."""
+        self.requests += 1
+        self._now = now
+        handler = _HANDLERS.get(command)
+        if handler is None:
+            return CommandErrorId.COMMAND_NOT_IMPLEMENTED, b""
+        try:
+            return handler(self, data, now)
+        except (struct.error, ValueError, KeyError):
+            return CommandErrorId.INVALID_SELECTION, b""
+
+
+def _read_unique_id(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, dev.identity()
+
+
+def _read_pv(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, struct.pack(">Bf", dev.flow_units, dev.flow)
+
+
+def _read_current_and_percent(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, struct.pack(">ff", 4.0 + 16.0 * dev.flow_percent / 100.0, dev.flow_percent)
+
+
+def _read_dynamic_variables(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    dev._advance_totalizer(now)
+    return 0, struct.pack(
+        ">fBfBfBfBf",
+        4.0 + 16.0 * dev.flow_percent / 100.0,
+        dev.flow_units, dev.flow,
+        dev.temp_units, dev.temperature,
+        FlowRateUnit.PERCENT, dev.setpoint_percent,
+        FlowRateUnit.PERCENT, dev.flow_percent,
+    )
+
+
+def _read_tag_descriptor_date(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, dev.packed_tag + pack_ascii(dev.descriptor[:16], 16) + bytes([1, 1, 124])
+
+
+def _read_serial_number(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, dev.serial.encode("latin-1").ljust(16, b"\x00")
+
+
+def _read_model_number(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, dev.model.encode("latin-1").ljust(16, b"\x00")
+
+
+def _write_polling_address(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    dev.polling_address = data[0]
+    dev.configuration_changed = True
+    return 0, data[:1]
+
+
+def _reset_configuration_changed(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    dev.configuration_changed = False
+    return 0, b""
+
+
+def _master_reset(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    dev.setpoint_percent = 0.0
+    dev.valve_override = 0
+    dev.cold_start = True
+    return 0, b""
+
+
+def _read_full_scale(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    gas = data[0] if data else dev.gas
+    if gas == 0:
+        gas = dev.gas
+    return 0, struct.pack(">Bf", dev.flow_units, dev.full_scale[gas])
+
+
+def _read_gas_density(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    gas = data[0] if data and data[0] else dev.gas
+    temperature, pressure = dev.reference_conditions
+    return 0, struct.pack(
+        ">BfBfBfBf",
+        DensityUnit.GRAMS_PER_L, dev.gas_density[gas],
+        TemperatureUnit.CELSIUS, temperature,
+        PressureUnit.KILOPASCAL, pressure,
+        dev.flow_units, dev.full_scale[gas],
+    )
+
+
+def _read_standard_conditions(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    temperature, pressure = dev.standard_conditions
+    return 0, struct.pack(">BfBf", TemperatureUnit.CELSIUS, temperature, PressureUnit.KILOPASCAL, pressure)
+
+
+def _select_gas(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    if data[0] not in dev.full_scale:
+        return CommandErrorId.INVALID_SELECTION, b""
+    dev.gas = data[0]
+    dev.configuration_changed = True
+    return 0, data[:1]
+
+
+def _select_flow_unit(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    reference, units = struct.unpack_from(">BB", data)
+    dev.flow_reference = FlowReference(reference)
+    dev.flow_units = FlowRateUnit(units)
+    dev.configuration_changed = True
+    return 0, bytes([reference, units])
+
+
+def _select_temperature_unit(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    dev.temp_units = TemperatureUnit(data[0])
+    dev.configuration_changed = True
+    return 0, data[:1]
+
+
+def _setpoint(dev: EmulatedDevice) -> bytes:
+    return struct.pack(
+        ">BfBf",
+        FlowRateUnit.PERCENT,
+        dev.setpoint_percent,
+        dev.flow_units,
+        dev.setpoint_percent / 100.0 * dev.full_scale[dev.gas],
+    )
+
+
+def _read_setpoint(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, _setpoint(dev)
+
+
+def _write_setpoint(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    units, value = struct.unpack_from(">Bf", data)
+    if units == FlowRateUnit.PERCENT:
+        percent = value
+    else:
+        percent = value / dev.full_scale[dev.gas] * 100.0
+    if percent < 0.0:
+        return CommandErrorId.PARAMETER_TOO_SMALL, b""
+    if percent > 110.0:
+        return CommandErrorId.PARAMETER_TOO_LARGE, b""
+    dev._advance_totalizer(now)
+    dev._restart_ramp(now)
+    dev.setpoint_percent = percent
+    return 0, _setpoint(dev)
+
+
+def _read_valve(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, struct.pack(">Bf", FlowRateUnit.PERCENT, dev.flow_percent)
+
+
+def _get_valve_override(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, bytes([dev.valve_override])
+
+
+def _set_valve_override(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    if data[0] > 2:
+        return CommandErrorId.INVALID_SELECTION, b""
+    dev._advance_totalizer(now)
+    dev.valve_override = data[0]
+    return 0, data[:1]
+
+
+def _read_totalizer_status(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, bytes([int(dev.totalizer_running)])
+
+
+def _set_totalizer_control(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    dev._advance_totalizer(now)
+    if data[0] == 0:
+        dev.totalizer_running = False
+    elif data[0] == 1:
+        dev.totalizer_running = True
+    elif data[0] == 2:
+        dev.totalizer = 0.0
+    else:
+        return CommandErrorId.INVALID_SELECTION, b""
+    return 0, data[:1]
+
+
+def _read_totalizer(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    dev._advance_totalizer(now)
+    return 0, struct.pack(">Bf", 41, dev.totalizer)  # HART volume code 41: liters
+
+
+def _read_alarm_enable(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, bytes([dev.alarm_enable])
+
+
+def _write_alarm_enable(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    dev.alarm_enable = data[0]
+    return 0, data[:1]
+
+
+def _read_flow_alarm(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    return 0, struct.pack(">ff", *dev.flow_alarm)
+
+
+def _write_flow_alarm(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    high, low = struct.unpack_from(">ff", data)
+    dev.flow_alarm = (high, low)
+    return 0, data[:8]
+
+
+def _select_baudrate(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    rate = BaudRate(data[0]).rate
+    if rate > dev.max_baudrate:
+        return CommandErrorId.INVALID_SELECTION, b""
+    # Takes effect once this reply is out
+    dev.baudrate = rate
+    return 0, data[:1]
+
+
+def _write_burst_command(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    if data[0] not in _BURST_COMMANDS:
+        return CommandErrorId.INVALID_SELECTION, b""
+    dev.burst_command = data[0]
+    dev.configuration_changed = True
+    return 0, data[:1]
+
+
+def _burst_mode_control(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    if data[0] > 1:
+        return CommandErrorId.INVALID_SELECTION, b""
+    dev.burst_mode = bool(data[0])
+    dev.configuration_changed = True
+    return 0, data[:1]
+
+
+def _select_softstart(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    if not dev.softstart_supported:
+        return CommandErrorId.COMMAND_NOT_IMPLEMENTED, b""
+    mode = SoftstartMode(data[0])
+    dev._restart_ramp(now)
+    dev.softstart = mode
+    return 0, data[:1]
+
+
+def _write_softstart_ramp(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+    if not dev.softstart_supported:
+        return CommandErrorId.COMMAND_NOT_IMPLEMENTED, b""
+    (rate,) = struct.unpack_from(">f", data)
+    if rate < 0.0:
+        return CommandErrorId.PARAMETER_TOO_SMALL, b""
+    if rate > dev.max_ramp_rate:
+        return CommandErrorId.PARAMETER_TOO_LARGE, b""
+    dev._restart_ramp(now)
+    dev.ramp_rate = rate
+    return 0, data[:4]
+
+
+_BURST_COMMANDS = (
+    Command.READ_PRIMARY_VARIABLE,
+    Command.READ_PRIMARY_VARIABLE_CURRENT_AND_PERCENT_RANGE,
+    Command.READ_ALL_DYNAMIC_VARIABLES_AND_CURRENT,
+)
+
+
+_HANDLERS: dict[int, Callable[[EmulatedDevice, bytes, float], tuple[int, bytes]]] = {
+    Command.READ_UNIQUE_IDENTIFIER: _read_unique_id,
+    Command.READ_PRIMARY_VARIABLE: _read_pv,
+    Command.READ_PRIMARY_VARIABLE_CURRENT_AND_PERCENT_RANGE: _read_current_and_percent,
+    Command.READ_ALL_DYNAMIC_VARIABLES_AND_CURRENT: _read_dynamic_variables,
+    Command.WRITE_POLLING_ADDRESS: _write_polling_address,
+    Command.WRITE_BURST_MODE_COMMAND_NUMBER: _write_burst_command,
+    Command.BURST_MODE_CONTROL: _burst_mode_control,
+    Command.SELECT_BAUDRATE: _select_baudrate,
+    Command.READ_UNIQUE_IDENTIFIER_ASSOCIATED_WITH_TAG: _read_unique_id,
+    Command.READ_TAG_DESCRIPTOR_DATE: _read_tag_descriptor_date,
+    Command.READ_SERIAL_NUMBER: _read_serial_number,
+    Command.READ_MODEL_NUMBER: _read_model_number,
+    Command.RESET_CONFIGURATION_CHANGED_FLAG: _reset_configuration_changed,
+    Command.PERFORM_MASTER_RESET: _master_reset,
+    Command.READ_FULL_SCALE_FLOW_RANGE: _read_full_scale,
+    Command.READ_GAS_DENSITY_FLOW_REF_AND_FLOW_RANGE: _read_gas_density,
+    Command.READ_STANDARD_TEMPERATURE_AND_PRESSURE: _read_standard_conditions,
+    Command.SELECT_GAS_CALIBRATION_FLOW_NUMBER: _select_gas,
+    Command.SELECT_FLOW_UNIT: _select_flow_unit,
+    Command.SELECT_TEMPERATURE_UNIT: _select_temperature_unit,
+    Command.GET_VALVE_OVERRIDE_STATUS: _get_valve_override,
+    Command.SET_VALVE_OVERRIDE_STATUS: _set_valve_override,
+    Command.READ_SETPOINT_PERCENT_AND_SELECTED_UNITS: _read_setpoint,
+    Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS: _write_setpoint,
+    Command.READ_VALVE_CONTROL_VALUE: _read_valve,
+    Command.READ_TOTALIZER_STATUS: _read_totalizer_status,
+    Command.SET_TOTALIZER_CONTROL: _set_totalizer_control,
+    Command.READ_TOTALIZER_VALUE_AND_UNIT: _read_totalizer,
+    Command.READ_ALARM_ENABLE_SETTING: _read_alarm_enable,
+    Command.WRITE_ALARM_ENABLE_SETTING: _write_alarm_enable,
+    Command.READ_HIGH_LOW_FLOW_ALARM: _read_flow_alarm,
+    Command.WRITE_HIGH_LOW_FLOW_ALARM: _write_flow_alarm,
+    Command.SELECT_SOFTSTART: _select_softstart,
+    Command.WRITE_LINEAR_SOFTSTART_RAMP_VALUE: _write_softstart_ramp,
+}
+
+
+class BrooksEmulator:
+    """
+    A multi-drop line of EmulatedDevices. Requests are answered after the
+    configured turnaround plus wire time at baudrate (None for no wire delay),
+    one at a time like a real half-duplex line. command_turnaround overrides
+    the turnaround per command, e.g. for slow configuration writes. Devices only hear the line
+    while their baud rate matches line_rate. Devices in burst mode take
+    turns publishing their burst command, leaving burst_gap idle after each
+    frame for the master to get a request in.
+    """
+
+    def __init__(
+        self,
+        baudrate: Optional[int] = 19200,
+        turnaround: float = 0.005,
+        faults: Optional[EmulatorFaults] = None,
+        echo: bool = False,
+        burst_gap: float = 0.005,
+        command_turnaround: Optional[dict[int, float]] = None,
+    ) -> None:
+        self.baudrate = baudrate
+        self.turnaround = turnaround
+        self.command_turnaround = command_turnaround or {}
+        self.burst_gap = burst_gap
+        self.line_rate = baudrate or 19200
+        self.faults = faults or EmulatorFaults()
+        self.echo = echo
+        self._random = random.Random(self.faults.seed)
+        self._by_id: dict[int, EmulatedDevice] = {}
+        self._parser = HartStreamParser()
+        self._line_free_at = 0.0
+        self._sink: Optional[Callable[[bytes], None]] = None
+        self._pty: Optional[tuple[int, int]] = None
+        self._burst_timer: Optional[asyncio.TimerHandle] = None
+        self._burst_next = 0
+
+    def add_device(self, device: EmulatedDevice) -> EmulatedDevice:
+        self._by_id[device.device_id] = device
+        return device
+
+    def add_devices(self, count: int, tag_prefix: str = "MFC", first_id: int = 1) -> list[EmulatedDevice]:
+        return [
+            self.add_device(EmulatedDevice(f"{tag_prefix}{i}", first_id + i, polling_address=i % 64))
+            for i in range(count)
+        ]
+
+    @property
+    def devices(self) -> list[EmulatedDevice]:
+        return list(self._by_id.values())
+
+    def device(self, device_id: int) -> EmulatedDevice:
+        return self._by_id[device_id]
+
+    @property
+    def char_time(self) -> float:
+        return 0.0 if self.baudrate is None else 11 / self.baudrate
+
+    # ---------------- request handling ----------------
+
+    def _resolve(self, frame: HartFrameView) -> Optional[EmulatedDevice]:
+        if frame.frame_type == FrameType.SHORT_STX_FRAME:
+            polling = frame.address[0] & 0x3F
+            for dev in self._by_id.values():
+                if dev.polling_address == polling:
+                    return dev
+            return None
+        if frame.command == Command.READ_UNIQUE_IDENTIFIER_ASSOCIATED_WITH_TAG:
+            tag = bytes(frame.data)
+            for dev in self._by_id.values():
+                if dev.packed_tag == tag:
+                    return dev
+            return None
+        # Match on the identification number; mfg id and device type may be left zero.
+        return self._by_id.get(int.from_bytes(frame.address[2:5], "big"))
+
+    def respond(self, frame: HartFrameView, now: float) -> Optional[bytes]:
+        """Build the response bytes for one request frame, or None for silence."""
+        dev = self._resolve(frame)
+        if dev is None or not self._hears(dev):
+            return None
+        if self.faults.busy_rate and self._random.random() < self.faults.busy_rate:
+            code, payload = int(CommandErrorId.DEVICE_BUSY), b""
+        else:
+            code, payload = dev.handle(frame.command, bytes(frame.data), now)
+        delimiter = FrameType.LONG_ACK_FRAME if frame.frame_type == FrameType.LONG_STX_FRAME else FrameType.SHORT_ACK_FRAME
+        return self._frame(dev, delimiter, bytes(frame.address), frame.command, code, payload)
+
+    def _hears(self, dev: EmulatedDevice) -> bool:
+        return dev.online and dev.baudrate == self.line_rate
+
+    def burst(self, dev: EmulatedDevice, now: float) -> bytes:
+        """The burst frame dev publishes at now."""
+        code, payload = _HANDLERS[dev.burst_command](dev, b"", now)
+        # Field device address with the burst-mode bit set
+        address = bytes([0x80 | 0x40 | (dev.mfg_id & 0x3F), dev.device_type]) + dev.device_id.to_bytes(3, "big")
+        return self._frame(dev, FrameType.LONG_BACK_FRAME, address, dev.burst_command, code, payload)
+
+    def _frame(
+        self,
+        dev: EmulatedDevice,
+        delimiter: FrameType,
+        address: bytes,
+        command: int,
+        code: int,
+        payload: bytes,
+    ) -> bytes:
+        body = (
+            bytes([delimiter])
+            + address
+            + bytes([command, len(payload) + 2, int(code), dev.status_byte()])
+            + payload
+        )
+        packet = bytearray(b"\xFF" * dev.response_preambles + body + bytes([hart_checksum(body)]))
+        if self.faults.checksum_error_rate and self._random.random() < self.faults.checksum_error_rate:
+            packet[-1] ^= 0xFF
+        if self.faults.drop_byte_rate and self._random.random() < self.faults.drop_byte_rate:
+            del packet[self._random.randrange(dev.response_preambles, len(packet))]
+        return bytes(packet)
+
+    def _receive(self, data: bytes) -> None:
+        loop = asyncio.get_running_loop()
+        if self.echo:
+            self._deliver(bytes(data))
+        frame = self._next_request(data)
+        while frame is not None:
+            if not frame.is_response:
+                now = loop.time()
+                request_end = now + len(frame.raw) * self.char_time
+                turnaround = self.command_turnaround.get(frame.command, self.turnaround)
+                start = max(request_end, self._line_free_at) + turnaround
+                response = self.respond(frame, start)
+                if response is not None:
+                    done = start + len(response) * self.char_time
+                    self._line_free_at = done
+                    loop.call_at(done, self._deliver, response)
+            frame = self._next_request(b"")
+        self._schedule_burst()
+
+    def _schedule_burst(self) -> None:
+        if self._burst_timer is not None or self._sink is None:
+            return
+        if not any(dev.burst_mode and self._hears(dev) for dev in self._by_id.values()):
+            return
+        loop = asyncio.get_running_loop()
+        at = max(loop.time(), self._line_free_at) + self.burst_gap
+        self._burst_timer = loop.call_at(at, self._send_burst)
+
+    def _send_burst(self) -> None:
+        self._burst_timer = None
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if now >= self._line_free_at:
+            bursting = [dev for dev in self._by_id.values() if dev.burst_mode and self._hears(dev)]
+            if bursting:
+                dev = bursting[self._burst_next % len(bursting)]
+                self._burst_next += 1
+                packet = self.burst(dev, now)
+                done = now + len(packet) * self.char_time
+                self._line_free_at = done
+                loop.call_at(done, self._deliver, packet)
+        self._schedule_burst()
+
+    def _next_request(self, data: bytes) -> Optional[HartFrameView]:
+        while True:
+            try:
+                return self._parser.feed(data)
+            except HartProtocolError:
+                data = b""
+
+    def _deliver(self, data: bytes) -> None:
+        if self._sink is not None:
+            self._sink(data)
+
+    # ---------------- transports ----------------
+
+    def open_connection(self, baudrate: Optional[int] = None) -> tuple[asyncio.StreamReader, "EmulatorWriter"]:
+        """
+        In-memory reader/writer pair for BrooksBus.attach(). Passing baudrate
+        changes the line rate (and the wire timing, unless that is off).
+        Pass this method as attach(reopen=...) to allow rate changes.
+        """
+        if baudrate is not None:
+            self.line_rate = baudrate
+            if self.baudrate is not None:
+                self.baudrate = baudrate
+        reader = asyncio.StreamReader()
+        self._sink = reader.feed_data
+        self._parser.clear()
+        return reader, EmulatorWriter(self)
+
+    def serve_pty(self) -> str:
+        """
+        Serve the line on a pseudo terminal and return its device path.
+        Linux ptys reject parity settings, so open it with PARITY_NONE.
+        """
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        self._pty = (master, slave)
+        self._sink = lambda data: os.write(master, data)
+        self._parser.clear()
+        asyncio.get_running_loop().add_reader(master, self._read_pty)
+        return os.ttyname(slave)
+
+    def _read_pty(self) -> None:
+        assert self._pty is not None
+        try:
+            data = os.read(self._pty[0], 1024)
+        except OSError:
+            return
+        self._receive(data)
+
+    def close(self) -> None:
+        self._sink = None
+        if self._burst_timer is not None:
+            self._burst_timer.cancel()
+            self._burst_timer = None
+        if self._pty is not None:
+            master, slave = self._pty
+            asyncio.get_running_loop().remove_reader(master)
+            os.close(master)
+            os.close(slave)
+            self._pty = None
+
+
+class EmulatorWriter:
+    """The write half of BrooksEmulator.open_connection()."""
+
+    def __init__(self, emulator: BrooksEmulator) -> None:
+        self._emulator = emulator
+        self._closed = False
+
+    def write(self, data: bytes) -> None:
+        if self._closed:
+            raise ConnectionError("Emulator connection closed")
+        self._emulator._receive(data)
+
+    async def drain(self) -> None:
+        return None
+
+    def close(self) -> None:
+        self._closed = True
+
+    def is_closing(self) -> bool:
+        return self._closed
+
+    async def wait_closed(self) -> None:
+        return None
@@ -0,0 +1,401 @@
+from typing import Any, Awaitable, Callable, Iterable, Optional
+from pydantic import BaseModel
+import serial_asyncio
+from brooks_sla.core import FlowRateUnit
+from brooks_sla.driver import BrooksBus, BrooksError, BrooksSLA, FlowReading, FlowSetting
+from brooks_sla.group import GroupResult, SetpointTarget, set_flows
+import asyncio
+import concurrent.futures
+import itertools
+import multiprocessing
+import pickle
+import threading
+import time
+
+
+class PortConfig(BaseModel):
+    """One RS-485 line and the devices on it."""
+    port: str
+    baudrate: int = 19200
+    parity: str = serial_asyncio.serial.PARITY_ODD
+    devices: dict[str, Optional[int]] = {}  # tag -> address, None to look it up on start
+
+
+class PortMetrics(BaseModel):
+    port: str
+    worker: int
+    baudrate: int
+    devices: int
+    requests: int
+    errors: int
+    timeouts: int
+    mean_latency: float
+    max_latency: float
+
+
+class _PortStats:
+    __slots__ = ("requests", "errors", "timeouts", "total_latency", "max_latency")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+
+class _PortHost:
+    """
+    The buses of one worker, driven from that worker's event loop. Devices
+    are reached by tag through their BrooksSLA handles.
+    """
+
+    def __init__(self, worker: int, configs: list[PortConfig]) -> None:
+        self._worker = worker
+        self._configs = configs
+        self._buses: dict[str, BrooksBus] = {}
+        self._devices: dict[str, tuple[BrooksSLA, _PortStats]] = {}
+        self._stats: dict[str, _PortStats] = {}
+
+    async def open(self) -> None:
+        """Connect every line; if one fails, those already open are closed again."""
+        try:
+            for config in self._configs:
+                bus = BrooksBus(config.port, config.baudrate, parity=config.parity)
+                await bus.connect()
+                stats = _PortStats()
+                self._buses[config.port] = bus
+                self._stats[config.port] = stats
+                for tag, address in config.devices.items():
+                    dev = bus.device(tag, address)
+                    if address is None:
+                        await dev.get_address()
+                    self._devices[tag] = (dev, stats)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def call(self, tag: str, method: str, args: tuple, kwargs: dict) -> Any:
+        dev, stats = self._devices[tag]
+        start = time.perf_counter()
+        stats.requests += 1
+        try:
+            return await getattr(dev, method)(*args, **kwargs)
+        except TimeoutError:
+            stats.timeouts += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.total_latency += elapsed
+            if elapsed > stats.max_latency:
+                stats.max_latency = elapsed
+
+    async def set_flows(self, flows: dict[str, float], units: FlowRateUnit) -> GroupResult:
+        result = await set_flows(SetpointTarget(self._devices[tag][0], flow, units) for tag, flow in flows.items())
+        for applied in result.results.values():
+            stats = self._devices[applied.tag][1]
+            stats.requests += 1
+            if isinstance(applied.error, TimeoutError):
+                stats.timeouts += 1
+            elif applied.error is not None:
+                stats.errors += 1
+        return result
+
+    def metrics(self) -> list[PortMetrics]:
+        out = []
+        for config in self._configs:
+            stats = self._stats[config.port]
+            out.append(PortMetrics(
+                port=config.port,
+                worker=self._worker,
+                baudrate=self._buses[config.port].baudrate,
+                devices=len(config.devices),
+                requests=stats.requests,
+                errors=stats.errors,
+                timeouts=stats.timeouts,
+                mean_latency=stats.total_latency / stats.requests if stats.requests else 0.0,
+                max_latency=stats.max_latency,
+            ))
+        return out
+
+    async def close(self) -> None:
+        await asyncio.gather(*(bus.close() for bus in self._buses.values()), return_exceptions=True)
+
+
+class _ThreadWorker:
+    """A thread running its own event loop with a _PortHost on it."""
+
+    def __init__(self, index: int, configs: list[PortConfig]) -> None:
+        self._host = _PortHost(index, configs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=f"brooks-fleet-{index}", daemon=True)
+
+    def _submit(self, coro: Awaitable[Any]) -> "asyncio.Future[Any]":
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def start(self) -> None:
+        self._thread.start()
+        await self._submit(self._host.open())
+
+    def call(self, tag: str, method: str, args: tuple, kwargs: dict) -> "asyncio.Future[Any]":
+        return self._submit(self._host.call(tag, method, args, kwargs))
+
+    def set_flows(self, flows: dict[str, float], units: FlowRateUnit) -> "asyncio.Future[GroupResult]":
+        return self._submit(self._host.set_flows(flows, units))
+
+    async def metrics(self) -> list[PortMetrics]:
+        return await self._submit(_sync(self._host.metrics))
+
+    async def close(self) -> None:
+        if self._thread.ident is None:  # never started
+            self._loop.close()
+            return
+        try:
+            await self._submit(self._host.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            await asyncio.to_thread(self._thread.join)
+            self._loop.close()
+
+
+async def _sync(fn: Callable[[], Any]) -> Any:
+    return fn()
+
+
+class _ProcessWorker:
+    """
+    A child process running a _PortHost. Requests and replies travel over a
+    pipe as (id, ...) tuples; a reader thread resolves the waiting futures.
+    """
+
+    def __init__(self, index: int, configs: list[PortConfig], context: Any) -> None:
+        self._conn, child = context.Pipe()
+        self._process = context.Process(
+            target=_process_main,
+            args=(child, index, [c.model_dump() for c in configs]),
+            name=f"brooks-fleet-{index}",
+            daemon=True,
+        )
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._send_lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._process.start()
+        self._reader = threading.Thread(target=self._read_replies, daemon=True)
+        self._reader.start()
+        await self._request("open")
+
+    def _request(self, *message: Any) -> "asyncio.Future[Any]":
+        assert self._loop is not None
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._pending[request_id] = future
+        with self._send_lock:
+            self._conn.send((request_id,) + message)
+        return future
+
+    def _read_replies(self) -> None:
+        while True:
+            try:
+                request_id, ok, value = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            assert self._loop is not None
+            self._loop.call_soon_threadsafe(self._resolve, request_id, ok, value)
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._fail_all)
+
+    def _resolve(self, request_id: int, ok: bool, value: Any) -> None:
+        future = self._pending.pop(request_id, None)
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+    def _fail_all(self) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Fleet worker exited"))
+        self._pending.clear()
+
+    def call(self, tag: str, method: str, args: tuple, kwargs: dict) -> "asyncio.Future[Any]":
+        return self._request("call", tag, method, args, kwargs)
+
+    def set_flows(self, flows: dict[str, float], units: FlowRateUnit) -> "asyncio.Future[GroupResult]":
+        return self._request("set_flows", flows, units)
+
+    async def metrics(self) -> list[PortMetrics]:
+        return [PortMetrics.model_validate(m) for m in await self._request("metrics")]
+
+    async def close(self) -> None:
+        if self._process.pid is None:  # never started
+            self._conn.close()
+            return
+        try:
+            await self._request("close")
+        except ConnectionError:
+            pass
+        await asyncio.to_thread(self._process.join, 5.0)
+        if self._process.is_alive():
+            self._process.kill()
+        if self._reader is not None:
+            await asyncio.to_thread(self._reader.join)
+        self._conn.close()
+
+
+def _process_main(conn: Any, index: int, configs: list[dict]) -> None:
+    asyncio.run(_serve(conn, _PortHost(index, [PortConfig.model_validate(c) for c in configs])))
+
+
+async def _serve(conn: Any, host: _PortHost) -> None:
+    loop = asyncio.get_running_loop()
+    # recv() blocks, so it runs on a thread of its own; replies go out from the loop.
+    with concurrent.futures.ThreadPoolExecutor(1) as receiver:
+        tasks: set[asyncio.Task] = set()
+
+        async def handle(request_id: int, coro: Awaitable[Any]) -> None:
+            try:
+                reply = (request_id, True, await coro)
+            except Exception as e:
+                reply = (request_id, False, e)
+            try:
+                conn.send(reply)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                conn.send((request_id, False, BrooksError(f"Unpicklable reply: {e!r}")))
+
+        while True:
+            try:
+                request_id, op, *args = await loop.run_in_executor(receiver, conn.recv)
+            except (EOFError, OSError):
+                break
+            if op == "close":
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await handle(request_id, host.close())
+                break
+            if op == "open":
+                coro = host.open()
+            elif op == "metrics":
+                coro = _sync(lambda: [m.model_dump() for m in host.metrics()])
+            elif op == "set_flows":
+                coro = host.set_flows(*args)
+            else:
+                coro = host.call(*args)
+            task = loop.create_task(handle(request_id, coro))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    conn.close()
+
+
+class Fleet:
+    """
+    Many RS-485 lines behind one async facade. Ports are sharded round-robin
+    over workers, each running its own event loop, either on a thread or,
+    with processes=True, in a child process so decoding and logging on one
+    line cannot steal CPU time from the others. Devices are addressed by tag.
+    """
+
+    def __init__(
+        self,
+        ports: Iterable[PortConfig],
+        workers: Optional[int] = None,
+        processes: bool = False,
+        mp_context: Optional[str] = "spawn",
+    ) -> None:
+        self._ports = list(ports)
+        if workers is None:
+            workers = len(self._ports)
+        workers = max(1, min(workers, len(self._ports)))
+        shards: list[list[PortConfig]] = [[] for _ in range(workers)]
+        for i, config in enumerate(self._ports):
+            shards[i % workers].append(config)
+        if processes:
+            context = multiprocessing.get_context(mp_context)
+            self._workers: list[Any] = [_ProcessWorker(i, shard, context) for i, shard in enumerate(shards)]
+        else:
+            self._workers = [_ThreadWorker(i, shard) for i, shard in enumerate(shards)]
+        self._by_tag: dict[str, Any] = {}
+        for worker, shard in zip(self._workers, shards):
+            for config in shard:
+                for tag in config.devices:
+                    if tag in self._by_tag:
+                        raise BrooksError(f"Tag {tag} appears on more than one port")
+                    self._by_tag[tag] = worker
+
+    async def __aenter__(self) -> "Fleet":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @property
+    def tags(self) -> list[str]:
+        return list(self._by_tag)
+
+    async def start(self) -> None:
+        """
+        Start every worker and connect its lines. If any line fails to
+        connect, all workers are shut down again, lines closed and threads
+        or processes ended, before the first error is raised.
+        """
+        results = await asyncio.gather(*(worker.start() for worker in self._workers), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            await self.close()
+            raise errors[0]
+
+    async def close(self) -> None:
+        await asyncio.gather(*(worker.close() for worker in self._workers), return_exceptions=True)
+
+    def call(self, tag: str, method: str, *args: Any, **kwargs: Any) -> "asyncio.Future[Any]":
+        """Run BrooksSLA.method(*args, **kwargs) for tag on its worker."""
+        if method.startswith("_"):
+            raise BrooksError(f"{method} is not a device operation")
+        worker = self._by_tag.get(tag)
+        if worker is None:
+            raise BrooksError(f"Unknown tag: {tag}")
+        return worker.call(tag, method, args, kwargs)
+
+    async def read_flow(self, tag: str) -> FlowReading:
+        return await self.call(tag, "read_flow")
+
+    async def set_flow(self, tag: str, units: FlowRateUnit, flow: float) -> FlowSetting:
+        return await self.call(tag, "set_flow", units, flow)
+
+    async def set_flow_percent(self, tag: str, flow: float) -> FlowSetting:
+        return await self.call(tag, "set_flow_percent", flow)
+
+    async def read_flow_many(self, tags: Optional[Iterable[str]] = None) -> dict[str, FlowReading]:
+        """Read every device (or tags) at once; lines run in parallel."""
+        tags = self.tags if tags is None else list(tags)
+        readings = await asyncio.gather(*(self.call(tag, "read_flow") for tag in tags))
+        return dict(zip(tags, readings))
+
+    async def set_flows(self, flows: dict[str, float], units: FlowRateUnit = FlowRateUnit.PERCENT) -> GroupResult:
+        """
+        Setpoints for many tags as one group (see brooks_sla.group.set_flows):
+        each worker writes its share with its lines held, all workers at once.
+        Ack times are time.monotonic(), comparable across worker processes.
+        """
+        shares: dict[Any, dict[str, float]] = {}
+        for tag, flow in flows.items():
+            worker = self._by_tag.get(tag)
+            if worker is None:
+                raise BrooksError(f"Unknown tag: {tag}")
+            shares.setdefault(worker, {})[tag] = flow
+        parts = await asyncio.gather(*(worker.set_flows(share, units) for worker, share in shares.items()))
+        results = {tag: applied for part in parts for tag, applied in part.results.items()}
+        return GroupResult(results, min((part.started_at for part in parts), default=time.monotonic()))
+
+    async def metrics(self) -> list[PortMetrics]:
+        per_worker = await asyncio.gather(*(worker.metrics() for worker in self._workers))
+        return [m for metrics in per_worker for m in metrics]
@@ -0,0 +1,376 @@
+from typing import Optional
+import serial_asyncio
+from brooks_sla.driver import BrooksError
+from urllib.parse import urlsplit
+import asyncio
+import socket
+import weakref
+
+
+GATEWAY_SCHEMES = ("tcp", "rfc2217")
+
+# Telnet (RFC 854) and COM port control (RFC 2217) codes
+IAC = 255
+DONT, DO, WONT, WILL = 254, 253, 252, 251
+SB, SE = 250, 240
+BINARY, SGA, COM_PORT = 0, 3, 44
+SET_BAUDRATE, SET_DATASIZE, SET_PARITY, SET_STOPSIZE = 1, 2, 3, 4
+_PARITY = {
+    serial_asyncio.serial.PARITY_NONE: 1,
+    serial_asyncio.serial.PARITY_ODD: 2,
+    serial_asyncio.serial.PARITY_EVEN: 3,
+}
+
+
+def parse_gateway_url(url: str) -> tuple[str, str, int]:
+    """(scheme, host, port) of a tcp://host:port or rfc2217://host:port line."""
+    parts = urlsplit(url)
+    if parts.scheme not in GATEWAY_SCHEMES or not parts.hostname or parts.port is None:
+        raise BrooksError(f"Not a gateway URL: {url}")
+    return parts.scheme, parts.hostname, parts.port
+
+
+class TelnetStream:
+    """
+    The RFC 2217 side of a line: serial settings go out as COM-PORT-OPTION
+    subnegotiations, data bytes of 0xFF are doubled, and telnet commands
+    are taken out of what comes back, answered where needed.
+    """
+
+    _ACCEPTED = frozenset((BINARY, SGA, COM_PORT))
+
+    def __init__(self) -> None:
+        self._state = 0  # 0 data, 1 after IAC, 2 after a verb, 3 in SB, 4 IAC in SB
+        self._verb = 0
+        self._sub = bytearray()
+        self._answered: set[tuple[int, int]] = set()
+        self.subnegotiations: list[bytes] = []
+
+    @staticmethod
+    def negotiation(baudrate: int, parity: str) -> bytes:
+        def sub(command: int, value: bytes) -> bytes:
+            return bytes([IAC, SB, COM_PORT, command]) + value.replace(b"\xff", b"\xff\xff") + bytes([IAC, SE])
+
+        return b"".join((
+            bytes([IAC, WILL, BINARY, IAC, DO, BINARY, IAC, DO, SGA, IAC, WILL, COM_PORT]),
+            sub(SET_BAUDRATE, baudrate.to_bytes(4, "big")),
+            sub(SET_DATASIZE, b"\x08"),
+            sub(SET_PARITY, bytes([_PARITY.get(parity, 1)])),
+            sub(SET_STOPSIZE, b"\x01"),
+        ))
+
+    @staticmethod
+    def escape(data: bytes) -> bytes:
+        return data.replace(b"\xff", b"\xff\xff")
+
+    def feed(self, data: bytes) -> tuple[bytes, bytes]:
+        """Received bytes in; (line data, reply to send back) out."""
+        if self._state == 0 and IAC not in data:
+            return data, b""
+        out = bytearray()
+        reply = bytearray()
+        for byte in data:
+            state = self._state
+            if state == 0:
+                if byte == IAC:
+                    self._state = 1
+                else:
+                    out.append(byte)
+            elif state == 1:
+                if byte == IAC:
+                    out.append(IAC)
+                    self._state = 0
+                elif byte in (WILL, WONT, DO, DONT):
+                    self._verb = byte
+                    self._state = 2
+                elif byte == SB:
+                    self._sub.clear()
+                    self._state = 3
+                else:
+                    self._state = 0  # NOP, GA and the like
+            elif state == 2:
+                reply += self._answer(self._verb, byte)
+                self._state = 0
+            elif state == 3:
+                if byte == IAC:
+                    self._state = 4
+                else:
+                    self._sub.append(byte)
+            else:
+                if byte == SE:
+                    self.subnegotiations.append(bytes(self._sub))
+                    self._state = 0
+                else:
+                    self._sub.append(byte)  # IAC IAC inside a subnegotiation
+                    self._state = 3
+        return bytes(out), bytes(reply)
+
+    def _answer(self, verb: int, option: int) -> bytes:
+        if (verb, option) in self._answered:
+            return b""
+        self._answered.add((verb, option))
+        accepted = option in self._ACCEPTED
+        if verb == DO:
+            return bytes([IAC, WILL if accepted else WONT, option])
+        if verb == WILL:
+            return bytes([IAC, DO if accepted else DONT, option])
+        return b""
+
+
+class _GatewayProtocol(asyncio.Protocol):
+    def __init__(self, line: "GatewayLine") -> None:
+        self._line = line
+
+    def data_received(self, data: bytes) -> None:
+        self._line._received(data)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._line._lost(self)
+
+
+class GatewayLine:
+    """
+    One serial port behind an Ethernet gateway, as a reader/writer pair that
+    stays valid across reconnects. A dropped connection is reopened at once
+    in the background, then with backoff; requests written meanwhile fail
+    with ConnectionResetError rather than going out late. Nagle is off so
+    every request leaves in one segment as soon as it is written.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        baudrate: int,
+        parity: str,
+        gate: Optional[asyncio.Semaphore] = None,
+        connect_timeout: float = 2.0,
+        reconnect_delay: float = 0.05,
+        max_reconnect_delay: float = 2.0,
+    ) -> None:
+        scheme, self.host, self.port = parse_gateway_url(url)
+        self.url = url
+        self.baudrate = baudrate
+        self.parity = parity
+        self.gate = gate
+        self.connect_timeout = connect_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.reader = asyncio.StreamReader()
+        self._telnet = TelnetStream() if scheme == "rfc2217" else None
+        self._transport: Optional[asyncio.Transport] = None
+        self._protocol: Optional[_GatewayProtocol] = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        self._closed = False
+        self.reconnects = 0
+
+    @property
+    def rfc2217(self) -> bool:
+        return self._telnet is not None
+
+    @property
+    def connected(self) -> bool:
+        return self._transport is not None and not self._transport.is_closing()
+
+    @property
+    def telnet(self) -> Optional[TelnetStream]:
+        return self._telnet
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        protocol = _GatewayProtocol(self)
+        async with asyncio.timeout(self.connect_timeout):
+            transport, _ = await loop.create_connection(lambda: protocol, self.host, self.port)
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        self._transport, self._protocol = transport, protocol
+        if self._telnet is not None:
+            transport.write(self._telnet.negotiation(self.baudrate, self.parity))
+
+    def set_line(self, baudrate: int, parity: str) -> None:
+        """Change the serial settings; only an RFC 2217 gateway can."""
+        if (baudrate, parity) == (self.baudrate, self.parity):
+            return
+        if self._telnet is None:
+            raise BrooksError(f"{self.url}: serial settings are configured on the gateway")
+        self.baudrate, self.parity = baudrate, parity
+        if self.connected:
+            assert self._transport is not None
+            self._transport.write(self._telnet.negotiation(baudrate, parity))
+
+    def write(self, data: bytes) -> None:
+        transport = self._transport
+        if transport is None or transport.is_closing():
+            raise ConnectionResetError(f"{self.url}: connection lost, reconnecting")
+        if self._telnet is not None:
+            data = self._telnet.escape(data)
+        transport.write(data)
+
+    def _received(self, data: bytes) -> None:
+        if self._telnet is not None:
+            data, reply = self._telnet.feed(data)
+            if reply and self._transport is not None:
+                self._transport.write(reply)
+        if data:
+            self.reader.feed_data(data)
+
+    def _lost(self, protocol: _GatewayProtocol) -> None:
+        if protocol is not self._protocol:
+            return
+        self._transport = self._protocol = None
+        if not self._closed and self._reconnecting is None:
+            self._reconnecting = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = self.reconnect_delay
+        try:
+            while not self._closed:
+                try:
+                    await self.open()
+                except (OSError, TimeoutError):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+                    continue
+                self.reconnects += 1
+                return
+        finally:
+            self._reconnecting = None
+
+    def close(self) -> None:
+        self._closed = True
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+        if self._transport is not None:
+            self._transport.close()
+        self._transport = self._protocol = None
+        self.reader.feed_eof()
+
+
+class GatewayWriter:
+    """The write half handed to a bus; closing it returns the line to its pool."""
+
+    def __init__(self, pool: "GatewayPool", line: GatewayLine) -> None:
+        self._pool = pool
+        self._line = line
+        self._closed = False
+
+    @property
+    def line(self) -> GatewayLine:
+        return self._line
+
+    def write(self, data: bytes) -> None:
+        if self._closed:
+            raise ConnectionError(f"{self._line.url}: writer closed")
+        self._line.write(data)
+
+    async def drain(self) -> None:
+        return None
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._pool.release(self._line)
+
+    def is_closing(self) -> bool:
+        return self._closed
+
+    async def wait_closed(self) -> None:
+        return None
+
+
+class GatewayPool:
+    """
+    Persistent gateway connections for one event loop. A line is used by one
+    bus at a time; when that bus closes, the connection is kept for linger
+    seconds so reopening the bus (e.g. for a baud rate change) or another
+    bus on the same URL skips the TCP handshake. limits caps the
+    transactions in flight through each gateway host, across all its lines.
+    """
+
+    def __init__(self, limits: Optional[dict[str, int]] = None, linger: float = 30.0) -> None:
+        self.linger = linger
+        self._limits = dict(limits or {})
+        self._gates: dict[str, asyncio.Semaphore] = {}
+        self._lines: dict[tuple[str, int], GatewayLine] = {}
+        self._in_use: set[tuple[str, int]] = set()
+        self._expiry: dict[tuple[str, int], asyncio.TimerHandle] = {}
+
+    def set_limit(self, host: str, limit: Optional[int]) -> None:
+        """Transactions at once through host; None for no limit beyond one per line. Takes effect as buses connect."""
+        if limit is None:
+            self._limits.pop(host, None)
+        else:
+            self._limits[host] = limit
+        self._gates.pop(host, None)
+
+    def gate(self, host: str) -> Optional[asyncio.Semaphore]:
+        limit = self._limits.get(host)
+        if limit is None:
+            return None
+        gate = self._gates.get(host)
+        if gate is None:
+            gate = self._gates[host] = asyncio.Semaphore(limit)
+        return gate
+
+    @property
+    def lines(self) -> list[GatewayLine]:
+        return list(self._lines.values())
+
+    async def acquire(self, url: str, baudrate: int, parity: str) -> tuple[asyncio.StreamReader, GatewayWriter]:
+        """Reader/writer for the line at url, reusing a pooled connection when there is one."""
+        _, host, port = parse_gateway_url(url)
+        key = (host, port)
+        if key in self._in_use:
+            raise BrooksError(f"{url} is already in use by another bus")
+        line = self._lines.get(key)
+        expiry = self._expiry.pop(key, None)
+        if expiry is not None:
+            expiry.cancel()
+        if line is not None and line.url.partition("://")[0] != url.partition("://")[0]:
+            line.close()
+            line = None
+        if line is None:
+            line = GatewayLine(url, baudrate, parity, self.gate(host))
+            await line.open()
+            self._lines[key] = line
+        else:
+            line.set_line(baudrate, parity)
+            line.gate = self.gate(host)
+        self._in_use.add(key)
+        return line.reader, GatewayWriter(self, line)
+
+    def release(self, line: GatewayLine) -> None:
+        key = (line.host, line.port)
+        self._in_use.discard(key)
+        if self.linger <= 0:
+            self._drop(key)
+        else:
+            self._expiry[key] = asyncio.get_running_loop().call_later(self.linger, self._drop, key)
+
+    def _drop(self, key: tuple[str, int]) -> None:
+        self._expiry.pop(key, None)
+        line = self._lines.pop(key, None)
+        if line is not None:
+            line.close()
+
+    def close(self) -> None:
+        for handle in self._expiry.values():
+            handle.cancel()
+        for line in self._lines.values():
+            line.close()
+        self._expiry.clear()
+        self._lines.clear()
+        self._in_use.clear()
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, GatewayPool]" = weakref.WeakKeyDictionary()
+
+
+def gateway_pool() -> GatewayPool:
+    """The pool gateway buses on the running event loop connect through."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = GatewayPool()
+    return pool
@@ -0,0 +1,125 @@
+from typing import Iterable, NamedTuple, Optional
+from brooks_sla.codec import CODECS
+from brooks_sla.core import Command, FlowRateUnit, FlowReference
+from brooks_sla.driver import BrooksBus, BrooksError, BrooksSLA, FlowSetting
+from brooks_sla.hart import HartProtocolError
+from brooks_sla.scheduler import Priority
+import asyncio
+import struct
+import time
+
+_WRITE_SETPOINT = CODECS[Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS]
+# Failures recorded against one device instead of aborting the group
+_DEVICE_ERRORS = (TimeoutError, HartProtocolError, BrooksError, ValueError, struct.error)
+
+
+class SetpointTarget(NamedTuple):
+    device: BrooksSLA
+    flow: float
+    units: FlowRateUnit = FlowRateUnit.PERCENT
+
+
+class AppliedSetpoint(NamedTuple):
+    tag: str
+    setting: Optional[FlowSetting]  # as echoed by the device; None if the write failed
+    acked_at: Optional[float]       # time.monotonic() when the acknowledgement arrived
+    error: Optional[BaseException] = None
+
+
+class GroupResult(NamedTuple):
+    results: dict[str, AppliedSetpoint]  # by tag, in the order written; failures before writing last
+    started_at: float                    # time.monotonic() as the first write went out
+
+    @property
+    def acked(self) -> list[AppliedSetpoint]:
+        return [r for r in self.results.values() if r.error is None]
+
+    @property
+    def failed(self) -> list[AppliedSetpoint]:
+        return [r for r in self.results.values() if r.error is not None]
+
+    @property
+    def skew(self) -> float:
+        """Seconds between the first and the last acknowledged write."""
+        times = [r.acked_at for r in self.acked if r.acked_at is not None]
+        return max(times) - min(times) if len(times) > 1 else 0.0
+
+
+class _Staged(NamedTuple):
+    target: SetpointTarget
+    request: bytes
+    cost: float  # response timeout the bus expects, i.e. wire time plus turnaround
+
+
+async def set_flows(targets: Iterable[SetpointTarget], priority: Priority = Priority.SETPOINT) -> GroupResult:
+    """
+    Write a setpoint to every target with the changes landing as close
+    together as the lines allow. Unit selection is staged first, once per
+    device that needs it, so each setpoint is a single write. Every bus is
+    then held for one uninterrupted run of writes, fastest-answering
+    devices first, with the buses of the group running in parallel. A
+    failing device is reported in its result without stopping the others.
+    """
+    by_bus: dict[BrooksBus, list[SetpointTarget]] = {}
+    tags = set()
+    for target in targets:
+        if target.device.tag in tags:
+            raise BrooksError(f"{target.device.tag} appears more than once in the group")
+        if target.units == FlowRateUnit.PERCENT and not 0.0 <= target.flow <= 100.0:
+            raise BrooksError("Flow Percent must be 0.0-100.0")
+        tags.add(target.device.tag)
+        by_bus.setdefault(target.device.bus, []).append(target)
+
+    failed: dict[str, AppliedSetpoint] = {}
+    staged = await asyncio.gather(*(_stage(bus, group, priority, failed) for bus, group in by_bus.items()))
+    started = time.monotonic()
+    runs = await asyncio.gather(*(_write(bus, ready, priority) for bus, ready in zip(by_bus, staged)))
+    results = {r.tag: r for run in runs for r in run}
+    results.update(failed)
+    return GroupResult(results, started)
+
+
+async def _stage(
+    bus: BrooksBus,
+    targets: list[SetpointTarget],
+    priority: Priority,
+    failed: dict[str, AppliedSetpoint],
+) -> list[_Staged]:
+    staged = []
+    for target in targets:
+        device = target.device
+        units = FlowRateUnit.PERCENT
+        try:
+            if target.units != FlowRateUnit.PERCENT:
+                config = device.config
+                if config.flow_units != target.units or config.flow_reference != FlowReference.CALIBRATION:
+                    await device.select_units(target.units, priority=priority)
+                units = FlowRateUnit.NOT_USED  # the value is in the selected units
+            if device._address is None:
+                await device.get_address()
+        except _DEVICE_ERRORS as e:
+            failed[device.tag] = AppliedSetpoint(device.tag, None, None, e)
+            continue
+        request = device._setpoint_request(units, target.flow)
+        staged.append(_Staged(target, request, bus.deadline_for(request)))
+    # Total line time is the same in any order; quick devices first keeps
+    # their apply times together and a slow or silent one from delaying them.
+    staged.sort(key=lambda s: s.cost)
+    return staged
+
+
+async def _write(bus: BrooksBus, staged: list[_Staged], priority: Priority) -> list[AppliedSetpoint]:
+    results = []
+    if not staged:
+        return results
+    async with bus.hold(priority) as line:
+        for target, request, _ in staged:
+            device = target.device
+            try:
+                frame = await line.exchange(request)
+                acked = time.monotonic()
+                _, percent, units, value = _WRITE_SETPOINT.decode(device._checked(frame).data, 2)
+                results.append(AppliedSetpoint(device.tag, FlowSetting(percent, FlowRateUnit(units), value), acked))
+            except _DEVICE_ERRORS as e:
+                results.append(AppliedSetpoint(device.tag, None, None, e))
+    return results
@@ -1,12 +1,14 @@
 from pydantic import BaseModel
 from enum import IntEnum
-import math
-from typing import List, Optional, Union
+import struct
+from typing import Iterable, List, Optional, Union
 
 
 class FrameType(IntEnum):
+    SHORT_BACK_FRAME = 0x01
     SHORT_STX_FRAME = 0x02
     SHORT_ACK_FRAME = 0x06
+    LONG_BACK_FRAME = 0x81
     LONG_STX_FRAME = 0x82
     LONG_ACK_FRAME = 0x86
 
@@ -74,20 +76,346 @@ class HartFrame(BaseModel):
 
     @staticmethod
     def chksum(data: bytes) -> bytes:
-        lrc = 0
-        for byte in data:
-            lrc ^= byte
-        return bytes([lrc])
+        return bytes([hart_checksum(data)])
 
-def pack_ascii(data: str) -> bytes:
-    chars = [c.encode() for c in string]  # type: ignore
+def pack_ascii(data: Union[str, bytes], length: Optional[int] = None) -> bytes:
+    """
+    HART packed ASCII: six bits per character, four characters per three
+    bytes. Text is upper-cased and space-padded to length characters (by
+    default the next multiple of four), so an 8 character tag packs to 6 bytes.
+    """
+    if isinstance(data, str):
+        data = data.encode("ascii")
+    data = data.upper()
+    if length is None:
+        length = -(-len(data) // 4) * 4
+    if length % 4:
+        raise ValueError("Packed ASCII length must be a multiple of 4")
+    if len(data) > length:
+        raise ValueError(f"{data!r} does not fit in {length} packed characters")
     out = 0
-    for i, c in zip(range(8), [ord(c) & 0b0011_1111 for c in chars][::-1]):
-        out |= c << (i * 6)
-    return out.to_bytes(math.ceil((len(data) * 6) / 8), "big")
+    for c in data.ljust(length, b" "):
+        out = (out << 6) | (c & 0x3F)
+    return out.to_bytes(length * 6 // 8, "big")
 
-def hart_checksum(data: bytes) -> int:
+
+def pack_ascii_batch(items: Iterable[Union[str, bytes]], length: int = 8) -> list[bytes]:
+    """Pack many fixed-width fields (tags by default) at once."""
+    return [pack_ascii(item, length) for item in items]
+
+
+def unpack_ascii(data: Union[bytes, bytearray, memoryview]) -> str:
+    """Inverse of pack_ascii; trailing padding is kept."""
+    value = int.from_bytes(data, "big")
+    n = len(data) * 8 // 6
+    chars = bytearray(n)
+    for i in range(n):
+        c = (value >> (6 * (n - 1 - i))) & 0x3F
+        chars[i] = c if c >= 0x20 else c | 0x40
+    return chars.decode("ascii")
+
+def hart_checksum(data: Union[bytes, bytearray, memoryview]) -> int:
     chk = 0
     for b in data:
         chk ^= b
     return chk
+
+
+def same_device(reply: Union[bytes, memoryview], request: bytes) -> bool:
+    """Whether a reply from address reply answers a request sent to address request."""
+    if len(request) == 1:
+        return len(reply) == 1 and (reply[0] & 0x3F) == (request[0] & 0x3F)
+    # Broadcast requests (command 11) are answered by whichever device matches
+    return len(reply) == 5 and (reply[2:] == request[2:] or not any(request[2:]))
+
+
+_BURST_FRAME_TYPES = frozenset((FrameType.SHORT_BACK_FRAME.value, FrameType.LONG_BACK_FRAME.value))
+_FRAME_TYPES = frozenset(ft.value for ft in FrameType) - _BURST_FRAME_TYPES
+
+
+
+class HartProtocolError(Exception):
+    """Raised when bytes are syntactically a frame but violate protocol (e.g., bad checksum)."""
+
+
+class HartFrameView:
+    """
+    A parsed frame whose address, data and raw fields are memoryview slices
+    into the parser buffer. Slices stay valid until the next feed(); call
+    bytes() on them to keep a copy.
+    """
+
+    __slots__ = ("frame_type", "address", "command", "byte_count", "data", "raw")
+
+    def __init__(
+        self,
+        frame_type: FrameType,
+        address: memoryview,
+        command: int,
+        byte_count: int,
+        data: memoryview,
+        raw: memoryview,
+    ) -> None:
+        self.frame_type = frame_type
+        self.address = address
+        self.command = command
+        self.byte_count = byte_count
+        self.data = data
+        self.raw = raw
+
+    @property
+    def is_response(self) -> bool:
+        return self.frame_type in (FrameType.SHORT_ACK_FRAME, FrameType.LONG_ACK_FRAME)
+
+    @property
+    def is_burst(self) -> bool:
+        return self.frame_type in (FrameType.SHORT_BACK_FRAME, FrameType.LONG_BACK_FRAME)
+
+    @property
+    def response_code(self) -> int:
+        return self.data[0] if self.byte_count >= 1 else 0
+
+    @property
+    def device_status(self) -> int:
+        return self.data[1] if self.byte_count >= 2 else 0
+
+    @property
+    def payload(self) -> memoryview:
+        """Response data following the two status bytes."""
+        return self.data[2:]
+
+    @property
+    def address_int(self) -> int:
+        return int.from_bytes(self.address, "big")
+
+    def copy(self) -> "HartFrameView":
+        """A view over a private copy of the frame that survives later feeds."""
+        raw = memoryview(bytes(self.raw))
+        c = 1 + len(self.address)
+        return HartFrameView(
+            self.frame_type,
+            raw[1:c],
+            self.command,
+            self.byte_count,
+            raw[c + 2 : c + 2 + self.byte_count],
+            raw,
+        )
+
+
+class HartStreamParser:
+    """
+    Incremental HART frame parser over a persistent buffer.
+
+    Bytes are appended with feed() and complete frames are returned as
+    HartFrameView slices without copying. wants() tells the caller how many
+    more bytes are needed before next_frame() can make progress, so reads can
+    be sized exactly. Burst (BACK) frames are rejected unless accept_burst is
+    set, since a master that is not listening for them cannot route them.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_preamble: int = 2,
+        max_preamble: int = 32,
+        max_byte_count: int = 255,
+        capacity: int = 1024,
+        accept_burst: bool = False,
+    ):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._start = 0  # logical cursor
+        self._end = 0  # end of buffered bytes
+        self._min_preamble = min_preamble
+        self._max_preamble = max_preamble
+        self._max_byte_count = max_byte_count
+        self._delimiters = _FRAME_TYPES
+        self.accept_burst = accept_burst
+        # Header of the frame at the cursor, filled in by _scan()
+        self._delim = 0
+        self._addr_len = 0
+        self._byte_count = 0
+        self._error: Optional[tuple[str, int]] = None
+
+    @property
+    def accept_burst(self) -> bool:
+        return self._delimiters is not _FRAME_TYPES
+
+    @accept_burst.setter
+    def accept_burst(self, accept: bool) -> None:
+        self._delimiters = (_FRAME_TYPES | _BURST_FRAME_TYPES) if accept else _FRAME_TYPES
+
+    @property
+    def buffered(self) -> int:
+        """Bytes received but not yet consumed; nonzero while a frame is in progress."""
+        return self._end - self._start
+
+    # ---------------- buffer primitives ----------------
+
+    def _available(self) -> int:
+        return self._end - self._start
+
+    def _append(self, data: bytes) -> None:
+        n = len(data)
+        if self._start == self._end:
+            self._start = self._end = 0
+        if self._end + n > len(self._buf):
+            pending = self._end - self._start
+            if pending + n > len(self._buf):
+                # Never resize in place: views handed out earlier keep the old buffer alive.
+                buf = bytearray(max(2 * len(self._buf), pending + n))
+                view = memoryview(buf)
+                view[:pending] = self._view[self._start : self._end]
+                self._buf = buf
+                self._view = view
+            else:
+                self._view[:pending] = self._view[self._start : self._end]
+            self._start = 0
+            self._end = pending
+        self._view[self._end : self._end + n] = data
+        self._end += n
+
+    def advance(self, n: int = 1) -> None:
+        """
+        Caller-controlled resync: move cursor forward by n bytes.
+        """
+        if n <= 0:
+            return
+        self._start = min(self._end, self._start + n)
+        self._error = None
+
+    def clear(self) -> None:
+        """Drop all buffered bytes."""
+        self._start = self._end = 0
+        self._error = None
+
+    # ---------------- public API ----------------
+
+    def feed(self, data: bytes) -> Optional[HartFrameView]:
+        """
+        Append bytes and attempt to parse and return ONE frame.
+        If more frames are buffered, caller can call feed(b"") or next_frame().
+        """
+        if data:
+            self._append(data)
+            self._error = None
+        return self.next_frame()
+
+    def next_frame(self) -> Optional[HartFrameView]:
+        """
+        Attempt to parse and return ONE frame from already-buffered bytes.
+        Returns None if insufficient bytes to complete a frame.
+        Raises HartProtocolError on protocol violations; the offending bytes
+        are discarded up to the next preamble, where the following call resumes.
+        """
+        if self._scan():
+            return None
+        if self._error is not None:
+            message, resume = self._error
+            self._error = None
+            self._start = resume
+            raise HartProtocolError(message)
+
+        buf = self._buf
+        view = self._view
+        d = self._delim
+        c = d + 1 + self._addr_len
+        bc = self._byte_count
+        end = c + 2 + bc
+        self._start = end + 1
+        computed = hart_checksum(view[d:end])
+        if computed != buf[end]:
+            raise HartProtocolError(
+                f"Invalid checksum (computed 0x{computed:02X}, got 0x{buf[end]:02X})"
+            )
+        return HartFrameView(
+            FrameType(buf[d]),
+            view[d + 1 : c],
+            buf[c],
+            bc,
+            view[c + 2 : end],
+            view[d : end + 1],
+        )
+
+    def wants(self) -> int:
+        """
+        Read hint:
+          - returns 0 if next_frame() can make progress without more bytes
+            (a complete frame, or a protocol error, is buffered)
+          - otherwise returns the minimum number of bytes still missing
+        """
+        return self._scan()
+
+    def _scan(self) -> int:
+        """
+        Locate the frame at the cursor and return how many bytes are still
+        missing. Returns 0 once the frame is complete or an error was found.
+        """
+        if self._error is not None:
+            return 0
+        buf = self._buf
+        end = self._end
+        i = self._start
+        while i < end and buf[i] == 0xFF:
+            i += 1
+            if i - self._start > self._max_preamble:
+                self._error = ("Preamble too long", i)
+                return 0
+        preamble = i - self._start
+        if i == end:
+            return max(1, self._min_preamble - preamble)
+        if preamble < self._min_preamble:
+            self._error = ("Insufficient preamble before delimiter", self._resync(i))
+            return 0
+
+        delim = buf[i]
+        if delim not in self._delimiters:
+            self._error = (f"Invalid delimiter: 0x{delim:02X}", self._resync(i))
+            return 0
+        addr_len = 5 if (delim & 0x80) else 1
+        have = end - i - 1
+        if have < addr_len:
+            return addr_len - have
+        if have < addr_len + 2:
+            return addr_len + 2 - have
+        bc = buf[i + addr_len + 2]
+        if bc > self._max_byte_count:
+            self._error = (f"Byte count too large: {bc}", self._resync(i))
+            return 0
+        self._delim = i
+        self._addr_len = addr_len
+        self._byte_count = bc
+        return max(addr_len + 3 + bc - have, 0)
+
+    def _resync(self, i: int) -> int:
+        """
+        Where to resume after a bad frame starting at i: the next preamble
+        byte, so line noise is skipped in one step instead of byte by byte.
+        """
+        nxt = self._buf.find(0xFF, i + 1, self._end)
+        return self._end if nxt < 0 else nxt
+
+
+class RequestTemplate:
+    """
+    A packed request whose payload ends in fixed-layout fields. pack() only
+    packs those fields and folds their bytes into the precomputed checksum of
+    the unchanged prefix, so no frame is rebuilt per call.
+    """
+
+    __slots__ = ("_prefix", "_base", "_struct")
+
+    def __init__(self, frame: bytes, fmt: str) -> None:
+        self._struct = struct.Struct(fmt)
+        self._prefix = bytes(frame[: len(frame) - 1 - self._struct.size])
+        start = 0
+        while self._prefix[start] == 0xFF:
+            start += 1
+        self._base = hart_checksum(self._prefix[start:])
+
+    def pack(self, *values) -> bytes:
+        fields = self._struct.pack(*values)
+        chk = self._base
+        for b in fields:
+            chk ^= b
+        return self._prefix + fields + bytes((chk,))
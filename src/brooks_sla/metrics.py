@@ -0,0 +1,261 @@
+from typing import TYPE_CHECKING, Iterable, Optional
+from pydantic import BaseModel
+from brooks_sla.core import COMMAND_STATUS_TABLE, COMMUNICATION_STATUS_TABLE, Command, CommandFlags, CommunicationFlags
+import bisect
+
+if TYPE_CHECKING:
+    from brooks_sla.driver import BrooksBus
+
+
+# Upper bounds in seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+_COMMUNICATION_BITS = CommunicationFlags._fields[2:]  # bit 6 .. bit 0
+_COMMAND_FLAGS = ("device_malfunction",) + CommandFlags._fields[3:]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; counts are per bucket, not cumulative."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> "HistogramSnapshot":
+        return HistogramSnapshot(bounds=list(self.bounds), counts=list(self.counts), sum=self.sum, count=self.count)
+
+
+class HistogramSnapshot(BaseModel):
+    bounds: list[float]
+    counts: list[int]
+    sum: float
+    count: int
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding quantile q (inf if beyond the last bound)."""
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + [float("inf")], self.counts):
+            seen += count
+            if seen >= target and seen:
+                return bound
+        return 0.0
+
+
+class _DeviceMetrics:
+    __slots__ = ("latency", "timeouts", "retries", "bytes_out", "bytes_in")
+
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.timeouts = 0
+        self.retries = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+
+class DeviceMetricsSnapshot(BaseModel):
+    address: int
+    tag: Optional[str]
+    latency: HistogramSnapshot
+    timeouts: int
+    retries: int
+    bytes_out: int
+    bytes_in: int
+
+
+class MetricsSnapshot(BaseModel):
+    port: str
+    devices: list[DeviceMetricsSnapshot]
+    commands: dict[int, HistogramSnapshot]
+    protocol_errors: int
+    communication_errors: dict[str, int]  # CommunicationFlags bit name -> count
+    command_status: dict[str, int]        # CommandFlags name -> count
+    response_codes: dict[int, int]        # nonzero command response codes
+
+
+class BusMetrics:
+    """
+    Counters for one bus, updated by the bus on every transaction while
+    enabled. Latency runs from the end of the write to the parsed response,
+    so it covers wire time and device turnaround but not queueing. Bytes in
+    count the response frame without its preamble.
+    """
+
+    def __init__(self, bus: "BrooksBus") -> None:
+        self._bus = bus
+        self.reset()
+
+    def reset(self) -> None:
+        self._devices: dict[bytes, _DeviceMetrics] = {}
+        self._commands: dict[int, Histogram] = {}
+        self.protocol_errors = 0
+        self._communication = [0] * 256  # by raw response code with bit 7 set
+        self._response_codes = [0] * 128
+        self._status = [0] * 256
+
+    def _device(self, address: bytes) -> _DeviceMetrics:
+        metrics = self._devices.get(address)
+        if metrics is None:
+            metrics = self._devices[address] = _DeviceMetrics()
+        return metrics
+
+    def observe(self, address: bytes, command: int, latency: float, bytes_out: int, bytes_in: int,
+                response_code: int, device_status: int) -> None:
+        dev = self._device(address)
+        dev.latency.observe(latency)
+        dev.bytes_out += bytes_out
+        dev.bytes_in += bytes_in
+        histogram = self._commands.get(command)
+        if histogram is None:
+            histogram = self._commands[command] = Histogram()
+        histogram.observe(latency)
+        if response_code:
+            if response_code & 0x80:
+                self._communication[response_code] += 1
+            else:
+                self._response_codes[response_code] += 1
+        if device_status:
+            self._status[device_status] += 1
+
+    def timeout(self, address: bytes, bytes_out: int) -> None:
+        dev = self._device(address)
+        dev.timeouts += 1
+        dev.bytes_out += bytes_out
+
+    def retry(self, address: bytes) -> None:
+        self._device(address).retries += 1
+
+    def protocol_error(self) -> None:
+        self.protocol_errors += 1
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Point-in-time copy, with bit-level status counts decoded."""
+        tags = {dev._address: dev.tag for dev in self._bus.devices if dev._address is not None}
+        devices = []
+        for address, dev in self._devices.items():
+            number = int.from_bytes(address[-3:], "big") if len(address) == 5 else address[0] & 0x3F
+            devices.append(DeviceMetricsSnapshot(
+                address=number,
+                tag=tags.get(number) if len(address) == 5 else None,
+                latency=dev.latency.snapshot(),
+                timeouts=dev.timeouts,
+                retries=dev.retries,
+                bytes_out=dev.bytes_out,
+                bytes_in=dev.bytes_in,
+            ))
+        communication = dict.fromkeys(_COMMUNICATION_BITS, 0)
+        for raw, count in enumerate(self._communication):
+            if count:
+                flags = COMMUNICATION_STATUS_TABLE[raw]
+                for name in _COMMUNICATION_BITS:
+                    if getattr(flags, name):
+                        communication[name] += count
+        status = dict.fromkeys(_COMMAND_FLAGS, 0)
+        for raw, count in enumerate(self._status):
+            if count:
+                flags = COMMAND_STATUS_TABLE[raw]
+                for name in _COMMAND_FLAGS:
+                    if getattr(flags, name):
+                        status[name] += count
+        return MetricsSnapshot(
+            port=self._bus.port,
+            devices=devices,
+            commands={command: h.snapshot() for command, h in self._commands.items()},
+            protocol_errors=self.protocol_errors,
+            communication_errors=communication,
+            command_status=status,
+            response_codes={code: n for code, n in enumerate(self._response_codes) if n},
+        )
+
+
+def _labels(**labels: object) -> str:
+    parts = []
+    for key, value in labels.items():
+        text = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{text}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _command_name(command: int) -> str:
+    try:
+        return Command(command).name
+    except ValueError:
+        return str(command)
+
+
+def _histogram_lines(name: str, labels: dict, h: HistogramSnapshot) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(h.bounds + [float("inf")], h.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {cumulative}")
+    lines.append(f"{name}_count{_labels(**labels)} {h.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {h.sum!r}")
+    return lines
+
+
+def render_openmetrics(snapshots: Iterable[MetricsSnapshot], prefix: str = "brooks_sla") -> str:
+    """OpenMetrics text exposition of one or more bus snapshots."""
+    snapshots = list(snapshots)
+    out: list[str] = []
+
+    def family(name: str, kind: str, help: str, unit: Optional[str] = None) -> str:
+        full = f"{prefix}_{name}"
+        out.append(f"# TYPE {full} {kind}")
+        if unit:
+            out.append(f"# UNIT {full} {unit}")
+        out.append(f"# HELP {full} {help}")
+        return full
+
+    name = family("device_latency_seconds", "histogram", "Request to response time per device.", "seconds")
+    for snap in snapshots:
+        for dev in snap.devices:
+            out += _histogram_lines(name, {"port": snap.port, "device": dev.tag or dev.address}, dev.latency)
+    name = family("command_latency_seconds", "histogram", "Request to response time per command.", "seconds")
+    for snap in snapshots:
+        for command, h in sorted(snap.commands.items()):
+            out += _histogram_lines(name, {"port": snap.port, "command": _command_name(command)}, h)
+
+    for metric, help in (
+        ("timeouts", "Requests that got no response in time."),
+        ("retries", "Requests sent again after a failure."),
+        ("bytes_out", "Request bytes written, preambles included."),
+        ("bytes_in", "Response frame bytes read, preambles excluded."),
+    ):
+        name = family(metric, "counter", help)
+        for snap in snapshots:
+            for dev in snap.devices:
+                labels = _labels(port=snap.port, device=dev.tag or dev.address)
+                out.append(f"{name}_total{labels} {getattr(dev, metric)}")
+
+    name = family("protocol_errors", "counter", "Malformed frames (bad checksum, preamble or delimiter).")
+    for snap in snapshots:
+        out.append(f"{name}_total{_labels(port=snap.port)} {snap.protocol_errors}")
+    name = family("communication_errors", "counter", "Communication error bits reported by devices.")
+    for snap in snapshots:
+        for bit, count in snap.communication_errors.items():
+            out.append(f"{name}_total{_labels(port=snap.port, bit=bit)} {count}")
+    name = family("command_status", "counter", "Responses carrying each command status flag.")
+    for snap in snapshots:
+        for flag, count in snap.command_status.items():
+            out.append(f"{name}_total{_labels(port=snap.port, flag=flag)} {count}")
+    name = family("response_codes", "counter", "Responses with a nonzero command response code.")
+    for snap in snapshots:
+        for code, count in sorted(snap.response_codes.items()):
+            out.append(f"{name}_total{_labels(port=snap.port, code=code)} {count}")
+    out.append("# EOF")
+    return "\n".join(out) + "\n"
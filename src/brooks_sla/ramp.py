@@ -0,0 +1,144 @@
+from typing import Iterable, NamedTuple, Optional
+from pydantic import BaseModel
+from brooks_sla.core import CommandErrorId, FlowRateUnit, SoftstartMode
+from brooks_sla.driver import BrooksError, BrooksSLA, ResponseError
+from brooks_sla.scheduler import DeadlineMissed, Priority
+from enum import IntEnum
+import asyncio
+import math
+
+
+# Answers from firmware without (linear) softstart
+_NO_SOFTSTART = frozenset((CommandErrorId.COMMAND_NOT_IMPLEMENTED, CommandErrorId.INVALID_SELECTION))
+# Answers to a ramp rate outside what the firmware accepts
+_RATE_REFUSED = frozenset((CommandErrorId.PARAMETER_TOO_LARGE, CommandErrorId.PARAMETER_TOO_SMALL))
+
+
+class RampShape(IntEnum):
+    LINEAR = 0
+    S_CURVE = 1  # cosine easing; softstart is linear only, so always ramped client-side
+
+
+class RampSegment(BaseModel):
+    """One leg of a setpoint profile."""
+    target: float          # setpoint percent at the end of the segment
+    duration: float = 0.0  # seconds to reach target; 0 steps straight to it
+    hold: float = 0.0      # seconds to stay at target before the next segment
+    shape: RampShape = RampShape.LINEAR
+
+
+class SegmentRun(NamedTuple):
+    target: float
+    device_side: bool   # ramped by the device itself
+    writes: int         # setpoint writes sent
+    missed: int         # client-side points dropped for missing their slot
+    started_at: float   # loop time
+    finished_at: float  # loop time, after the hold
+
+
+async def run_profile(
+    device: BrooksSLA,
+    segments: Iterable[RampSegment],
+    start: Optional[float] = None,
+    step: float = 0.1,
+) -> list[SegmentRun]:
+    """
+    Run segments back to back. A linear segment is handed to the device's
+    softstart ramp, so it costs one endpoint write instead of one per step.
+    Segments the firmware cannot express (other shapes, a rate it refuses,
+    or no softstart at all) are ramped client-side: one setpoint every step
+    seconds on a fixed schedule, each dropped if it cannot get the bus
+    before the next is due. start is the setpoint percent the profile
+    begins from; by default it is read from the device.
+    """
+    if step <= 0.0:
+        raise BrooksError("step must be positive")
+    loop = asyncio.get_running_loop()
+    current = (await device.read_setpoint(Priority.SETPOINT)).percent if start is None else start
+    softstart = True
+    runs = []
+    for segment in segments:
+        started = loop.time()
+        device_side = True
+        writes = missed = 0
+        if segment.target == current:
+            pass
+        elif segment.duration <= 0.0:
+            if softstart:
+                softstart = await _disable_softstart(device)
+            await device.set_flow_percent(segment.target)
+            writes = 1
+        else:
+            device_side = False
+            if softstart and segment.shape == RampShape.LINEAR:
+                try:
+                    await device.ramp_to(segment.target, abs(segment.target - current) / segment.duration)
+                    device_side = True
+                    writes = 1
+                except ResponseError as e:
+                    if e.response_code in _NO_SOFTSTART:
+                        softstart = False
+                    elif e.response_code not in _RATE_REFUSED:
+                        raise
+            if not device_side:
+                if softstart:
+                    softstart = await _disable_softstart(device)
+                writes, missed = await _client_ramp(device, current, segment, started, step)
+        await _sleep_until(started + segment.duration + segment.hold)
+        runs.append(SegmentRun(segment.target, device_side, writes, missed, started, loop.time()))
+        current = segment.target
+    return runs
+
+
+async def _disable_softstart(device: BrooksSLA) -> bool:
+    """Make setpoint writes take effect at once; False if the firmware has no softstart."""
+    try:
+        await device.select_softstart(SoftstartMode.DISABLED)
+    except ResponseError as e:
+        if e.response_code not in _NO_SOFTSTART:
+            raise
+        return False
+    return True
+
+
+async def _client_ramp(
+    device: BrooksSLA,
+    start: float,
+    segment: RampSegment,
+    started: float,
+    step: float,
+) -> tuple[int, int]:
+    loop = asyncio.get_running_loop()
+    points = max(1, math.ceil(segment.duration / step))
+    interval = segment.duration / points
+    writes = missed = 0
+    for k in range(1, points):
+        delay = started + k * interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        elif delay < -interval:
+            missed += 1  # fell behind; skip rather than burst
+            continue
+        value = _interpolate(segment.shape, start, segment.target, k / points)
+        try:
+            await device.transaction(
+                device._setpoint_request(FlowRateUnit.PERCENT, value), Priority.SETPOINT, interval
+            )
+            writes += 1
+        except (DeadlineMissed, TimeoutError):
+            missed += 1
+    await _sleep_until(started + segment.duration)
+    await device.set_flow_percent(segment.target)
+    return writes + 1, missed
+
+
+def _interpolate(shape: RampShape, start: float, end: float, fraction: float) -> float:
+    if shape == RampShape.S_CURVE:
+        fraction = (1.0 - math.cos(math.pi * fraction)) / 2.0
+    return start + (end - start) * fraction
+
+
+async def _sleep_until(when: float) -> None:
+    delay = when - asyncio.get_running_loop().time()
+    if delay > 0:
+        await asyncio.sleep(delay)
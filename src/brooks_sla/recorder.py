@@ -0,0 +1,205 @@
+from typing import TYPE_CHECKING, Iterator, Optional
+from brooks_sla.codec import CODECS
+from brooks_sla.core import WARNING_RESPONSE_CODES, Command, FlowRateUnit
+from brooks_sla.driver import FlowReading, HartResponse
+import json
+import math
+import mmap
+import os
+import struct
+import time
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+MAGIC = b"BSLAREC1"
+VERSION = 1
+# magic, version, record size, capacity, count
+_HEADER = struct.Struct("<8sIIQQ")
+HEADER_SIZE = 32
+_COUNT_OFFSET = 24
+_COUNT = struct.Struct("<Q")
+# device index, monotonic timestamp, value, unit code, response code, device status
+_RECORD = struct.Struct("<HdfBBB")
+RECORD_SIZE = _RECORD.size
+_PV = CODECS[Command.READ_PRIMARY_VARIABLE]
+
+DEVICES_FILE = "devices.json"
+
+
+def record_dtype() -> "np.dtype":
+    """NumPy structured dtype matching one on-disk record."""
+    np = _numpy()
+    return np.dtype([
+        ("device", "<u2"),
+        ("timestamp", "<f8"),
+        ("value", "<f4"),
+        ("units", "u1"),
+        ("response_code", "u1"),
+        ("device_status", "u1"),
+    ])
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("Reading recordings requires numpy: pip install 'brooks-sla[numpy]'") from e
+    return numpy
+
+
+class TelemetryRecorder:
+    """
+    Append-only writer of fixed-width telemetry records into preallocated,
+    memory-mapped segment files under directory. A segment holds
+    segment_records records; the next one is opened when it fills up. The
+    record count in the header is updated per record, so segments can be read
+    while they are being written.
+    """
+
+    def __init__(self, directory: str, segment_records: int = 1 << 20, prefix: str = "telemetry") -> None:
+        self._directory = directory
+        self._segment_records = segment_records
+        self._prefix = prefix
+        self._devices: dict[str, int] = {}
+        self._map: Optional[mmap.mmap] = None
+        self._count = 0
+        self._segment = -1
+        os.makedirs(directory, exist_ok=True)
+        devices_path = os.path.join(directory, DEVICES_FILE)
+        if os.path.exists(devices_path):
+            with open(devices_path) as f:
+                self._devices = {name: int(i) for name, i in json.load(f).items()}
+        existing = segment_paths(directory, prefix)
+        self._segment = len(existing) - 1
+        self._rotate()
+
+    def __enter__(self) -> "TelemetryRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def device_index(self, name: str) -> int:
+        """Stable index for a device name, persisted next to the segments."""
+        index = self._devices.get(name)
+        if index is None:
+            index = self._devices[name] = len(self._devices)
+            path = os.path.join(self._directory, DEVICES_FILE)
+            with open(path + ".tmp", "w") as f:
+                json.dump(self._devices, f)
+            os.replace(path + ".tmp", path)
+        return index
+
+    @property
+    def segment_path(self) -> str:
+        return os.path.join(self._directory, f"{self._prefix}-{self._segment:06d}.seg")
+
+    def _rotate(self) -> None:
+        self._close_segment()
+        self._segment += 1
+        size = HEADER_SIZE + self._segment_records * RECORD_SIZE
+        with open(self.segment_path, "w+b") as f:
+            f.truncate(size)
+            self._map = mmap.mmap(f.fileno(), size)
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD_SIZE, self._segment_records, 0)
+        self._count = 0
+
+    def record(
+        self,
+        device: int,
+        value: float,
+        units: int,
+        response_code: int = 0,
+        device_status: int = 0,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        if self._map is None:
+            raise ValueError("Recorder is closed")
+        if self._count == self._segment_records:
+            self._rotate()
+        if timestamp is None:
+            timestamp = time.monotonic()
+        _RECORD.pack_into(
+            self._map,
+            HEADER_SIZE + self._count * RECORD_SIZE,
+            device, timestamp, value, units, response_code, device_status,
+        )
+        self._count += 1
+        _COUNT.pack_into(self._map, _COUNT_OFFSET, self._count)
+
+    def record_reading(
+        self,
+        device: int,
+        reading: FlowReading,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        self.record(device, reading.reading, reading.units, timestamp=timestamp)
+
+    def record_response(
+        self,
+        device: int,
+        response: HartResponse,
+        timestamp: Optional[float] = None,
+    ) -> None:
+        """
+        Record a READ_PRIMARY_VARIABLE response without building a
+        FlowReading. An error response, which carries no reading, is kept as
+        NaN with its response code.
+        """
+        code = response.response_code
+        if (code and code not in WARNING_RESPONSE_CODES) or len(response.data) < _PV.response_size:
+            units, value = FlowRateUnit.NOT_USED, math.nan
+        else:
+            units, value = _PV.decode(response.data)
+        self.record(device, value, units, code, response.device_status, timestamp)
+
+    def flush(self) -> None:
+        if self._map is not None:
+            self._map.flush()
+
+    def _close_segment(self) -> None:
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+
+    def close(self) -> None:
+        self._close_segment()
+
+
+def segment_paths(directory: str, prefix: str = "telemetry") -> list[str]:
+    names = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(prefix + "-") and name.endswith(".seg")
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+def open_segment(path: str) -> "np.ndarray":
+    """
+    Memory-map one segment read-only as a structured array of the records
+    written so far. No data is copied.
+    """
+    np = _numpy()
+    with open(path, "rb") as f:
+        magic, version, record_size, capacity, count = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a telemetry segment")
+    if version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"{path} has unsupported layout (version {version}, record size {record_size})")
+    if count == 0:
+        return np.zeros(0, dtype=record_dtype())
+    return np.memmap(path, dtype=record_dtype(), mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+def iter_segments(directory: str, prefix: str = "telemetry") -> Iterator["np.ndarray"]:
+    for path in segment_paths(directory, prefix):
+        yield open_segment(path)
+
+
+def load_devices(directory: str) -> dict[int, str]:
+    """Device index to name mapping of a recording."""
+    with open(os.path.join(directory, DEVICES_FILE)) as f:
+        return {int(i): name for name, i in json.load(f).items()}
@@ -0,0 +1,65 @@
+from pydantic import BaseModel
+from brooks_sla.core import Command
+
+
+# Commands that only read state and can be repeated without side effects
+IDEMPOTENT_COMMANDS = frozenset(
+    int(c) for c in Command if c.name.startswith(("READ_", "GET_"))
+)
+
+
+class DeviceUnavailable(TimeoutError):
+    """Raised without touching the bus while a device's circuit breaker is open."""
+
+
+class RetryPolicy(BaseModel):
+    """
+    How often a failed request is sent again. Reads are retried by default,
+    writes only when the caller asks for it.
+    """
+    attempts: int = 3         # total tries, including the first
+    backoff: float = 0.005    # seconds before the first retry, doubled after each
+    max_backoff: float = 0.1
+
+
+class BreakerPolicy(BaseModel):
+    failures: int = 3         # consecutive timeouts before the device is skipped
+    cooldown: float = 2.0     # seconds skipped; doubles while the device stays silent
+    max_cooldown: float = 30.0
+
+
+class CircuitBreaker:
+    """
+    Per-device failure tracking. After policy.failures consecutive timeouts
+    the breaker opens and requests fail fast until the cooldown passes; the
+    next request is then let through as a probe, and one more failure
+    reopens it with a longer cooldown.
+    """
+
+    __slots__ = ("policy", "failures", "open_until", "cooldown")
+
+    def __init__(self, policy: BreakerPolicy) -> None:
+        self.policy = policy
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = policy.cooldown
+
+    def allows(self, now: float) -> bool:
+        return now >= self.open_until
+
+    def is_open(self, now: float) -> bool:
+        return now < self.open_until
+
+    def success(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = self.policy.cooldown
+
+    def failure(self, now: float) -> bool:
+        """Count a timeout; returns True if the breaker is (now) open."""
+        self.failures += 1
+        if self.failures < self.policy.failures:
+            return False
+        self.open_until = now + self.cooldown
+        self.cooldown = min(self.cooldown * 2, self.policy.max_cooldown)
+        return True
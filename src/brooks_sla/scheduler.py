@@ -0,0 +1,161 @@
+from collections import deque
+from enum import IntEnum
+from typing import Optional
+from pydantic import BaseModel
+import asyncio
+
+
+class Priority(IntEnum):
+    SETPOINT = 0   # setpoint writes and valve overrides
+    READ = 1       # user initiated reads
+    TELEMETRY = 2  # background polling
+
+
+DEFAULT_DEADLINES: dict[Priority, Optional[float]] = {
+    Priority.SETPOINT: None,
+    Priority.READ: None,
+    Priority.TELEMETRY: 1.0,
+}
+
+
+class DeadlineMissed(TimeoutError):
+    """A queued transaction was dropped because it could not start before its deadline."""
+
+
+class SchedulerStats(BaseModel):
+    priority: Priority
+    queue_depth: int
+    max_queue_depth: int
+    granted: int
+    dropped: int
+    mean_wait: float
+    max_wait: float
+
+
+class _ClassStats:
+    __slots__ = ("max_depth", "granted", "dropped", "total_wait", "max_wait")
+
+    def __init__(self) -> None:
+        self.max_depth = 0
+        self.granted = 0
+        self.dropped = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float) -> None:
+        self.granted += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+
+class _Waiter:
+    __slots__ = ("future", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, enqueued_at: float) -> None:
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class _Slot:
+    __slots__ = ("_scheduler", "_priority", "_deadline")
+
+    def __init__(self, scheduler: "TransactionScheduler", priority: Priority, deadline: Optional[float]) -> None:
+        self._scheduler = scheduler
+        self._priority = priority
+        self._deadline = deadline
+
+    async def __aenter__(self) -> None:
+        await self._scheduler.acquire(self._priority, self._deadline)
+
+    async def __aexit__(self, *exc) -> None:
+        self._scheduler.release()
+
+
+class TransactionScheduler:
+    """
+    Priority lock for a bus. Whenever the line frees up, the oldest waiter of
+    the most urgent class goes next. Waiters that cannot start before their
+    class deadline are dropped with DeadlineMissed instead of running stale.
+    """
+
+    def __init__(self, deadlines: Optional[dict[Priority, Optional[float]]] = None) -> None:
+        self._deadlines = dict(DEFAULT_DEADLINES)
+        if deadlines:
+            self._deadlines.update(deadlines)
+        self._queues: tuple[deque[_Waiter], ...] = tuple(deque() for _ in Priority)
+        self._stats = tuple(_ClassStats() for _ in Priority)
+        self._busy = False
+
+    def slot(self, priority: Priority = Priority.READ, deadline: Optional[float] = None) -> _Slot:
+        """Async context manager holding the bus for one transaction."""
+        return _Slot(self, priority, deadline)
+
+    def set_deadline(self, priority: Priority, deadline: Optional[float]) -> None:
+        self._deadlines[priority] = deadline
+
+    @property
+    def busy(self) -> bool:
+        return self._busy
+
+    async def acquire(self, priority: Priority = Priority.READ, deadline: Optional[float] = None) -> None:
+        stats = self._stats[priority]
+        if not self._busy:
+            self._busy = True
+            stats.record_wait(0.0)
+            return
+
+        if deadline is None:
+            deadline = self._deadlines[priority]
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop.create_future(), loop.time())
+        queue = self._queues[priority]
+        queue.append(waiter)
+        if len(queue) > stats.max_depth:
+            stats.max_depth = len(queue)
+        try:
+            if deadline is None:
+                await waiter.future
+            else:
+                async with asyncio.timeout(deadline):
+                    await waiter.future
+        except BaseException as e:
+            granted = waiter.future.done() and not waiter.future.cancelled()
+            if granted:
+                # Lost the race with release(); pass the slot on.
+                self.release()
+            else:
+                try:
+                    queue.remove(waiter)
+                except ValueError:
+                    pass  # already skipped by release()
+            if isinstance(e, TimeoutError):
+                stats.dropped += 1
+                raise DeadlineMissed(f"{priority.name} transaction missed its {deadline}s deadline") from None
+            raise
+
+    def release(self) -> None:
+        loop = asyncio.get_running_loop()
+        for priority, queue in zip(Priority, self._queues):
+            while queue:
+                waiter = queue.popleft()
+                if waiter.future.done():
+                    continue
+                waiter.future.set_result(None)
+                self._stats[priority].record_wait(loop.time() - waiter.enqueued_at)
+                return
+        self._busy = False
+
+    def stats(self) -> list[SchedulerStats]:
+        out = []
+        for priority, queue, stats in zip(Priority, self._queues, self._stats):
+            out.append(SchedulerStats(
+                priority=priority,
+                queue_depth=len(queue),
+                max_queue_depth=stats.max_depth,
+                granted=stats.granted,
+                dropped=stats.dropped,
+                mean_wait=stats.total_wait / stats.granted if stats.granted else 0.0,
+                max_wait=stats.max_wait,
+            ))
+        return out
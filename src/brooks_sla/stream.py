@@ -0,0 +1,126 @@
+from typing import TYPE_CHECKING, AsyncIterator, NamedTuple, Optional
+from brooks_sla.codec import CODECS
+from brooks_sla.core import Command
+from brooks_sla.driver import ResponseError
+from brooks_sla.hart import HartProtocolError
+from brooks_sla.recovery import DeviceUnavailable
+from brooks_sla.scheduler import DeadlineMissed, Priority
+import asyncio
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover - depends on the environment
+    raise ImportError("brooks_sla.stream requires numpy: pip install 'brooks-sla[numpy]'") from e
+
+if TYPE_CHECKING:
+    from brooks_sla.driver import BrooksSLA
+
+
+_PV = CODECS[Command.READ_PRIMARY_VARIABLE]
+
+
+class FlowBatch(NamedTuple):
+    """NumPy views into a FlowRing; valid until the ring wraps over them."""
+    timestamps: np.ndarray     # float64, event loop monotonic seconds
+    values: np.ndarray         # float32
+    units: np.ndarray          # uint8 flow unit codes
+    response_code: np.ndarray  # uint8
+    device_status: np.ndarray  # uint8
+
+
+class FlowRing:
+    """
+    Preallocated ring of flow samples. Appending writes into fixed arrays;
+    take() hands back contiguous views, so a capture runs with flat memory.
+    """
+
+    def __init__(self, capacity: int = 8192) -> None:
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float32)
+        self.units = np.zeros(capacity, dtype=np.uint8)
+        self.response_code = np.zeros(capacity, dtype=np.uint8)
+        self.device_status = np.zeros(capacity, dtype=np.uint8)
+        self._written = 0
+        self._read = 0
+        self.overruns = 0  # samples overwritten before take()
+        self.missed = 0    # polls that timed out or were dropped as stale
+
+    def __len__(self) -> int:
+        return self._written - self._read
+
+    def append(self, timestamp: float, value: float, units: int, response_code: int, device_status: int) -> None:
+        i = self._written % self.capacity
+        self.timestamps[i] = timestamp
+        self.values[i] = value
+        self.units[i] = units
+        self.response_code[i] = response_code
+        self.device_status[i] = device_status
+        self._written += 1
+        if self._written - self._read > self.capacity:
+            self._read += 1
+            self.overruns += 1
+
+    def take(self, limit: Optional[int] = None) -> FlowBatch:
+        """Views over the oldest unread samples, up to the end of the buffer."""
+        start = self._read % self.capacity
+        n = min(self._written - self._read, self.capacity - start)
+        if limit is not None:
+            n = min(n, limit)
+        end = start + n
+        self._read += n
+        return FlowBatch(
+            self.timestamps[start:end],
+            self.values[start:end],
+            self.units[start:end],
+            self.response_code[start:end],
+            self.device_status[start:end],
+        )
+
+
+async def stream_flow(
+    device: "BrooksSLA",
+    rate: Optional[float] = None,
+    batch: int = 256,
+    ring: Optional[FlowRing] = None,
+    priority: Priority = Priority.TELEMETRY,
+) -> AsyncIterator[FlowBatch]:
+    """
+    Poll READ_PRIMARY_VARIABLE at rate samples/s (None: as fast as the bus
+    allows) and yield batches of up to batch samples. Polls run on a fixed
+    schedule so a slow sample does not shift the ones after it.
+    """
+    if ring is None:
+        ring = FlowRing(max(4 * batch, 1024))
+    if ring.capacity < 2 * batch:
+        raise ValueError("ring capacity must be at least twice the batch size")
+    request = device.construct_command(Command.READ_PRIMARY_VARIABLE)
+    loop = asyncio.get_running_loop()
+    period = None if rate is None else 1.0 / rate
+    next_at = loop.time()
+    while True:
+        if period is not None:
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -period:
+                next_at = loop.time()  # fell behind; skip rather than burst
+            next_at += period
+        try:
+            frame = await device.exchange(request, priority)
+        except DeviceUnavailable:
+            # Fails without touching the bus, so wait rather than spin.
+            ring.missed += 1
+            await asyncio.sleep(period or device.bus.breaker_policy.cooldown)
+            continue
+        except (TimeoutError, DeadlineMissed, HartProtocolError, ResponseError):
+            ring.missed += 1
+            continue
+        if frame.byte_count < 2 + _PV.response_size:
+            ring.missed += 1  # error response without a reading
+            continue
+        data = frame.data
+        units, value = _PV.decode(data, 2)
+        ring.append(loop.time(), value, units, data[0], data[1])
+        if len(ring) >= batch:
+            yield ring.take(batch)
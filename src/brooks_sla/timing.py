@@ -0,0 +1,87 @@
+from brooks_sla.core import Command
+
+
+# Response data bytes (after the two status bytes) per command. Commands
+# missing here are budgeted at DEFAULT_RESPONSE_BYTES.
+RESPONSE_DATA_BYTES: dict[int, int] = {
+    Command.READ_UNIQUE_IDENTIFIER: 12,
+    Command.READ_PRIMARY_VARIABLE: 5,
+    Command.READ_PRIMARY_VARIABLE_CURRENT_AND_PERCENT_RANGE: 8,
+    Command.READ_ALL_DYNAMIC_VARIABLES_AND_CURRENT: 24,
+    Command.WRITE_POLLING_ADDRESS: 1,
+    Command.READ_UNIQUE_IDENTIFIER_ASSOCIATED_WITH_TAG: 12,
+    Command.READ_MESSAGE: 24,
+    Command.READ_TAG_DESCRIPTOR_DATE: 21,
+    Command.READ_PRIMARY_VARIABLE_SENSOR_INFORMATION: 16,
+    Command.READ_OUTPUT_INFORMATION: 17,
+    Command.READ_FINAL_ASSEMBLY_NUMBER: 3,
+    Command.WRITE_MESSAGE: 24,
+    Command.WRITE_TAG_DESCRIPTOR_DATE: 21,
+    Command.WRITE_FINAL_ASSEMBLY_NUMBER: 3,
+    Command.RESET_CONFIGURATION_CHANGED_FLAG: 0,
+    Command.PERFORM_MASTER_RESET: 0,
+    Command.WRITE_NUMBER_OF_RESPONSE_PREAMBLES: 1,
+    Command.READ_FULL_SCALE_FLOW_RANGE: 5,
+    Command.SELECT_FLOW_UNIT: 2,
+    Command.READ_SETPOINT_PERCENT_AND_SELECTED_UNITS: 10,
+    Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS: 10,
+    Command.READ_VALVE_CONTROL_VALUE: 5,
+    Command.READ_GAS_DENSITY_FLOW_REF_AND_FLOW_RANGE: 20,
+    Command.READ_STANDARD_TEMPERATURE_AND_PRESSURE: 10,
+    Command.SELECT_SOFTSTART: 1,
+    Command.WRITE_LINEAR_SOFTSTART_RAMP_VALUE: 4,
+}
+DEFAULT_RESPONSE_BYTES = 25
+
+# Characters of slack on top of the computed wire time.
+MARGIN_CHARS = 4
+
+
+def response_chars(command: int, preambles: int = 5, long_address: bool = True) -> int:
+    """Characters on the wire for the expected response to command."""
+    data = RESPONSE_DATA_BYTES.get(command, DEFAULT_RESPONSE_BYTES)
+    address = 5 if long_address else 1
+    # preamble, delimiter, address, command, byte count, 2 status, data, checksum
+    return preambles + 1 + address + 2 + 2 + data + 1
+
+
+class TurnaroundEstimator:
+    """
+    Smoothed device turnaround (time on top of wire time), tracked like a TCP
+    round trip estimator: allowance = estimate + 4 * deviation, never below
+    floor. Timeouts back the allowance off towards ceiling, so a command
+    slower than the ones learned from soon gets enough time.
+    """
+
+    __slots__ = ("estimate", "deviation", "floor", "ceiling", "samples")
+
+    ALPHA = 0.125
+    BETA = 0.25
+
+    def __init__(self, initial: float = 0.1, floor: float = 0.02, ceiling: float = 1.0) -> None:
+        self.estimate = initial
+        self.deviation = initial / 2
+        self.floor = floor
+        self.ceiling = ceiling
+        self.samples = 0
+
+    def update(self, sample: float) -> None:
+        if sample < 0.0:
+            sample = 0.0
+        if self.samples == 0:
+            self.estimate = sample
+            self.deviation = sample / 2
+        else:
+            self.deviation += self.BETA * (abs(sample - self.estimate) - self.deviation)
+            self.estimate += self.ALPHA * (sample - self.estimate)
+        self.samples += 1
+
+    def timed_out(self) -> None:
+        if self.samples == 0:
+            return
+        # Double the margin, like TCP's retransmission backoff; a dead device
+        # is kept cheap by the circuit breaker, not by holding the window shut.
+        self.deviation = min(self.deviation * 2 + self.floor, self.ceiling)
+
+    def allowance(self) -> float:
+        return min(max(self.estimate + 4 * self.deviation, self.floor), self.ceiling)
@@ -0,0 +1,262 @@
+from typing import TYPE_CHECKING, Any, Optional
+from pydantic import BaseModel
+from brooks_sla.core import Command, DensityUnit, FlowRateUnit, PressureUnit, TemperatureUnit
+from brooks_sla.driver import BrooksError, BrooksSLA, FlowRange, FlowReading
+import math
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Flow unit names are <quantity>_PER_<time>; quantities in m3 or kg, times in s
+_VOLUMES = {
+    "CUBIC_METERS": 1.0,
+    "LITERS": 1e-3,
+    "ML": 1e-6,
+    "CC": 1e-6,
+    "CUBIC_FEET": 0.028316846592,
+    "CUBIC_INCHES": 1.6387064e-5,
+    "GALLONS": 3.785411784e-3,
+    "IMP_GALLONS": 4.54609e-3,
+    "BARRELS": 0.158987294928,
+}
+_MASSES = {
+    "KG": 1.0,
+    "GRAMS": 1e-3,
+    "LBS": 0.45359237,
+    "OUNCES": 0.028349523125,
+}
+_TIMES = {"SEC": 1.0, "MIN": 60.0, "HOUR": 3600.0, "DAY": 86400.0}
+
+
+def _flow_factors(quantities: dict[str, float]) -> dict[FlowRateUnit, float]:
+    factors = {}
+    for unit in FlowRateUnit:
+        quantity, _, time = unit.name.partition("_PER_")
+        if quantity in quantities and time in _TIMES:
+            factors[unit] = quantities[quantity] / _TIMES[time]
+    return factors
+
+
+FLOW_VOLUME = _flow_factors(_VOLUMES)  # m3/s per unit
+FLOW_MASS = _flow_factors(_MASSES)     # kg/s per unit
+
+PRESSURE_PA: dict[PressureUnit, float] = {
+    PressureUnit.IN_H2O: 248.84,  # at 68 degF
+    PressureUnit.IN_H2O_ALT: 248.84,
+    PressureUnit.IN_HG: 3386.389,
+    PressureUnit.IN_HG_ALT: 3386.389,
+    PressureUnit.FT_H2O: 2986.08,
+    PressureUnit.FT_H2O_ALT: 2986.08,
+    PressureUnit.CM_H2O: 98.0665,
+    PressureUnit.PSI_A: 6894.757293168,
+    PressureUnit.PSI_B: 6894.757293168,
+    PressureUnit.BAR: 1e5,
+    PressureUnit.BAR_ALT: 1e5,
+    PressureUnit.MILLIBAR: 100.0,
+    PressureUnit.MBAR_ALT: 100.0,
+    PressureUnit.PASCAL: 1.0,
+    PressureUnit.PASCAL_ALT: 1.0,
+    PressureUnit.KILOPASCAL: 1000.0,
+    PressureUnit.KPA_ALT: 1000.0,
+    PressureUnit.TORR: 101325.0 / 760.0,
+    PressureUnit.TORR_ALT: 101325.0 / 760.0,
+    PressureUnit.MILLITORR: 101325.0 / 760000.0,
+    PressureUnit.MILLITORR_ALT: 101325.0 / 760000.0,
+    PressureUnit.MM_HG: 133.322387415,
+    PressureUnit.MM_HG_ALT: 133.322387415,
+    PressureUnit.STANDARD_ATMOSPHERE: 101325.0,
+    PressureUnit.ATM: 101325.0,
+    PressureUnit.KG_PER_CM2_A: 98066.5,
+    PressureUnit.KG_PER_CM2_B: 98066.5,
+    PressureUnit.GR_PER_CM2: 98.0665,
+    PressureUnit.GR_PER_CM2_ALT: 98.0665,
+}
+
+# kelvin = value * scale + offset
+TEMPERATURE_K: dict[TemperatureUnit, tuple[float, float]] = {
+    TemperatureUnit.KELVIN: (1.0, 0.0),
+    TemperatureUnit.CELSIUS: (1.0, 273.15),
+    TemperatureUnit.FAHRENHEIT: (5.0 / 9.0, 273.15 - 32.0 * 5.0 / 9.0),
+}
+
+DENSITY_KG_M3: dict[DensityUnit, float] = {
+    DensityUnit.KG_PER_M3: 1.0,
+    DensityUnit.GRAMS_PER_L: 1.0,
+    DensityUnit.GRAMS_PER_CM3: 1000.0,
+    DensityUnit.GRAMS_PER_ML: 1000.0,
+    DensityUnit.KG_PER_L: 1000.0,
+    DensityUnit.LBS_PER_GAL: 119.826427,
+    DensityUnit.LBS_PER_FT3: 16.01846337,
+    DensityUnit.LBS_PER_IN3: 27679.9047,
+}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("Array unit conversion requires numpy: pip install 'brooks-sla[numpy]'") from e
+    return numpy
+
+
+class _Table:
+    """Factors indexed by unit code, NaN for codes that do not convert; as an array on first vectorized use."""
+
+    __slots__ = ("factors", "_array")
+
+    def __init__(self, factors: dict[Any, float]) -> None:
+        self.factors = [math.nan] * 256
+        for unit, factor in factors.items():
+            self.factors[unit] = factor
+        self._array: Optional["np.ndarray"] = None
+
+    def __getitem__(self, code: int) -> float:
+        return self.factors[code]
+
+    def __setitem__(self, code: int, factor: float) -> None:
+        self.factors[code] = factor
+        self._array = None
+
+    def array(self) -> "np.ndarray":
+        if self._array is None:
+            np = _numpy()
+            self._array = np.asarray(self.factors, dtype=np.float64)
+        return self._array
+
+
+_PRESSURE = _Table(PRESSURE_PA)
+_DENSITY = _Table(DENSITY_KG_M3)
+_TEMPERATURE_SCALE = _Table({u: s for u, (s, _) in TEMPERATURE_K.items()})
+_TEMPERATURE_OFFSET = _Table({u: o for u, (_, o) in TEMPERATURE_K.items()})
+
+
+def _factor(table: _Table, units: int, to: int, kind: type) -> float:
+    factor = table[units] / table[to]
+    if math.isnan(factor):
+        raise BrooksError(f"Cannot convert {_name(kind, units)} to {_name(kind, to)}")
+    return factor
+
+
+def _name(kind: type, code: int) -> str:
+    try:
+        return kind(code).name
+    except ValueError:
+        return str(code)
+
+
+def _scaled(table: _Table, values: Any, units: Any, to: int, kind: type) -> Any:
+    """values in units (one code, or a code per sample) scaled to to."""
+    if isinstance(units, int):
+        factor = _factor(table, units, to, kind)
+        if isinstance(values, (int, float)):
+            return values * factor
+        return _numpy().asarray(values, dtype=_numpy().float64) * factor
+    np = _numpy()
+    if math.isnan(table[to]):
+        raise BrooksError(f"Cannot convert to {_name(kind, to)}")
+    # Codes that do not convert come out as NaN
+    return np.asarray(values, dtype=np.float64) * (table.array()[np.asarray(units, dtype=np.intp)] / table[to])
+
+
+def convert_pressure(values: Any, units: Any, to: PressureUnit) -> Any:
+    """
+    Pressure conversion of a float or an array; units is one code or a
+    code per sample. Gauge and absolute units convert alike (no offset).
+    """
+    return _scaled(_PRESSURE, values, units, to, PressureUnit)
+
+
+def convert_density(values: Any, units: Any, to: DensityUnit) -> Any:
+    return _scaled(_DENSITY, values, units, to, DensityUnit)
+
+
+def convert_temperature(values: Any, units: Any, to: TemperatureUnit) -> Any:
+    if isinstance(units, int) and isinstance(values, (int, float)):
+        kelvin = values * _TEMPERATURE_SCALE[units] + _TEMPERATURE_OFFSET[units]
+        value = (kelvin - _TEMPERATURE_OFFSET[to]) / _TEMPERATURE_SCALE[to]
+        if math.isnan(value):
+            raise BrooksError(f"Cannot convert {_name(TemperatureUnit, units)} to {_name(TemperatureUnit, to)}")
+        return value
+    np = _numpy()
+    codes = np.asarray(units, dtype=np.intp)
+    kelvin = np.asarray(values, dtype=np.float64) * _TEMPERATURE_SCALE.array()[codes] + _TEMPERATURE_OFFSET.array()[codes]
+    return (kelvin - _TEMPERATURE_OFFSET[to]) / _TEMPERATURE_SCALE[to]
+
+
+class GasReference(BaseModel):
+    """
+    Gas data reported by READ_GAS_DENSITY_FLOW_REF_AND_FLOW_RANGE and
+    READ_STANDARD_TEMPERATURE_AND_PRESSURE, in SI units.
+    """
+    gas: int
+    density: float                # kg/m3 at the reference conditions
+    reference_temperature: float  # K
+    reference_pressure: float     # Pa, absolute
+    standard_temperature: float   # K
+    standard_pressure: float      # Pa, absolute
+    full_scale: Optional[FlowRange] = None
+
+    def density_at(self, temperature: float, pressure: float) -> float:
+        """Ideal-gas density in kg/m3 at temperature (K) and absolute pressure (Pa)."""
+        return self.density * (pressure / self.reference_pressure) * (self.reference_temperature / temperature)
+
+    @property
+    def standard_density(self) -> float:
+        return self.density_at(self.standard_temperature, self.standard_pressure)
+
+
+async def read_gas_reference(device: BrooksSLA, gas: int = 1) -> GasReference:
+    """Density, reference and standard conditions and full scale of gas, in two transactions."""
+    du, density, tu, temperature, pu, pressure, fu, full_scale = await device.call(
+        Command.READ_GAS_DENSITY_FLOW_REF_AND_FLOW_RANGE, gas
+    )
+    stu, standard_temperature, spu, standard_pressure = await device.call(Command.READ_STANDARD_TEMPERATURE_AND_PRESSURE)
+    return GasReference(
+        gas=gas,
+        density=convert_density(density, du, DensityUnit.KG_PER_M3),
+        reference_temperature=convert_temperature(temperature, tu, TemperatureUnit.KELVIN),
+        reference_pressure=convert_pressure(pressure, pu, PressureUnit.PASCAL),
+        standard_temperature=convert_temperature(standard_temperature, stu, TemperatureUnit.KELVIN),
+        standard_pressure=convert_pressure(standard_pressure, spu, PressureUnit.PASCAL),
+        full_scale=FlowRange(units=FlowRateUnit(fu), value=full_scale),
+    )
+
+
+class UnitConverter:
+    """
+    Flow conversion from a per-unit-code factor table, so a device can stay
+    in one native unit while every consumer reads its own. Volumetric flow
+    is taken at the standard conditions of gas, whose density there links it
+    to mass flow; PERCENT converts through the full scale range. Arrays take
+    one unit code or a code per sample (as recorded) and are converted in
+    a single vectorized NumPy pass.
+    """
+
+    def __init__(self, gas: Optional[GasReference] = None, full_scale: Optional[FlowRange] = None) -> None:
+        self._gas = gas
+        if full_scale is None and gas is not None:
+            full_scale = gas.full_scale
+        density = gas.standard_density if gas is not None else math.nan
+        # Flow unit code -> m3/s at standard conditions
+        table = _Table(FLOW_VOLUME)
+        for unit, factor in FLOW_MASS.items():
+            table[unit] = factor / density
+        if full_scale is not None:
+            table[FlowRateUnit.PERCENT] = table[full_scale.units] * full_scale.value / 100.0
+        self._flow = table
+
+    @property
+    def gas(self) -> Optional[GasReference]:
+        return self._gas
+
+    def factor(self, units: int, to: FlowRateUnit) -> float:
+        """Multiplier taking flow in units to to."""
+        return _factor(self._flow, units, to, FlowRateUnit)
+
+    def flow(self, values: Any, units: Any, to: FlowRateUnit) -> Any:
+        """A float or an array of flows in units (one code or a code per sample) converted to to."""
+        return _scaled(self._flow, values, units, to, FlowRateUnit)
+
+    def reading(self, reading: FlowReading, to: FlowRateUnit) -> FlowReading:
+        return FlowReading(reading.reading * self.factor(reading.units, to), to)
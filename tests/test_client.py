@@ -0,0 +1,63 @@
+import asyncio
+import concurrent.futures
+import time
+import pytest
+from brooks_sla.client import SyncClient, background_loop
+from brooks_sla.driver import BrooksBus
+from brooks_sla.emulator import BrooksEmulator
+
+
+def emulated_client(count: int) -> tuple[SyncClient, BrooksEmulator]:
+    client = SyncClient()
+
+    async def setup() -> tuple[BrooksEmulator, BrooksBus]:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        emulator.add_devices(count)
+        bus = BrooksBus("emulated", gap_chars=0.0)
+        bus.attach(*emulator.open_connection())
+        return emulator, bus
+
+    emulator, bus = client.run(setup())
+    client.add_bus("emulated", bus)
+    return client, emulator
+
+
+def test_blocking_calls_share_one_loop_and_bus():
+    client, emulator = emulated_client(4)
+    with client:
+        assert client.loop is background_loop()
+        devs = [client.device(d.tag, "emulated", address=d.device_id) for d in emulator.devices]
+        assert client.bus("emulated") is devs[0].device.bus
+
+        assert devs[1].set_flow_percent(25.0).percent == pytest.approx(25.0)
+        assert devs[1].read_flow().reading == pytest.approx(25.0)
+
+        client.set_flow_percent_many(devs, 40.0)
+        assert [r.reading for r in client.read_flow_many(devs)] == pytest.approx([40.0] * 4)
+        group = client.set_flows({dev: 10.0 * i for i, dev in enumerate(devs)})
+        assert [r.setting.percent for r in group.results.values()] == pytest.approx([0.0, 10.0, 20.0, 30.0])
+        client.set_flow_percent_many(devs, 40.0)
+
+        # Plain threads can share the client
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            readings = list(pool.map(lambda d: d.read_flow(), devs * 8))
+        assert len(readings) == 32
+
+        future = devs[2].submit("read_setpoint")
+        assert future.result(1.0).percent == pytest.approx(40.0)
+
+        n = 200
+        start = time.perf_counter()
+        for _ in range(n):
+            devs[0].read_flow()
+        assert (time.perf_counter() - start) / n < 0.005
+
+
+def test_run_refuses_its_own_loop():
+    client = SyncClient()
+
+    async def nested() -> None:
+        with pytest.raises(RuntimeError):
+            client.run(asyncio.sleep(0))
+
+    client.run(nested())
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from brooks_sla.codec import CODECS, RAW, Layout, codec, register
+from brooks_sla.core import Command, FlowRateUnit
+from brooks_sla.driver import BrooksBus
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice
+
+
+def test_every_command_has_a_codec():
+    assert set(CODECS) == {int(c) for c in Command}
+    pv = codec(Command.READ_PRIMARY_VARIABLE)
+    assert pv.result.__name__ == "ReadPrimaryVariable"
+    assert pv.result._fields == ("units", "value")
+    with pytest.raises(KeyError):
+        codec(255)
+
+
+def test_encode_and_decode_from_offset():
+    setpoint = codec(Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS)
+    request = setpoint.encode(FlowRateUnit.PERCENT, 25.0)
+    assert request == bytes([FlowRateUnit.PERCENT]) + b"\x41\xc8\x00\x00"
+    reply = memoryview(b"\x00\x00" + request + request)
+    result = setpoint.decode(reply, 2)
+    assert result.percent == 25.0 and result.value == 25.0
+
+    dynamic = codec(Command.READ_ALL_DYNAMIC_VARIABLES_AND_CURRENT)
+    result = dynamic.decode(b"\x41\x00\x00\x00" + b"\x11\x3f\x80\x00\x00" * 2 + b"\x11")
+    assert result.current == 8.0
+    assert result.variables == ((0x11, 1.0), (0x11, 1.0))
+
+    assert RAW.rest and codec(Command.CHANGE_USER_PASSWORD).encode(b"\x01\x02") == b"\x01\x02"
+    assert codec(Command.READ_MODEL_NUMBER).decode(b"\x00\x00SLA5850", 2).model == b"SLA5850"
+
+
+def test_register_overrides_layout():
+    original = CODECS[Command.READ_PID_CONTROLLER_VALUES]
+    try:
+        pid = register(Command.READ_PID_CONTROLLER_VALUES, Layout("", ">fff", ("p", "i", "d")))
+        assert pid.decode(bytes(12)) == (0.0, 0.0, 0.0)
+    finally:
+        CODECS[Command.READ_PID_CONTROLLER_VALUES] = original
+
+
+def test_call_round_trips_against_emulator():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None)
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        bus = BrooksBus("emulated")
+        bus.attach(*emulator.open_connection())
+        mfc = bus.device("MFC-A", address=1)
+
+        identity = await mfc.call(Command.READ_UNIQUE_IDENTIFIER)
+        assert identity.expansion == 254
+        tag = await mfc.call(Command.READ_TAG_DESCRIPTOR_DATE)
+        assert len(tag.tag) == 6 and len(tag.descriptor) == 12
+        alarm = await mfc.call(Command.WRITE_HIGH_LOW_FLOW_ALARM, 90.0, 10.0)
+        assert (alarm.high, alarm.low) == (90.0, 10.0)
+        assert await mfc.call(Command.READ_HIGH_LOW_FLOW_ALARM) == (90.0, 10.0)
+
+        await mfc.set_flow_percent(40.0)
+        assert (await mfc.read_setpoint()).percent == 40.0
+        snapshot = await mfc.read_snapshot()
+        assert snapshot.variables[0].units == (await mfc.read_flow()).units
+
+    asyncio.run(main())
@@ -0,0 +1,13 @@
+from brooks_sla.core import (
+    COMMAND_STATUS_TABLE,
+    COMMUNICATION_STATUS_TABLE,
+    CommandStatus,
+    CommunicationStatus,
+)
+
+
+def test_status_tables_match_models():
+    for raw in range(256):
+        assert COMMUNICATION_STATUS_TABLE[raw]._asdict() == CommunicationStatus(raw=raw).model_dump()
+        assert COMMAND_STATUS_TABLE[raw]._asdict() == CommandStatus(raw=raw).model_dump()
+        assert COMMAND_STATUS_TABLE[raw].model() == CommandStatus(raw=raw)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import pytest
+from brooks_sla.core import Command, CommandErrorId, FlowRateUnit
+from brooks_sla.discovery import DeviceRecord, DeviceRegistry, discover
+from brooks_sla.driver import BrooksBus
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice
+from brooks_sla.scheduler import DeadlineMissed, Priority
+import brooks_sla.emulator as emulator_module
+
+
+def make_bus(emulator: BrooksEmulator) -> BrooksBus:
+    bus = BrooksBus("emulated")
+    bus.attach(*emulator.open_connection())
+    return bus
+
+
+def test_discover_tags_and_polling_addresses(tmp_path):
+    async def main() -> float:
+        emulator = BrooksEmulator(turnaround=0.002)
+        emulator.add_device(EmulatedDevice("MFC-A", 0x000A01, polling_address=1, full_scale=20.0))
+        emulator.add_device(EmulatedDevice("MFC-B", 0x000B02, polling_address=2))
+        emulator.add_device(EmulatedDevice("MFC-C", 0x000C03, polling_address=5))
+        bus = make_bus(emulator)
+        registry = DeviceRegistry(str(tmp_path / "devices.json"))
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        records = await discover(
+            bus,
+            tags=["MFC-A", "MFC-B", "MISSING"],
+            polling_addresses=range(0, 8),
+            probe_timeout=0.02,
+            registry=registry,
+        )
+        elapsed = loop.time() - start
+
+        by_tag = {r.tag: r for r in records}
+        assert sorted(by_tag) == ["MFC-A", "MFC-B", "MFC-C"]
+        a = by_tag["MFC-A"]
+        assert a.address == 0x000A01 and a.polling_address == 1
+        assert a.model == "SLA5850S" and a.serial == "F0002561"
+        assert a.flow_units == FlowRateUnit.LITERS_PER_MIN
+        assert a.flow_ranges[1].value == pytest.approx(20.0)
+        assert by_tag["MFC-C"].polling_address == 5
+
+        saved = json.loads((tmp_path / "devices.json").read_text())
+        assert set(saved["devices"]) == {"MFC-A", "MFC-B", "MFC-C"}
+        return elapsed
+
+    # Six silent probes must not cost anywhere near the 1 s default timeout each.
+    assert asyncio.run(main()) < 1.0
+
+
+def test_registry_restore_trusts_then_reresolves(tmp_path):
+    path = str(tmp_path / "devices.json")
+
+    async def populate() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        emulator.add_device(EmulatedDevice("MFC-B", 2))
+        await discover(make_bus(emulator), tags=["MFC-A", "MFC-B"], registry=DeviceRegistry(path))
+
+    async def restart() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        a = emulator.add_device(EmulatedDevice("MFC-A", 1))
+        # MFC-B was swapped for a unit with the same tag but a new id
+        b = emulator.add_device(EmulatedDevice("MFC-B", 9))
+        bus = make_bus(emulator)
+        registry = DeviceRegistry(path)
+        mfc_a, mfc_b = registry.restore(bus)
+
+        await mfc_a.set_flow_percent(10.0)
+        assert a.requests == 1  # no discovery traffic
+        assert (await mfc_a.read_flow_range(1)).value == pytest.approx(100.0)
+        assert a.requests == 1  # range came from the registry
+
+        assert (await mfc_b.set_flow_percent(30.0)).percent == pytest.approx(30.0)
+        assert b.setpoint_percent == pytest.approx(30.0)
+        assert mfc_b.config.address == 9
+        assert DeviceRegistry(path).get("MFC-B").address == 9
+
+    asyncio.run(populate())
+    asyncio.run(restart())
+
+
+def test_missed_deadline_does_not_reresolve(tmp_path):
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        a = emulator.add_device(EmulatedDevice("MFC-A", 1))
+        registry = DeviceRegistry(str(tmp_path / "devices.json"))
+        registry.update(DeviceRecord(tag="MFC-A", address=1))
+        bus = make_bus(emulator)
+        (mfc,) = registry.restore(bus)
+
+        # The bus is busy, not the device: a dropped read says nothing about its address
+        await bus.scheduler.acquire(Priority.SETPOINT)
+        with pytest.raises(DeadlineMissed):
+            # A re-resolve would queue behind the held bus, so bound the wait
+            request = mfc.construct_command(Command.READ_PRIMARY_VARIABLE)
+            await asyncio.wait_for(mfc.transaction(request, deadline=0.01), 1.0)
+        bus.scheduler.release()
+        assert a.requests == 0
+        assert mfc._unverified
+
+    asyncio.run(main())
+
+
+def test_missing_tags_are_probed_once():
+    async def main() -> int:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        reader, writer = emulator.open_connection()
+        writes = 0
+        write = writer.write
+
+        def counting(data: bytes) -> None:
+            nonlocal writes
+            writes += 1
+            write(data)
+
+        writer.write = counting
+        bus = BrooksBus("emulated")
+        bus.attach(reader, writer)
+        # MFC-A answers first, so the broadcast estimator has samples
+        records = await discover(bus, tags=["MFC-A"] + [f"GONE-{i}" for i in range(8)], probe_timeout=0.01)
+        assert [r.tag for r in records] == ["MFC-A"]
+        return writes
+
+    # one probe per tag plus three identity reads of the device found
+    writes = asyncio.run(main())
+    assert writes == 12
+
+
+def test_one_bad_device_keeps_the_others(tmp_path, monkeypatch):
+    handler = emulator_module._HANDLERS[Command.READ_TAG_DESCRIPTOR_DATE]
+
+    def broken_tag(dev: EmulatedDevice, data: bytes, now: float) -> tuple[int, bytes]:
+        if dev.device_id == 2:
+            return CommandErrorId.COMMAND_NOT_IMPLEMENTED, b""
+        return handler(dev, data, now)
+
+    monkeypatch.setitem(emulator_module._HANDLERS, Command.READ_TAG_DESCRIPTOR_DATE, broken_tag)
+
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        emulator.add_device(EmulatedDevice("MFC-A", 1, polling_address=1))
+        emulator.add_device(EmulatedDevice("MFC-B", 2, polling_address=2))
+        registry = DeviceRegistry(str(tmp_path / "devices.json"))
+        records = await discover(make_bus(emulator), polling_addresses=[1, 2], probe_timeout=0.02, registry=registry)
+
+        by_address = {r.address: r for r in records}
+        assert by_address[1].tag == "MFC-A" and by_address[1].model == "SLA5850S"
+        assert by_address[2].tag is None and by_address[2].polling_address == 2
+        assert by_address[2].model == "SLA5850S"  # details still read by address
+
+        saved = json.loads((tmp_path / "devices.json").read_text())
+        assert set(saved["devices"]) == {"MFC-A"}
+
+    asyncio.run(main())
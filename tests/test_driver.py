@@ -0,0 +1,327 @@
+import asyncio
+import pytest
+import serial
+import struct
+from brooks_sla.core import Command, FlowRateUnit, TemperatureUnit, ValveOverride
+from brooks_sla.driver import BrooksBus, BrooksSLA
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice, EmulatorFaults
+from brooks_sla.hart import HartProtocolError, hart_checksum
+from brooks_sla.scheduler import Priority
+
+
+def make_bus(emulator: BrooksEmulator) -> BrooksBus:
+    bus = BrooksBus("emulated")
+    bus.attach(*emulator.open_connection())
+    return bus
+
+
+def test_get_address_and_read_flow():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001)
+        dev = emulator.add_device(EmulatedDevice("MFC-A", 0x00ABCD, full_scale=50.0))
+        mfc = make_bus(emulator).device("MFC-A")
+
+        await mfc.get_address()
+        assert mfc.config.address == 0x00ABCD
+
+        setting = await mfc.set_flow_percent(40.0)
+        assert setting.percent == pytest.approx(40.0)
+        assert dev.setpoint_percent == pytest.approx(40.0)
+
+        reading = await mfc.read_flow()
+        assert reading.units == FlowRateUnit.LITERS_PER_MIN
+        assert reading.reading == pytest.approx(20.0)
+
+    asyncio.run(main())
+
+
+def test_set_flow_skips_redundant_unit_select():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        dev = emulator.add_device(EmulatedDevice("MFC-A", 1))
+        mfc = make_bus(emulator).device("MFC-A", address=1)
+
+        # Selecting units raises the configuration changed flag, which is reset
+        await mfc.set_flow(FlowRateUnit.LITERS_PER_MIN, 10.0)
+        assert dev.requests == 3
+        await mfc.set_flow(FlowRateUnit.LITERS_PER_MIN, 20.0)
+        assert dev.requests == 4
+
+        await mfc.master_reset()
+        await mfc.set_flow(FlowRateUnit.LITERS_PER_MIN, 20.0)
+        assert dev.requests == 9
+
+
+def test_config_change_after_own_write_is_seen():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        dev = emulator.add_device(EmulatedDevice("MFC-A", 1))
+        mfc = make_bus(emulator).device("MFC-A", address=1)
+
+        await mfc.select_units(FlowRateUnit.LITERS_PER_MIN)
+        assert not dev.configuration_changed
+        assert mfc.config.flow_units == FlowRateUnit.LITERS_PER_MIN
+
+        # Changed from elsewhere, e.g. a handheld: the next reply drops the cache
+        dev.flow_units = FlowRateUnit.LITERS_PER_SEC
+        dev.configuration_changed = True
+        await mfc.read_setpoint()
+        assert mfc.config.flow_units is None
+        await mfc.set_flow(FlowRateUnit.LITERS_PER_MIN, 1.0)
+        assert dev.flow_units == FlowRateUnit.LITERS_PER_MIN
+
+    asyncio.run(main())
+
+    asyncio.run(main())
+
+
+def test_shared_bus_serves_many_devices():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001)
+        emulated = emulator.add_devices(8)
+        bus = make_bus(emulator)
+        handles = [bus.device(dev.tag, address=dev.device_id) for dev in emulated]
+
+        await asyncio.gather(*(h.set_flow_percent(10.0 * i) for i, h in enumerate(handles)))
+        readings = await asyncio.gather(*(h.read_flow() for h in handles))
+        assert [r.reading for r in readings] == pytest.approx([10.0 * i for i in range(8)])
+
+    asyncio.run(main())
+
+
+def test_dead_device_times_out_quickly():
+    async def main() -> float:
+        emulator = BrooksEmulator(turnaround=0.002)
+        emulator.add_device(EmulatedDevice("LIVE", 1))
+        emulator.add_device(EmulatedDevice("DEAD", 2)).online = False
+        bus = make_bus(emulator)
+        live = bus.device("LIVE", address=1)
+        dead = bus.device("DEAD", address=2)
+
+        for _ in range(10):
+            await live.read_flow()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(TimeoutError):
+            await dead.read_flow()
+        return loop.time() - start
+
+    assert asyncio.run(main()) < 0.1
+
+
+def test_slow_config_write_after_fast_reads():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001, command_turnaround={Command.SELECT_FLOW_UNIT: 0.04})
+        dev = emulator.add_device(EmulatedDevice("MFC-A", 1))
+        mfc = make_bus(emulator).device("MFC-A", address=1)
+        for _ in range(20):
+            await mfc.read_flow()
+
+        await mfc.set_flow(FlowRateUnit.LITERS_PER_SEC, 0.1)
+        assert dev.flow_units == FlowRateUnit.LITERS_PER_SEC
+
+    asyncio.run(main())
+
+
+def test_valve_override_and_control_writes_go_at_setpoint_priority():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        dev = emulator.add_device(EmulatedDevice("MFC-A", 1))
+        bus = make_bus(emulator)
+        mfc = bus.device("MFC-A", address=1)
+        await mfc.set_flow_percent(40.0)
+
+        assert await mfc.set_valve_override(ValveOverride.CLOSED) == ValveOverride.CLOSED
+        assert await mfc.read_valve() == pytest.approx(0.0)
+        assert await mfc.read_valve_override() == ValveOverride.CLOSED
+        await mfc.set_valve_override(ValveOverride.NORMAL)
+        assert dev.flow_percent == pytest.approx(40.0)
+
+        await mfc.select_gas(2)
+        await mfc.select_temperature_units(TemperatureUnit.KELVIN)
+        stats = bus.scheduler.stats()
+        # setpoint, two overrides, gas and temperature units with a flag reset each
+        assert stats[Priority.SETPOINT].granted == 7
+        assert stats[Priority.READ].granted >= 2
+
+    asyncio.run(main())
+
+
+def test_construct_command_accepts_any_buffer():
+    mfc = BrooksSLA("MFC-A", bus=BrooksBus("emulated"), address=1)
+    frame = mfc.construct_command(Command.SELECT_GAS_CALIBRATION_FLOW_NUMBER, b"\x02")
+    assert mfc.construct_command(Command.SELECT_GAS_CALIBRATION_FLOW_NUMBER, bytearray(b"\x02")) == frame
+    assert mfc.construct_command(Command.SELECT_GAS_CALIBRATION_FLOW_NUMBER, memoryview(b"\x02")) == frame
+
+
+def test_checksum_fault_raises():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, faults=EmulatorFaults(checksum_error_rate=1.0))
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        mfc = make_bus(emulator).device("MFC-A", address=1)
+        with pytest.raises(HartProtocolError):
+            await mfc.read_flow()
+
+    asyncio.run(main())
+
+
+def test_serial_connection_over_pty():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001, echo=False)
+        emulator.add_device(EmulatedDevice("MFC-A", 7))
+        bus = BrooksBus(emulator.serve_pty(), parity=serial.PARITY_NONE)
+        await bus.connect()
+        try:
+            mfc = bus.device("MFC-A")
+            await mfc.get_address()
+            assert (await mfc.set_flow_percent(25.0)).percent == pytest.approx(25.0)
+            assert (await mfc.read_flow()).reading == pytest.approx(25.0)
+        finally:
+            await bus.close()
+            emulator.close()
+
+    asyncio.run(main())
+
+
+def test_read_snapshot_in_one_transaction():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        dev = emulator.add_device(EmulatedDevice("MFC-A", 1, full_scale=10.0, temperature=23.0))
+        mfc = make_bus(emulator).device("MFC-A", address=1)
+        await mfc.set_flow_percent(50.0)
+        requests = dev.requests
+
+        snapshot = await mfc.read_snapshot()
+        assert dev.requests == requests + 1
+        assert snapshot.flow.reading == pytest.approx(5.0)
+        assert snapshot.temperature is not None
+        assert snapshot.temperature.reading == pytest.approx(23.0)
+        assert len(snapshot.variables) == 4
+        assert snapshot.setpoint is None
+
+        snapshot = await mfc.read_snapshot(include_setpoint=True, include_valve=True)
+        assert dev.requests == requests + 4
+        assert snapshot.setpoint is not None
+        assert snapshot.setpoint.percent == pytest.approx(50.0)
+        assert snapshot.valve == pytest.approx(50.0)
+
+    asyncio.run(main())
+
+
+def test_burst_mode_streams_and_interleaved_setpoint():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001, burst_gap=0.002)
+        a, b = emulator.add_devices(2)
+        bus = make_bus(emulator)
+        mfc_a = bus.device(a.tag, address=a.device_id)
+        mfc_b = bus.device(b.tag, address=b.device_id)
+        await mfc_a.set_flow_percent(10.0)
+        await mfc_b.set_flow_percent(30.0)
+
+        stream_b = await mfc_b.enable_burst()
+        assert b.burst_mode
+        readings = mfc_a.burst_flow()
+        assert (await anext(readings)).reading == pytest.approx(10.0)
+        assert (await stream_b.get()).command == 1
+
+        # Setpoint writes still get through between bursts
+        requests = a.requests
+        setting = await mfc_a.set_flow_percent(60.0)
+        assert setting.percent == pytest.approx(60.0)
+        assert a.requests == requests + 1
+        for _ in range(10):
+            reading = await anext(readings)
+            if reading.reading == pytest.approx(60.0):
+                break
+        else:
+            pytest.fail("burst readings never reflected the new setpoint")
+
+        await readings.aclose()
+        assert not a.burst_mode
+        await mfc_b.disable_burst()
+        await bus.stop_burst_listener()
+        assert bus.burst_listener is None
+        assert (await mfc_b.read_flow()).reading == pytest.approx(30.0)
+
+    asyncio.run(main())
+
+
+def test_burst_listener_matches_responses_by_address():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.01)
+        emulator.add_device(EmulatedDevice("MFC-A", 1)).setpoint_percent = 10.0
+        reader, writer = emulator.open_connection()
+        bus = BrooksBus("emulated")
+        bus.attach(reader, writer)
+        mfc = bus.device("MFC-A", address=1)
+        bus.start_burst_listener()
+
+        read = asyncio.create_task(mfc.read_flow())
+        await asyncio.sleep(0.002)
+        # A late reply to the same command from another device lands first
+        body = bytes([0x86, 0x80, 0, 0, 0, 2, 1, 7, 0, 0, FlowRateUnit.LITERS_PER_MIN]) + struct.pack(">f", 99.0)
+        reader.feed_data(b"\xFF" * 5 + body + bytes([hart_checksum(body)]))
+        assert (await read).reading == pytest.approx(10.0)
+        await bus.stop_burst_listener()
+
+    asyncio.run(main())
+
+
+def test_upgrade_baudrate_switches_whole_line():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001)
+        emulated = emulator.add_devices(3)
+        bus = BrooksBus("emulated")
+        bus.attach(*emulator.open_connection(), reopen=emulator.open_connection)
+        handles = [bus.device(dev.tag, address=dev.device_id) for dev in emulated]
+
+        assert await bus.upgrade_baudrate(38400) == 38400
+        assert bus.baudrate == 38400 and emulator.line_rate == 38400
+        assert [dev.baudrate for dev in emulated] == [38400] * 3
+        await handles[2].set_flow_percent(20.0)
+        assert (await handles[2].read_flow()).reading == pytest.approx(20.0)
+
+    asyncio.run(main())
+
+
+def test_upgrade_baudrate_falls_back_when_a_device_refuses():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001)
+        emulator.add_device(EmulatedDevice("FAST-1", 1))
+        emulator.add_device(EmulatedDevice("FAST-2", 2))
+        emulator.add_device(EmulatedDevice("SLOW", 3, max_baudrate=19200))
+        bus = BrooksBus("emulated")
+        bus.attach(*emulator.open_connection(), reopen=emulator.open_connection)
+        handles = [bus.device(dev.tag, address=dev.device_id) for dev in emulator.devices]
+
+        assert await bus.upgrade_baudrate(38400) == 19200
+        assert bus.baudrate == 19200
+        assert [dev.baudrate for dev in emulator.devices] == [19200] * 3
+        readings = await asyncio.gather(*(h.read_flow() for h in handles))
+        assert len(readings) == 3
+
+    asyncio.run(main())
+
+
+def test_upgrade_baudrate_restores_line_when_reopen_fails():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001)
+        emulated = emulator.add_devices(2)
+        opened = []
+
+        def reopen(baudrate: int):
+            opened.append(baudrate)
+            if baudrate != 19200 and opened.count(baudrate) == 1:
+                raise OSError("port busy")
+            return emulator.open_connection(baudrate)
+
+        bus = BrooksBus("emulated")
+        bus.attach(*emulator.open_connection(), reopen=reopen)
+        handles = [bus.device(dev.tag, address=dev.device_id) for dev in emulated]
+
+        assert await bus.upgrade_baudrate(38400) == 19200
+        assert opened == [38400, 38400, 19200]
+        assert [dev.baudrate for dev in emulated] == [19200] * 2
+        assert len(await asyncio.gather(*(h.read_flow() for h in handles))) == 2
+
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+import serial
+from brooks_sla.driver import BrooksError
+from brooks_sla.emulator import BrooksEmulator
+from brooks_sla.fleet import Fleet, PortConfig
+
+
+def serve_lines(count: int) -> tuple[list[BrooksEmulator], list[PortConfig]]:
+    emulators, configs = [], []
+    for line in range(count):
+        emulator = BrooksEmulator(turnaround=0.001)
+        devices = emulator.add_devices(2, tag_prefix=f"L{line}-", first_id=10 * line + 1)
+        configs.append(PortConfig(
+            port=emulator.serve_pty(),
+            parity=serial.PARITY_NONE,
+            devices={dev.tag: dev.device_id for dev in devices},
+        ))
+        emulators.append(emulator)
+    return emulators, configs
+
+
+async def exercise(fleet: Fleet, emulators: list[BrooksEmulator]) -> None:
+    assert sorted(fleet.tags) == ["L0-0", "L0-1", "L1-0", "L1-1", "L2-0", "L2-1"]
+    await asyncio.gather(*(fleet.set_flow_percent(tag, 10.0 + i) for i, tag in enumerate(fleet.tags)))
+    readings = await fleet.read_flow_many()
+    for i, tag in enumerate(fleet.tags):
+        assert readings[tag].reading == pytest.approx(10.0 + i)
+    assert emulators[2].device(21).setpoint_percent == pytest.approx(10.0 + fleet.tags.index("L2-0"))
+
+    group = await fleet.set_flows({tag: 50.0 for tag in fleet.tags})
+    assert sorted(group.results) == sorted(fleet.tags) and not group.failed
+    assert 0.0 <= group.skew < 1.0
+    assert emulators[1].device(11).setpoint_percent == pytest.approx(50.0)
+
+    metrics = await fleet.metrics()
+    assert [m.port for m in metrics] == [fleet._ports[i].port for i in (0, 2, 1)]
+    assert sum(m.requests for m in metrics) == 18
+    assert all(m.devices == 2 and m.timeouts == 0 and m.mean_latency > 0 for m in metrics)
+
+
+def test_fleet_threads():
+    async def main() -> None:
+        emulators, configs = serve_lines(3)
+        try:
+            async with Fleet(configs, workers=2) as fleet:
+                await exercise(fleet, emulators)
+        finally:
+            for emulator in emulators:
+                emulator.close()
+
+    asyncio.run(main())
+
+
+def test_fleet_processes():
+    async def main() -> None:
+        emulators, configs = serve_lines(3)
+        try:
+            async with Fleet(configs, workers=2, processes=True) as fleet:
+                await exercise(fleet, emulators)
+                with pytest.raises(BrooksError):
+                    await fleet.call("L0-0", "read_flow_range", 9)
+        finally:
+            for emulator in emulators:
+                emulator.close()
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_fleet_start_cleans_up_when_a_line_fails(processes):
+    async def main() -> None:
+        emulators, configs = serve_lines(2)
+        configs.append(PortConfig(port="/dev/brooks-no-such-port", devices={"GONE": 99}))
+        fleet = Fleet(configs, workers=2, processes=processes)
+        try:
+            with pytest.raises(OSError):
+                await fleet.start()
+            for worker in fleet._workers:
+                if processes:
+                    assert not worker._process.is_alive()
+                else:
+                    assert not worker._thread.is_alive()
+                    assert all(bus._writer is None for bus in worker._host._buses.values())
+        finally:
+            for emulator in emulators:
+                emulator.close()
+
+    asyncio.run(main())
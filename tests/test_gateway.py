@@ -0,0 +1,156 @@
+import asyncio
+import pytest
+import socket
+from brooks_sla.driver import BrooksBus, BrooksError
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice
+from brooks_sla.gateway import COM_PORT, SET_BAUDRATE, TelnetStream, gateway_pool
+
+
+class GatewayStandIn:
+    """A TCP server relaying each connection to an emulated line, like an Ethernet to RS-485 gateway."""
+
+    def __init__(self, emulator: BrooksEmulator, rfc2217: bool = False, load: dict | None = None) -> None:
+        self.emulator = emulator
+        self.rfc2217 = rfc2217
+        self.connections: list[asyncio.StreamWriter] = []
+        self.telnet: list[TelnetStream] = []
+        # Requests awaiting a reply, shared by the ports of one gateway
+        self.load = {"in_flight": 0, "max_in_flight": 0} if load is None else load
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"{'rfc2217' if self.rfc2217 else 'tcp'}://127.0.0.1:{port}"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections.append(writer)
+        telnet = TelnetStream()
+        self.telnet.append(telnet)
+        line_reader, line_writer = self.emulator.open_connection()
+
+        async def pump() -> None:
+            while data := await line_reader.read(1024):
+                self.load["in_flight"] -= 1
+                writer.write(telnet.escape(data) if self.rfc2217 else data)
+
+        task = asyncio.create_task(pump())
+        try:
+            while data := await reader.read(1024):
+                if self.rfc2217:
+                    data, _ = telnet.feed(data)
+                if data:
+                    load = self.load
+                    load["in_flight"] += 1
+                    load["max_in_flight"] = max(load["max_in_flight"], load["in_flight"])
+                    line_writer.write(data)
+        except ConnectionError:
+            pass
+        finally:
+            task.cancel()
+            writer.close()
+
+    async def close(self) -> None:
+        self.server.close()
+        for writer in self.connections:
+            writer.close()
+
+
+def emulated_line(*tags: str) -> BrooksEmulator:
+    emulator = BrooksEmulator(baudrate=None, turnaround=0.002)
+    for i, tag in enumerate(tags):
+        emulator.add_device(EmulatedDevice(tag, i + 1))
+    return emulator
+
+
+def test_raw_tcp_line_reconnects_and_is_pooled():
+    async def main() -> None:
+        gateway = GatewayStandIn(emulated_line("MFC-A"))
+        url = await gateway.start()
+        pool = gateway_pool()
+        bus = BrooksBus(url)
+        await bus.connect()
+        mfc = bus.device("MFC-A", address=1)
+        await mfc.set_flow_percent(35.0)
+        assert (await mfc.read_flow()).reading == pytest.approx(35.0)
+
+        line = pool.lines[0]
+        sock = line._transport.get_extra_info("socket")
+        assert sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+
+        # The gateway drops the connection; the line is back before the next request
+        gateway.connections[0].transport.abort()
+        await asyncio.sleep(0.05)
+        assert line.reconnects == 1 and line.connected
+        assert (await mfc.read_flow()).reading == pytest.approx(35.0)
+
+        # Closing the bus keeps the connection for the next one on the same URL
+        await bus.close()
+        again = BrooksBus(url)
+        await again.connect()
+        assert pool.lines == [line] and len(gateway.connections) == 2
+        with pytest.raises(BrooksError):
+            await BrooksBus(url).connect()
+        with pytest.raises(BrooksError):
+            await again.upgrade_baudrate(38400)
+        await again.close()
+        pool.close()
+        await gateway.close()
+
+    asyncio.run(main())
+
+
+def test_gateway_limit_spans_its_lines():
+    async def main() -> None:
+        # Three serial ports of one gateway host, 127.0.0.1
+        load = {"in_flight": 0, "max_in_flight": 0}
+        gateways = [GatewayStandIn(emulated_line(f"MFC-{i}"), load=load) for i in range(3)]
+        urls = [await g.start() for g in gateways]
+        pool = gateway_pool()
+        pool.set_limit("127.0.0.1", 1)
+        buses = [BrooksBus(url) for url in urls]
+        for bus in buses:
+            await bus.connect()
+        devices = [bus.device(f"MFC-{i}", address=1) for i, bus in enumerate(buses)]
+
+        async def poll(dev) -> None:
+            for _ in range(5):
+                await dev.read_flow()
+
+        await asyncio.gather(*(poll(dev) for dev in devices))
+        gate = pool.gate("127.0.0.1")
+        assert gate is buses[0]._gate and gate is buses[2]._gate
+        assert load["max_in_flight"] == 1
+
+        pool.set_limit("127.0.0.1", None)
+        for bus in buses:
+            await bus.close()
+        for bus in buses:
+            await bus.connect()
+        await asyncio.gather(*(poll(dev) for dev in devices))
+        assert load["max_in_flight"] > 1
+        for bus in buses:
+            await bus.close()
+        pool.close()
+        for g in gateways:
+            await g.close()
+
+    asyncio.run(main())
+
+
+def test_rfc2217_negotiates_serial_settings():
+    async def main() -> None:
+        gateway = GatewayStandIn(emulated_line("MFC-A"), rfc2217=True)
+        url = await gateway.start()
+        bus = BrooksBus(url, baudrate=19200)
+        await bus.connect()
+        mfc = bus.device("MFC-A", address=1)
+        # Preambles are 0xFF, so every request exercises the IAC escaping both ways
+        await mfc.set_flow_percent(12.5)
+        assert (await mfc.read_setpoint()).percent == pytest.approx(12.5)
+        settings = gateway.telnet[0].subnegotiations
+        assert bytes([COM_PORT, SET_BAUDRATE]) + (19200).to_bytes(4, "big") in settings
+        await bus.close()
+        gateway_pool().close()
+        await gateway.close()
+
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from brooks_sla.core import Command, FlowRateUnit
+from brooks_sla.driver import BrooksBus, BrooksError
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice
+from brooks_sla.group import SetpointTarget, set_flows
+
+
+def make_line(count: int) -> tuple[BrooksEmulator, BrooksBus]:
+    emulator = BrooksEmulator(turnaround=0.002)
+    for i in range(count):
+        emulator.add_device(EmulatedDevice(f"MFC-{i}", i + 1))
+    bus = BrooksBus("emulated")
+    bus.attach(*emulator.open_connection())
+    for i in range(count):
+        bus.device(f"MFC-{i}", address=i + 1)
+    return emulator, bus
+
+
+def test_group_writes_back_to_back():
+    async def main() -> None:
+        emulator, bus = make_line(4)
+        for dev in bus.devices:
+            await dev.read_flow()
+        metrics = bus.enable_metrics()
+
+        async def read_during_group() -> float:
+            await asyncio.sleep(0.02)  # lands while the group holds the line
+            await bus.devices[0].read_flow()
+            return asyncio.get_running_loop().time()
+
+        reader = asyncio.create_task(read_during_group())
+        result = await bus.set_flows({f"MFC-{i}": 10.0 * (i + 1) for i in range(4)})
+        read_at = await reader
+
+        assert list(result.results) and not result.failed
+        for i in range(4):
+            assert emulator.device(i + 1).setpoint_percent == pytest.approx(10.0 * (i + 1))
+            assert result.results[f"MFC-{i}"].setting.percent == pytest.approx(10.0 * (i + 1))
+        acks = sorted(r.acked_at for r in result.acked)
+        assert result.skew == pytest.approx(acks[-1] - acks[0])
+        assert all(result.started_at < t for t in acks)
+        # The read queued behind the whole group rather than between writes
+        assert read_at >= acks[-1]
+        assert metrics.snapshot().commands[Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS].count == 4
+
+    asyncio.run(main())
+
+
+def test_units_are_staged_once_per_device():
+    async def main() -> None:
+        emulator, bus = make_line(2)
+        metrics = bus.enable_metrics()
+        targets = [SetpointTarget(dev, 2.5, FlowRateUnit.LITERS_PER_MIN) for dev in bus.devices]
+        await set_flows(targets)
+        await set_flows(targets)
+        commands = metrics.snapshot().commands
+        assert commands[Command.SELECT_FLOW_UNIT].count == 2
+        assert commands[Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS].count == 4
+        assert emulator.device(1).flow_units == FlowRateUnit.LITERS_PER_MIN
+
+        with pytest.raises(BrooksError):
+            await set_flows([SetpointTarget(bus.devices[0], 10.0)] * 2)
+
+    asyncio.run(main())
+
+
+def test_silent_device_fails_alone():
+    async def main() -> None:
+        emulator, bus = make_line(3)
+        for dev in bus.devices:
+            await dev.read_flow()
+        emulator.device(1).online = False
+        result = await bus.set_flows({"MFC-0": 20.0, "MFC-1": 30.0, "MFC-2": 40.0})
+        assert [r.tag for r in result.failed] == ["MFC-0"]
+        assert isinstance(result.results["MFC-0"].error, TimeoutError)
+        assert emulator.device(3).setpoint_percent == pytest.approx(40.0)
+
+        # Never having answered a setpoint write, it keeps the generous default
+        # allowance while the others have learned theirs, so it goes last. The
+        # order among the others follows live estimates and is not asserted.
+        emulator.device(1).online = True
+        result = await bus.set_flows({"MFC-0": 25.0, "MFC-1": 35.0, "MFC-2": 45.0})
+        assert not result.failed
+        assert list(result.results)[-1] == "MFC-0"
+        assert sorted(result.results) == ["MFC-0", "MFC-1", "MFC-2"]
+
+    asyncio.run(main())
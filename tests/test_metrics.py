@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from brooks_sla.core import Command, CommandErrorId
+from brooks_sla.driver import BrooksBus
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice, EmulatorFaults
+from brooks_sla.hart import HartProtocolError
+from brooks_sla.metrics import render_openmetrics
+from brooks_sla.recovery import RetryPolicy
+
+
+def test_metrics_disabled_by_default_and_counting_when_enabled():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001)
+        live = emulator.add_device(EmulatedDevice("LIVE", 1))
+        emulator.add_device(EmulatedDevice("DEAD", 2)).online = False
+        bus = BrooksBus("emulated", retry=RetryPolicy(attempts=1))
+        bus.attach(*emulator.open_connection())
+        mfc = bus.device("LIVE", address=1)
+        dead = bus.device("DEAD", address=2)
+        assert bus.metrics is None
+        await mfc.read_flow()
+
+        metrics = bus.enable_metrics()
+        for _ in range(5):
+            await mfc.read_flow()
+        await mfc.set_flow_percent(20.0)
+        live.configuration_changed = True
+        await mfc.read_flow()
+        with pytest.raises(TimeoutError):
+            await dead.read_flow()
+        emulator.faults = EmulatorFaults(busy_rate=1.0)
+        response = await bus.transaction(mfc.construct_command(Command.READ_PRIMARY_VARIABLE))
+        assert response.response_code == CommandErrorId.DEVICE_BUSY
+        emulator.faults = EmulatorFaults(checksum_error_rate=1.0)
+        with pytest.raises(HartProtocolError):
+            await mfc.read_flow()
+
+        snap = metrics.snapshot()
+        by_tag = {d.tag: d for d in snap.devices}
+        assert by_tag["LIVE"].latency.count == 9  # the flag raised above is reset once
+        assert 0 < by_tag["LIVE"].latency.mean < 0.1
+        assert by_tag["LIVE"].bytes_out > 0 and by_tag["LIVE"].bytes_in > 0
+        assert by_tag["DEAD"].timeouts == 1 and by_tag["DEAD"].latency.count == 0
+        assert snap.commands[1].count == 7 and snap.commands[236].count == 1
+        assert snap.protocol_errors == 1
+        assert snap.response_codes == {int(CommandErrorId.DEVICE_BUSY): 1}
+        assert snap.command_status["configuration_changed"] == 1
+
+        text = render_openmetrics([snap])
+        assert text.endswith("# EOF\n")
+        assert 'brooks_sla_device_latency_seconds_count{port="emulated",device="LIVE"} 9' in text
+        assert 'brooks_sla_device_latency_seconds_bucket{port="emulated",device="LIVE",le="+Inf"} 9' in text
+        assert 'brooks_sla_timeouts_total{port="emulated",device="DEAD"} 1' in text
+        assert 'brooks_sla_command_latency_seconds_count{port="emulated",command="READ_PRIMARY_VARIABLE"} 7' in text
+
+        metrics.reset()
+        assert metrics.snapshot().devices == []
+        bus.disable_metrics()
+        assert bus.metrics is None
+
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from brooks_sla.core import SoftstartMode
+from brooks_sla.driver import BrooksBus
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice
+from brooks_sla.ramp import RampSegment, RampShape
+
+
+def make_bus(emulator: BrooksEmulator) -> BrooksBus:
+    bus = BrooksBus("emulated")
+    bus.attach(*emulator.open_connection())
+    return bus
+
+
+def test_ramp_to_programs_device_and_writes_endpoint_only():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        dev = emulator.add_device(EmulatedDevice("MFC-A", 1, max_ramp_rate=1000.0))
+        bus = make_bus(emulator)
+        mfc = bus.device("MFC-A", address=1)
+        metrics = bus.enable_metrics()
+
+        setting = await mfc.ramp_to(50.0, 250.0)
+        assert setting.percent == pytest.approx(50.0)
+        assert dev.softstart == SoftstartMode.LINEAR
+        assert dev.ramp_rate == pytest.approx(250.0)
+        await asyncio.sleep(0.1)
+        # Halfway up the device-side ramp
+        assert 10.0 < await mfc.read_valve() < 45.0
+        await asyncio.sleep(0.15)
+        assert await mfc.read_valve() == pytest.approx(50.0)
+
+        # Mode and rate are cached, so a second ramp is one write
+        await mfc.ramp_to(0.0, 250.0)
+        commands = metrics.snapshot().commands
+        assert commands[236].count == 2
+        assert commands[218].count == 1 and commands[219].count == 1
+
+    asyncio.run(main())
+
+
+def test_profile_runs_linear_segments_in_the_device():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        dev = emulator.add_device(EmulatedDevice("MFC-A", 1, max_ramp_rate=1000.0))
+        mfc = make_bus(emulator).device("MFC-A", address=1)
+
+        runs = await mfc.run_profile([
+            RampSegment(target=40.0, duration=0.1, hold=0.02),
+            RampSegment(target=10.0),
+        ])
+        assert [run.device_side for run in runs] == [True, True]
+        assert [run.writes for run in runs] == [1, 1]
+        assert runs[0].finished_at - runs[0].started_at >= 0.12
+        # The step switched softstart off so it applied at once
+        assert dev.softstart == SoftstartMode.DISABLED
+        assert dev.output_percent == pytest.approx(10.0)
+
+    asyncio.run(main())
+
+
+def test_profile_falls_back_to_client_ramp():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        plain = emulator.add_device(EmulatedDevice("PLAIN", 1, softstart=False))
+        slow = emulator.add_device(EmulatedDevice("SLOW", 2, max_ramp_rate=10.0))
+        bus = make_bus(emulator)
+
+        runs = await bus.device("PLAIN", address=1).run_profile(
+            [RampSegment(target=50.0, duration=0.2)], start=0.0, step=0.05
+        )
+        assert not runs[0].device_side and runs[0].writes == 4
+        assert plain.setpoint_percent == pytest.approx(50.0)
+
+        # Too fast for the firmware, and an S-curve: both ramped client-side
+        runs = await bus.device("SLOW", address=2).run_profile(
+            [RampSegment(target=50.0, duration=0.1), RampSegment(target=0.0, duration=0.1, shape=RampShape.S_CURVE)],
+            start=0.0,
+            step=0.05,
+        )
+        assert [run.device_side for run in runs] == [False, False]
+        assert slow.softstart == SoftstartMode.DISABLED
+        assert slow.setpoint_percent == pytest.approx(0.0)
+
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+import pytest
+import struct
+from brooks_sla.core import Command, CommandErrorId, FlowRateUnit
+from brooks_sla.driver import FlowReading, HartResponse
+from brooks_sla.recorder import TelemetryRecorder, iter_segments, load_devices, open_segment, segment_paths
+
+np = pytest.importorskip("numpy")
+
+
+def test_records_rotate_and_read_back(tmp_path):
+    with TelemetryRecorder(str(tmp_path), segment_records=4) as recorder:
+        a = recorder.device_index("MFC-A")
+        b = recorder.device_index("MFC-B")
+        assert recorder.device_index("MFC-A") == a
+        for i in range(10):
+            recorder.record(a if i % 2 == 0 else b, float(i), FlowRateUnit.LITERS_PER_MIN, timestamp=float(i))
+        recorder.record_reading(a, FlowReading(1.5, FlowRateUnit.CC_PER_MIN), timestamp=10.0)
+
+        # The open segment is readable while it is being written
+        assert len(open_segment(recorder.segment_path)) == 3
+
+    assert len(segment_paths(str(tmp_path))) == 3
+    records = np.concatenate(list(iter_segments(str(tmp_path))))
+    assert records["timestamp"].tolist() == [float(i) for i in range(11)]
+    assert records["value"][:10].tolist() == [float(i) for i in range(10)]
+    assert records["units"][-1] == FlowRateUnit.CC_PER_MIN
+    assert records["device"][:4].tolist() == [a, b, a, b]
+    assert load_devices(str(tmp_path)) == {a: "MFC-A", b: "MFC-B"}
+
+
+def test_error_response_is_recorded_without_a_reading(tmp_path):
+    with TelemetryRecorder(str(tmp_path)) as recorder:
+        a = recorder.device_index("MFC-A")
+        ok = HartResponse(Command.READ_PRIMARY_VARIABLE, 7, 1, 0, 0, struct.pack(">Bf", FlowRateUnit.LITERS_PER_MIN, 2.5), b"")
+        busy = HartResponse(Command.READ_PRIMARY_VARIABLE, 2, 1, CommandErrorId.DEVICE_BUSY, 0, b"", b"")
+        recorder.record_response(a, ok, timestamp=1.0)
+        recorder.record_response(a, busy, timestamp=2.0)
+
+    records = np.concatenate(list(iter_segments(str(tmp_path))))
+    assert records["value"][0] == pytest.approx(2.5)
+    assert np.isnan(records["value"][1])
+    assert records["response_code"].tolist() == [0, CommandErrorId.DEVICE_BUSY]
@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+from brooks_sla.core import Command, CommandErrorId
+from brooks_sla.driver import BrooksBus, ResponseError
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice, EmulatorFaults
+import brooks_sla.emulator as emulator_module
+from brooks_sla.hart import HartProtocolError, HartStreamParser
+from brooks_sla.recovery import BreakerPolicy, DeviceUnavailable, RetryPolicy
+
+
+def make_bus(emulator: BrooksEmulator, **kwargs) -> BrooksBus:
+    bus = BrooksBus("emulated", **kwargs)
+    bus.attach(*emulator.open_connection())
+    return bus
+
+
+def test_parser_resyncs_on_next_preamble():
+    frame = bytes.fromhex("FFFFFF 06 80 01 03 00 10 20") + bytes([0x06 ^ 0x80 ^ 0x01 ^ 0x03 ^ 0x00 ^ 0x10 ^ 0x20])
+    parser = HartStreamParser()
+    with pytest.raises(HartProtocolError):
+        parser.feed(b"\xFF\xFF\x99\x00\x01\x02" + frame)
+    # The whole noise run is dropped in one step
+    assert parser.buffered == len(frame)
+    parsed = parser.next_frame()
+    assert parsed is not None and parsed.command == 1
+
+
+def test_reads_are_retried_through_corrupt_frames():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001)
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        bus = make_bus(emulator, retry=RetryPolicy(attempts=6, backoff=0.001))
+        mfc = bus.device("MFC-A", address=1)
+        metrics = bus.enable_metrics()
+        await mfc.read_flow()
+
+        emulator.faults = EmulatorFaults(checksum_error_rate=0.2, drop_byte_rate=0.1, seed=7)
+        for _ in range(20):
+            await mfc.read_flow()
+        snap = metrics.snapshot()
+        device = snap.devices[0]
+        assert device.retries > 0
+        assert device.retries == snap.protocol_errors + device.timeouts
+        assert device.latency.count == 21
+
+    asyncio.run(main())
+
+
+def test_writes_are_not_retried_unless_asked():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, faults=EmulatorFaults(checksum_error_rate=1.0))
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        bus = make_bus(emulator)
+        mfc = bus.device("MFC-A", address=1)
+        metrics = bus.enable_metrics()
+
+        with pytest.raises(HartProtocolError):
+            await mfc.set_flow_percent(20.0)
+        assert metrics.protocol_errors == 1
+
+        request = mfc.construct_command(Command.RESET_CONFIGURATION_CHANGED_FLAG)
+        with pytest.raises(HartProtocolError):
+            await mfc.transaction(request, retry=True)
+        assert metrics.protocol_errors == 1 + bus.retry_policy.attempts
+
+    asyncio.run(main())
+
+
+def test_busy_device_raises_response_error_after_retries():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, faults=EmulatorFaults(busy_rate=1.0))
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        bus = make_bus(emulator)
+        mfc = bus.device("MFC-A", address=1)
+        metrics = bus.enable_metrics()
+
+        with pytest.raises(ResponseError) as info:
+            await mfc.read_flow()
+        assert info.value.response_code == CommandErrorId.DEVICE_BUSY
+        assert metrics.snapshot().devices[0].retries == bus.retry_policy.attempts - 1
+
+    asyncio.run(main())
+
+
+def test_breaker_skips_dead_device_until_cooldown():
+    async def main() -> None:
+        emulator = BrooksEmulator(turnaround=0.001)
+        emulator.add_device(EmulatedDevice("LIVE", 1))
+        flaky = emulator.add_device(EmulatedDevice("FLAKY", 2))
+        bus = make_bus(emulator, breaker=BreakerPolicy(failures=3, cooldown=0.05))
+        live = bus.device("LIVE", address=1)
+        dev = bus.device("FLAKY", address=2)
+        await live.read_flow()
+        await dev.read_flow()
+
+        flaky.online = False
+        with pytest.raises(TimeoutError):
+            await dev.read_flow()
+        assert bus.device_unavailable(2)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(DeviceUnavailable):
+            await dev.read_flow()
+        assert loop.time() - start < 0.005
+        await live.read_flow()
+
+        # After the cooldown one probe goes out and closes the breaker again
+        flaky.online = True
+        await asyncio.sleep(0.06)
+        await dev.read_flow()
+        assert not bus.device_unavailable(2)
+
+    asyncio.run(main())
+
+
+def test_flush_input_returns_once_the_line_is_quiet():
+    async def main() -> float:
+        emulator = BrooksEmulator()
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        bus = make_bus(emulator)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bus.flush_input()
+        return loop.time() - start
+
+    assert asyncio.run(main()) < 0.02
+
+
+def test_warning_response_code_returns_data(monkeypatch):
+    def nearest_setpoint(dev, data, now):
+        code, payload = handler(dev, data, now)
+        return 8, payload  # set to nearest possible value
+
+    handler = emulator_module._HANDLERS[Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS]
+    monkeypatch.setitem(emulator_module._HANDLERS, Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS, nearest_setpoint)
+
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        emulator.add_device(EmulatedDevice("MFC-A", 1))
+        mfc = make_bus(emulator).device("MFC-A", address=1)
+        setting = await mfc.set_flow_percent(30.0)
+        assert setting.percent == pytest.approx(30.0)
+        request = mfc.construct_command(Command.WRITE_SETPOINT_PERCENT_OR_SELECTED_UNITS, b"\x39" + bytes(4))
+        response = await mfc.transaction(request)
+        assert response.response_code == 8
+
+    asyncio.run(main())
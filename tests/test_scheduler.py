@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from brooks_sla.scheduler import DeadlineMissed, Priority, TransactionScheduler
+
+
+def test_setpoints_preempt_queued_reads():
+    async def main() -> list[str]:
+        scheduler = TransactionScheduler()
+        order: list[str] = []
+
+        async def job(name: str, priority: Priority) -> None:
+            async with scheduler.slot(priority):
+                order.append(name)
+
+        await scheduler.acquire(Priority.READ)
+        tasks = [
+            asyncio.create_task(job("telemetry", Priority.TELEMETRY)),
+            asyncio.create_task(job("read1", Priority.READ)),
+            asyncio.create_task(job("read2", Priority.READ)),
+            asyncio.create_task(job("setpoint", Priority.SETPOINT)),
+        ]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(main()) == ["setpoint", "read1", "read2", "telemetry"]
+
+
+def test_stale_telemetry_is_dropped():
+    async def main() -> TransactionScheduler:
+        scheduler = TransactionScheduler({Priority.TELEMETRY: 0.01})
+        await scheduler.acquire(Priority.READ)
+        with pytest.raises(DeadlineMissed):
+            await scheduler.acquire(Priority.TELEMETRY)
+        scheduler.release()
+        assert not scheduler.busy
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    telemetry = scheduler.stats()[Priority.TELEMETRY]
+    assert telemetry.dropped == 1
+    assert telemetry.queue_depth == 0
+    assert telemetry.max_queue_depth == 1
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from brooks_sla.driver import BrooksBus
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice, EmulatorFaults
+
+np = pytest.importorskip("numpy")
+from brooks_sla.stream import FlowRing  # noqa: E402
+
+
+def test_ring_wraps_with_contiguous_views():
+    ring = FlowRing(8)
+    for i in range(6):
+        ring.append(float(i), float(i), 17, 0, 0)
+    assert ring.take(4).values.tolist() == [0, 1, 2, 3]
+    for i in range(6, 12):
+        ring.append(float(i), float(i), 17, 0, 0)
+    assert ring.take().values.tolist() == [4, 5, 6, 7]
+    assert ring.take().values.tolist() == [8, 9, 10, 11]
+    assert len(ring) == 0
+    assert ring.overruns == 0
+
+
+def test_stream_flow_batches():
+    async def main() -> list:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        emulator.add_device(EmulatedDevice("MFC-A", 1, full_scale=10.0)).setpoint_percent = 30.0
+        bus = BrooksBus("emulated", gap_chars=0.0)
+        bus.attach(*emulator.open_connection())
+        mfc = bus.device("MFC-A", address=1)
+
+        batches = []
+        async for batch in mfc.stream_flow(batch=16):
+            batches.append((batch.timestamps.copy(), batch.values.copy()))
+            if len(batches) == 3:
+                break
+        return batches
+
+    batches = asyncio.run(main())
+    assert [len(values) for _, values in batches] == [16, 16, 16]
+    timestamps = np.concatenate([t for t, _ in batches])
+    assert np.all(np.diff(timestamps) >= 0)
+    assert np.allclose(np.concatenate([v for _, v in batches]), 3.0)
+
+
+def test_stream_flow_counts_corrupt_responses_as_missed():
+    async def main() -> None:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0, faults=EmulatorFaults(checksum_error_rate=1.0))
+        emulator.add_device(EmulatedDevice("MFC-A", 1, full_scale=10.0)).setpoint_percent = 30.0
+        bus = BrooksBus("emulated", gap_chars=0.0)
+        bus.attach(*emulator.open_connection())
+        mfc = bus.device("MFC-A", address=1)
+        ring = FlowRing(64)
+        stream = mfc.stream_flow(rate=200.0, batch=4, ring=ring)
+
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.2)
+        assert not first.done()
+        assert ring.missed > 0
+        # The loop kept polling, so it picks up once responses are clean again
+        emulator.faults.checksum_error_rate = 0.0
+        batch = await asyncio.wait_for(first, 2.0)
+        assert np.allclose(batch.values, 3.0)
+        await stream.aclose()
+
+    asyncio.run(main())
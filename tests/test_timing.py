@@ -0,0 +1,37 @@
+from brooks_sla.core import Command
+from brooks_sla.timing import TurnaroundEstimator, response_chars
+
+
+def test_response_chars_read_flow():
+    # 5 preamble + delimiter + 5 address + command + count + 2 status + 5 data + checksum
+    assert response_chars(Command.READ_PRIMARY_VARIABLE) == 21
+
+
+def test_estimator_converges_and_backs_off_on_timeouts():
+    estimator = TurnaroundEstimator(floor=0.005)
+    for _ in range(50):
+        estimator.update(0.010)
+    assert abs(estimator.estimate - 0.010) < 1e-4
+    assert estimator.allowance() < 0.02
+
+    # A slower answer than anything learned gets room after a timeout or two
+    estimator.timed_out()
+    estimator.timed_out()
+    assert estimator.allowance() > 0.04
+    for _ in range(10):
+        estimator.timed_out()
+    assert estimator.allowance() == estimator.ceiling
+
+
+def test_estimator_allowance_keeps_floor():
+    estimator = TurnaroundEstimator()
+    for _ in range(50):
+        estimator.update(0.0)
+    assert estimator.allowance() == estimator.floor
+
+
+def test_unlearned_estimator_does_not_grow_on_timeouts():
+    estimator = TurnaroundEstimator(initial=0.02)
+    before = estimator.allowance()
+    estimator.timed_out()
+    assert estimator.allowance() == before
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from brooks_sla.core import FlowRateUnit, PressureUnit, TemperatureUnit
+from brooks_sla.driver import BrooksBus, BrooksError, FlowRange, FlowReading
+from brooks_sla.emulator import BrooksEmulator, EmulatedDevice
+from brooks_sla.units import UnitConverter, convert_pressure, convert_temperature
+
+
+def test_scalar_conversions():
+    converter = UnitConverter(full_scale=FlowRange(units=FlowRateUnit.LITERS_PER_MIN, value=50.0))
+    assert converter.flow(1.0, FlowRateUnit.LITERS_PER_MIN, FlowRateUnit.CUBIC_METERS_PER_HOUR) == pytest.approx(0.06)
+    assert converter.flow(60.0, FlowRateUnit.CC_PER_MIN, FlowRateUnit.CC_PER_SEC) == pytest.approx(1.0)
+    assert converter.flow(50.0, FlowRateUnit.PERCENT, FlowRateUnit.LITERS_PER_MIN) == pytest.approx(25.0)
+    assert converter.reading(FlowReading(2.0, FlowRateUnit.LITERS_PER_MIN), FlowRateUnit.ML_PER_SEC) == (
+        pytest.approx(2000.0 / 60.0), FlowRateUnit.ML_PER_SEC,
+    )
+    assert convert_temperature(100.0, TemperatureUnit.CELSIUS, TemperatureUnit.FAHRENHEIT) == pytest.approx(212.0)
+    assert convert_pressure(1.0, PressureUnit.BAR, PressureUnit.KILOPASCAL) == pytest.approx(100.0)
+    # Mass needs a gas density
+    with pytest.raises(BrooksError):
+        converter.flow(1.0, FlowRateUnit.LITERS_PER_MIN, FlowRateUnit.GRAMS_PER_MIN)
+
+
+def test_mass_conversion_uses_reported_gas_data():
+    async def main() -> UnitConverter:
+        emulator = BrooksEmulator(baudrate=None, turnaround=0.0)
+        emulator.add_device(EmulatedDevice("MFC-A", 1, full_scale=10.0))
+        bus = BrooksBus("emulated")
+        bus.attach(*emulator.open_connection())
+        return await bus.device("MFC-A", address=1).unit_converter()
+
+    converter = asyncio.run(main())
+    gas = converter.gas
+    assert gas.reference_temperature == pytest.approx(273.15)
+    assert gas.standard_pressure == pytest.approx(101325.0, rel=1e-6)
+    # 1 standard litre of N2 at 20 degC weighs 1.2506 * 273.15 / 293.15 g
+    grams = converter.flow(1.0, FlowRateUnit.LITERS_PER_MIN, FlowRateUnit.GRAMS_PER_MIN)
+    assert grams == pytest.approx(1.2506 * 273.15 / 293.15, rel=1e-5)
+    assert converter.flow(grams, FlowRateUnit.GRAMS_PER_MIN, FlowRateUnit.LITERS_PER_MIN) == pytest.approx(1.0)
+    assert converter.flow(100.0, FlowRateUnit.PERCENT, FlowRateUnit.LITERS_PER_MIN) == pytest.approx(10.0)
+
+
+def test_arrays_convert_per_sample_units():
+    np = pytest.importorskip("numpy")
+    converter = UnitConverter(full_scale=FlowRange(units=FlowRateUnit.LITERS_PER_MIN, value=100.0))
+    values = np.array([1.0, 60.0, 50.0, 3.0], dtype=np.float32)
+    units = np.array([
+        FlowRateUnit.LITERS_PER_MIN, FlowRateUnit.LITERS_PER_HOUR, FlowRateUnit.PERCENT, FlowRateUnit.GRAMS_PER_MIN,
+    ], dtype=np.uint8)
+    out = converter.flow(values, units, FlowRateUnit.LITERS_PER_MIN)
+    assert out[:3].tolist() == pytest.approx([1.0, 1.0, 50.0])
+    assert np.isnan(out[3])  # no gas data for mass units
+    assert converter.flow(values[:2], FlowRateUnit.LITERS_PER_MIN, FlowRateUnit.LITERS_PER_SEC).tolist() == (
+        pytest.approx([1.0 / 60.0, 1.0])
+    )
+    temps = convert_temperature(np.array([0.0, 32.0]), np.array([32, 33]), TemperatureUnit.KELVIN)
+    assert temps.tolist() == pytest.approx([273.15, 273.15])